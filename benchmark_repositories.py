@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Repository Benchmarks - Measure load_by_id against catalog size
+
+Usage: python benchmark_repositories.py
+"""
+import csv
+import io
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent / "src"))
+
+from src.repositories.json_repository import JSONRepository
+from src.repositories.csv_repository import CSVRepository
+from src.repositories.entity_table import EntityTable
+from src.repositories.repository_factory import RepositoryFactory
+from src.repositories.migration import migrate
+from src.services.product_service import ProductService
+
+SIZES = [1_000, 10_000, 100_000]
+
+
+def make_products(count):
+    """Build a synthetic product catalog"""
+    return [
+        {
+            'id': f"PRD-{i:08d}",
+            'name': f"Product {i}",
+            'price': round(1 + (i % 500) * 0.5, 2),
+            'category': f"Category {i % 20}",
+            'stock': i % 50,
+            'description': f"Synthetic product number {i}"
+        }
+        for i in range(count)
+    ]
+
+
+def time_lookups(repo, ids):
+    """Average seconds per load_by_id call"""
+    start = time.perf_counter()
+    for product_id in ids:
+        repo.load_by_id('products', product_id)
+    return (time.perf_counter() - start) / len(ids)
+
+
+def bench_load_by_id():
+    """Print the load_by_id curve for each backend with and without cache"""
+    print("📈 load_by_id (µs per call)")
+    print(f"{'products':>10} {'json':>12} {'json+cache':>12} "
+          f"{'csv':>12} {'csv+cache':>12}")
+
+    for size in SIZES:
+        products = make_products(size)
+        # Probe ids spread over the whole catalog, including the tail
+        probe = [products[i]['id'] for i in range(0, size, max(1, size // 50))]
+        row = [f"{size:>10}"]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            for repo_class in (JSONRepository, CSVRepository):
+                plain = repo_class(tmp)
+                if repo_class is JSONRepository:
+                    plain._save_table('products', EntityTable(products))
+                else:
+                    plain._write_table('products', EntityTable(products))
+
+                uncached = time_lookups(plain, probe[:5])
+                cached_repo = repo_class(tmp, cache=True)
+                cached_repo.load_by_id('products', probe[0])  # warm up
+                cached = time_lookups(cached_repo, probe * 20)
+                row.append(f"{uncached * 1e6:>12.1f}")
+                row.append(f"{cached * 1e6:>12.1f}")
+
+        print(" ".join(row))
+
+
+def bench_stock_updates(size=10_000, updates=200):
+    """Print stock-update throughput for full rewrites vs journal mode"""
+    print(f"\n📝 update() on {size} products (updates per second)")
+    products = make_products(size)
+    ids = [products[i]['id'] for i in range(0, size, size // updates)]
+
+    for label, options in (("json", {}), ("json+journal", {'journal': True})):
+        with tempfile.TemporaryDirectory() as tmp:
+            repo = JSONRepository(tmp, cache=True, **options)
+            repo._save_table('products', EntityTable(products))
+            start = time.perf_counter()
+            for product_id in ids:
+                repo.update('products', product_id, {'stock': 1})
+            elapsed = time.perf_counter() - start
+        print(f"{label:>14}: {len(ids) / elapsed:>10.0f}")
+
+
+def bench_encodings(size=10_000):
+    """Print file size and full write/read time per JSON encoding"""
+    print(f"\n💾 Encodings for {size} products")
+    products = make_products(size)
+    encodings = (
+        ("pretty", {}),
+        ("compact", {'indent': None}),
+        ("compact+gzip", {'indent': None, 'compression': 'gzip'}),
+        ("compact+zlib", {'indent': None, 'compression': 'zlib'}),
+    )
+
+    for label, options in encodings:
+        with tempfile.TemporaryDirectory() as tmp:
+            repo = JSONRepository(tmp, **options)
+            start = time.perf_counter()
+            repo._save_table('products', EntityTable(products))
+            written = time.perf_counter() - start
+            start = time.perf_counter()
+            repo.load_all('products')
+            read = time.perf_counter() - start
+            file_size = (Path(tmp) / 'products.json').stat().st_size
+        print(f"{label:>14}: {file_size / 1024:>8.0f} KiB  "
+              f"write {written * 1000:>6.1f} ms  read {read * 1000:>6.1f} ms")
+
+
+def legacy_csv_parse(file_path):
+    """Original CSVRepository.load_all parsing path (reference)"""
+    data = []
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            if 'price' in row:
+                row['price'] = float(row['price'])
+            if 'stock' in row:
+                row['stock'] = int(row['stock'])
+            data.append(row)
+    return data
+
+
+def legacy_csv_write(f, headers, records):
+    """Original CSVRepository DictWriter serialization path (reference)"""
+    writer = csv.DictWriter(f, fieldnames=headers)
+    writer.writeheader()
+    writer.writerows(records)
+
+
+def bench_csv_codec(size=100_000):
+    """Print CSV parse/serialize time: DictReader/DictWriter vs schemas"""
+    print(f"\n🧮 CSV products codec for {size} rows (ms)")
+    products = make_products(size)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = CSVRepository(tmp)
+        repo._write_table('products', EntityTable(products))
+        file_path = Path(tmp) / 'products.csv'
+
+        start = time.perf_counter()
+        legacy_rows = legacy_csv_parse(file_path)
+        legacy_read = time.perf_counter() - start
+        start = time.perf_counter()
+        rows = repo._read_file('products')
+        schema_read = time.perf_counter() - start
+        assert rows == legacy_rows
+
+    start = time.perf_counter()
+    legacy_csv_write(io.StringIO(newline=''), repo.headers['products'], products)
+    legacy_write = time.perf_counter() - start
+    start = time.perf_counter()
+    repo._write_rows(io.StringIO(newline=''), 'products', products)
+    schema_write = time.perf_counter() - start
+
+    print(f"{'':>8} {'DictReader/Writer':>18} {'compiled schema':>16}")
+    print(f"{'parse':>8} {legacy_read * 1000:>18.1f} {schema_read * 1000:>16.1f}")
+    print(f"{'write':>8} {legacy_write * 1000:>18.1f} {schema_write * 1000:>16.1f}")
+
+
+def bench_threaded_reads(size=10_000, ops_per_thread=2_000, write_every=20):
+    """Print read-heavy throughput of a thread-safe repository by threads
+
+    Each thread mostly calls load_by_id and every ``write_every``-th call
+    appends a journaled update, so readers share the entity lock while
+    writers briefly take it exclusively. Parsing and lookups still
+    run under the GIL, so more threads add little beyond readers never
+    queueing behind one another.
+    """
+    print(f"\n🧵 Read-heavy mix on {size} products (ops per second)")
+    products = make_products(size)
+    ids = [product['id'] for product in products]
+    print(f"{'threads':>8} {'json+cache':>12} {'json':>12}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        JSONRepository(tmp)._save_table('products', EntityTable(products))
+
+        for threads in (1, 2, 4, 8):
+            row = [f"{threads:>8}"]
+            for cache in (True, False):
+                repo = JSONRepository(tmp, cache=cache, journal=True,
+                                      thread_safe=True)
+                ops = ops_per_thread if cache else ops_per_thread // 100
+
+                def worker(offset):
+                    for i in range(ops):
+                        product_id = ids[(offset * 7919 + i * 31) % size]
+                        if i % write_every == 0:
+                            repo.update('products', product_id, {'stock': i})
+                        else:
+                            repo.load_by_id('products', product_id)
+
+                workers = [threading.Thread(target=worker, args=(n,))
+                           for n in range(threads)]
+                start = time.perf_counter()
+                for thread in workers:
+                    thread.start()
+                for thread in workers:
+                    thread.join()
+                elapsed = time.perf_counter() - start
+                row.append(f"{threads * ops / elapsed:>12.0f}")
+            print(" ".join(row))
+
+
+def bench_migration(size=100_000):
+    """Print migration throughput and peak Python memory per target
+
+    Peak memory stays flat as the catalog grows because records stream
+    from the source into the target one at a time.
+    """
+    print(f"\n🚚 Migrating {size} products from JSON")
+    print(f"{'target':>8} {'records/s':>12} {'peak KiB':>10} {'verified':>9}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = JSONRepository(str(Path(tmp) / "json"))
+        source.replace_all('products', iter(make_products(size)))
+
+        for target_type in ("csv", "sqlite", "jsonl"):
+            target = RepositoryFactory.create_repository(
+                target_type, str(Path(tmp) / target_type))
+            tracemalloc.start()
+            report = migrate(source, target, ['products'])[0]
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"{target_type:>8} {report['records_per_second']:>12.0f} "
+                  f"{peak // 1024:>10} {str(report['verified']):>9}")
+
+
+def bench_search(size=100_000, queries=("Product 4242", "number 99",
+                                         "category 7 product 1234")):
+    """Print ms per search: substring scan vs the inverted index"""
+    print(f"\n🔎 search_products on {size} products (ms per query)")
+    print(f"{'query':>26} {'scan':>10} {'index':>10} {'matches':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = JSONRepository(tmp, cache=True)
+        repo.replace_all('products', iter(make_products(size)))
+        service = ProductService(repo)
+        service.search_products("warm up")  # Builds the index once
+
+        for query in queries:
+            start = time.perf_counter()
+            needle = query.lower()
+            scanned = [item for item in repo.iter_all('products')
+                       if needle in item['name'].lower() or
+                       needle in item['description'].lower()]
+            scan = time.perf_counter() - start
+
+            start = time.perf_counter()
+            found = service.search_products(query, limit=20)
+            indexed = time.perf_counter() - start
+            print(f"{query:>26} {scan * 1000:>10.1f} {indexed * 1000:>10.3f} "
+                  f"{len(found):>8}")
+
+
+def bench_facets(size=100_000):
+    """Print ms per faceted query: full scan vs the bitmap indexes"""
+    print(f"\n🧮 filter_products on {size} products (ms per query)")
+    filters = {'category': ['Category 1', 'Category 2'],
+               'price': ['0-10', '10-25', '25-50'],
+               'availability': ['in_stock']}
+    bands = {(0, 10), (10, 25), (25, 50)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        repo = JSONRepository(tmp, cache=True)
+        repo.replace_all('products', iter(make_products(size)))
+        service = ProductService(repo)
+
+        start = time.perf_counter()
+        service.filter_products()  # Builds the index once
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scanned = [item for item in repo.iter_all('products')
+                   if item['category'] in filters['category'] and
+                   item['stock'] > 0 and
+                   any(low <= item['price'] < high for low, high in bands)]
+        scan = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = service.filter_products(filters, limit=20)
+        indexed = time.perf_counter() - start
+        print(f"build {build * 1000:.0f}  scan {scan * 1000:.1f}  "
+              f"index+counts {indexed * 1000:.3f}  "
+              f"matches {len(scanned)}/{result['count']}")
+
+
+if __name__ == "__main__":
+    bench_load_by_id()
+    bench_stock_updates()
+    bench_encodings()
+    bench_csv_codec()
+    bench_threaded_reads()
+    bench_migration()
+    bench_search()
+    bench_facets()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Storage Migration - Copy the catalog between storage backends
+
+Usage: python migrate_storage.py json data sqlite data_sqlite
+       python migrate_storage.py json data csv data_csv --entities products
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent / "src"))
+
+from src.repositories.repository_factory import RepositoryFactory
+from src.repositories.migration import migrate
+
+BACKENDS = ["json", "jsonl", "csv", "sqlite"]
+
+
+def show_progress(entity_type, count, seconds):
+    """Overwrite one status line per entity type"""
+    rate = count / seconds if seconds else 0
+    print(f"\r  {entity_type}: {count:,} records ({rate:,.0f}/s)",
+          end="", flush=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Stream entities from one storage backend to another")
+    parser.add_argument("source_type", choices=BACKENDS)
+    parser.add_argument("source_dir")
+    parser.add_argument("target_type", choices=BACKENDS)
+    parser.add_argument("target_dir")
+    parser.add_argument("--entities", nargs="+", default=["products", "users"],
+                        help="Entity types to copy (default: products users)")
+    parser.add_argument("--chunk-size", type=int, default=5000,
+                        help="Records per progress update and insert batch")
+    args = parser.parse_args()
+
+    if (args.source_type, Path(args.source_dir).resolve()) == \
+            (args.target_type, Path(args.target_dir).resolve()):
+        print("❌ Source and target are the same storage")
+        return 1
+
+    source = RepositoryFactory.create_repository(args.source_type,
+                                                 args.source_dir)
+    target = RepositoryFactory.create_repository(args.target_type,
+                                                 args.target_dir)
+
+    print(f"🚚 {args.source_type}:{args.source_dir} → "
+          f"{args.target_type}:{args.target_dir}")
+    failed = False
+    for entity_type in args.entities:
+        report = migrate(source, target, [entity_type], args.chunk_size,
+                         show_progress)[0]
+        status = "✅" if report['verified'] else "❌"
+        print(f"\r{status} {entity_type}: {report['count']:,} records in "
+              f"{report['seconds']:.1f}s "
+              f"({report['records_per_second']:,.0f}/s), "
+              f"sha256 {report['checksum'][:12]}")
+        if not report['verified']:
+            print(f"   Target holds a different copy "
+                  f"({report['written']:,} written)")
+            failed = True
+
+    for repository in (source, target):
+        if hasattr(repository, 'close'):
+            repository.close()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,7 @@
 """
 Product Controller - Main coordinator for product operations
 """
-from typing import Dict
+from typing import Dict, Optional
 from src.services.product_service import ProductService
 from .product_operations import ProductOperations
 from .product_search import ProductSearch
@@ -33,15 +33,22 @@ class ProductController:
         return self.operations.delete_product(product_id)
     
     # Search and browsing
-    def list_products(self, category: str | None = None) -> Dict:
+    def list_products(self, category: Optional[str] = None) -> Dict:
         return self.search.list_products(category)
     
     def get_product(self, product_id: str) -> Dict:
         return self.search.get_product(product_id)
     
-    def search_products(self, query: str) -> Dict:
-        return self.search.search_products(query)
+    def search_products(self, query: str, limit: Optional[int] = None) -> Dict:
+        return self.search.search_products(query, limit)
     
+    def autocomplete(self, prefix: str, limit: int = 10) -> Dict:
+        return self.search.autocomplete(prefix, limit)
+
+    def filter_products(self, filters: Optional[Dict] = None, query: str = "",
+                        limit: Optional[int] = None) -> Dict:
+        return self.search.filter_products(filters, query, limit)
+
     def get_categories(self) -> Dict:
         return self.search.get_categories()
     
@@ -52,6 +59,9 @@ class ProductController:
     def get_low_stock_products(self, threshold: int = 5) -> Dict:
         return self.management.get_low_stock_products(threshold)
     
+    def get_low_stock_report(self, threshold: int = 5) -> Dict:
+        return self.management.get_low_stock_report(threshold)
+    
     def apply_category_discount(self, category: str,
                                 discount_percent: float) -> Dict:
         return self.management.apply_category_discount(
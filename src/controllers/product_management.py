@@ -24,6 +24,19 @@ class ProductManagement:
         except (ValueError, TypeError, IOError) as e:
             return {'success': False, 'error': f'Failed to check stock: {e}'}
 
+    def get_low_stock_report(self, threshold: int = 5) -> Dict:
+        """Get name/category/stock of low stock products"""
+        try:
+            products = self.product_service.get_low_stock_summary(threshold)
+            return {
+                'success': True,
+                'products': products,
+                'count': len(products),
+                'threshold': threshold
+            }
+        except (ValueError, TypeError, IOError) as e:
+            return {'success': False, 'error': f'Failed to check stock: {e}'}
+
     def apply_category_discount(self, category: str,
                                 discount_percent: float) -> Dict:
         """Apply discount to all products in category"""
@@ -48,19 +61,17 @@ class ProductManagement:
     def get_product_stats(self) -> Dict:
         """Get product statistics"""
         try:
-            all_products = self.product_service.get_all_products()
-            total_products = len(all_products)
-            total_value = sum(p.price * p.stock for p in all_products)
-            low_stock_count = len([p for p in all_products if p.stock <= 5])
-            out_of_stock_count = len([p for p in all_products if p.stock == 0])
+            stats = self.product_service.get_inventory_stats()
             
             return {
                 'success': True,
                 'stats': {
-                    'total_products': total_products,
-                    'total_value': round(total_value, 2),
-                    'low_stock_count': low_stock_count,
-                    'out_of_stock_count': out_of_stock_count
+                    'total_products': stats['total_products'],
+                    'total_stock': stats['total_stock'],
+                    'average_price': round(stats['average_price'], 2),
+                    'total_value': round(stats['total_value'], 2),
+                    'low_stock_count': stats['low_stock_count'],
+                    'out_of_stock_count': stats['out_of_stock_count']
                 }
             }
         except (ValueError, TypeError, IOError) as e:
@@ -69,12 +80,7 @@ class ProductManagement:
     def bulk_update_stock(self, updates: Dict[str, int]) -> Dict:
         """Update stock for multiple products"""
         try:
-            updated_count = 0
-            for product_id, new_stock in updates.items():
-                success = self.product_service.update_product(
-                    product_id, stock=new_stock)
-                if success:
-                    updated_count += 1
+            updated_count = self.product_service.bulk_update_stock(updates)
 
             return {
                 'success': True,
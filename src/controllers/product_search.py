@@ -1,7 +1,7 @@
 """
 Product Search - Handle product searching and browsing
 """
-from typing import Dict
+from typing import Dict, Optional
 from src.services.product_service import ProductService
 
 
@@ -11,7 +11,7 @@ class ProductSearch:
     def __init__(self, product_service: ProductService):
         self.product_service = product_service
     
-    def list_products(self, category: str = None) -> Dict:
+    def list_products(self, category: Optional[str] = None) -> Dict:
         """List all products or products by category"""
         try:
             if category:
@@ -39,22 +39,62 @@ class ProductSearch:
         else:
             return {'success': False, 'error': 'Product not found'}
     
-    def search_products(self, query: str) -> Dict:
-        """Search products by name or description"""
+    def search_products(self, query: str, limit: Optional[int] = None) -> Dict:
+        """Search products by name, category or description, best first"""
         if not query.strip():
             return {'success': False, 'error': 'Search query is required'}
         
         try:
-            products = self.product_service.search_products(query)
+            products = self.product_service.search_products(query, limit)
+            # Nothing found: offer spelling corrections that do find products
+            suggestions = ([] if products else
+                           self.product_service.suggest_queries(query))
             return {
                 'success': True,
                 'products': [self._format_product(p) for p in products],
                 'count': len(products),
-                'query': query
+                'query': query,
+                'suggestions': suggestions
             }
         except Exception as e:
             return {'success': False, 'error': f'Search failed: {e}'}
     
+    def autocomplete(self, prefix: str, limit: int = 10) -> Dict:
+        """Completions of a partly typed search, meant for every keystroke"""
+        if not prefix.strip():
+            return {'success': True, 'completions': [], 'count': 0,
+                    'prefix': prefix}
+        
+        try:
+            completions = self.product_service.autocomplete(prefix, limit)
+            return {
+                'success': True,
+                'completions': completions,
+                'count': len(completions),
+                'prefix': prefix
+            }
+        except Exception as e:
+            return {'success': False, 'error': f'Autocomplete failed: {e}'}
+    
+    def filter_products(self, filters: Optional[Dict] = None, query: str = "",
+                        limit: Optional[int] = None) -> Dict:
+        """Browse by category, price band and availability, with counts"""
+        try:
+            result = self.product_service.filter_products(filters, query, limit)
+            return {
+                'success': True,
+                'products': [self._format_product(p)
+                             for p in result['products']],
+                'count': result['count'],
+                'facets': result['facets'],
+                'filters': filters or {},
+                'query': query
+            }
+        except ValueError as e:
+            return {'success': False, 'error': str(e)}
+        except Exception as e:
+            return {'success': False, 'error': f'Filtering failed: {e}'}
+    
     def get_categories(self) -> Dict:
         """Get all product categories"""
         try:
@@ -67,6 +67,9 @@ class UserController:
     def list_users(self) -> Dict:
         return self.management.list_users()
     
+    def get_user_stats(self) -> Dict:
+        return self.management.get_user_stats()
+    
     def update_user_role(self, user_id: str, new_role: str) -> Dict:
         return self.management.update_user_role(user_id, new_role)
     
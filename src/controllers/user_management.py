@@ -28,6 +28,22 @@ class UserManagement:
         except Exception as e:
             return {'success': False, 'error': f'Failed to load users: {e}'}
     
+    def get_user_stats(self) -> Dict:
+        """Get user counts per role (admin only)"""
+        admin_check = self.user_auth.require_admin()
+        if not admin_check['success']:
+            return admin_check
+        
+        try:
+            role_counts = self.user_service.get_role_counts()
+            return {
+                'success': True,
+                'total_users': sum(role_counts.values()),
+                'role_counts': role_counts
+            }
+        except Exception as e:
+            return {'success': False, 'error': f'Failed to load users: {e}'}
+    
     def update_user_role(self, user_id: str, new_role: str) -> Dict:
         """Update user role (admin only)"""
         admin_check = self.user_auth.require_admin()
@@ -0,0 +1,198 @@
+"""
+Async Repository - asyncio access to storage without blocking the event loop
+"""
+import asyncio
+import functools
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Any, Callable, Iterable
+
+from src.repositories.repository_interface import RepositoryInterface
+
+
+class AsyncRepositoryInterface(ABC):
+    """Async counterpart of RepositoryInterface"""
+
+    @abstractmethod
+    async def save(self, entity_type: str, data: Dict[str, Any]) -> bool:
+        """Save entity data to storage"""
+        pass
+
+    @abstractmethod
+    async def load_all(self, entity_type: str,
+                       fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Load all entities of given type (optionally only some fields)"""
+        pass
+
+    @abstractmethod
+    async def load_by_id(self, entity_type: str,
+                         entity_id: str) -> Optional[Dict[str, Any]]:
+        """Load single entity by ID"""
+        pass
+
+    @abstractmethod
+    async def load_by_filter(self, entity_type: str, filters: Dict[str, Any],
+                             fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Load entities matching filters (optionally only some fields)"""
+        pass
+
+    @abstractmethod
+    async def update(self, entity_type: str, entity_id: str,
+                     data: Dict[str, Any]) -> bool:
+        """Update entity by ID"""
+        pass
+
+    @abstractmethod
+    async def delete(self, entity_type: str, entity_id: str) -> bool:
+        """Delete entity by ID"""
+        pass
+
+    @abstractmethod
+    async def exists(self, entity_type: str, entity_id: str) -> bool:
+        """Check if entity exists"""
+        pass
+
+    async def update_many(self, entity_type: str,
+                          updates: Dict[str, Dict[str, Any]]) -> int:
+        """Update several entities by ID, returning how many were updated"""
+        count = 0
+        for entity_id, data in updates.items():
+            if await self.update(entity_type, entity_id, data):
+                count += 1
+        return count
+
+    async def get_count(self, entity_type: str) -> int:
+        """Get number of stored entities"""
+        return len(await self.load_all(entity_type, ['id']))
+
+
+def _freeze(value: Any) -> Any:
+    """Hashable form of call arguments (lists and dicts included)"""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    hash(value)
+    return value
+
+
+class ExecutorRepository(AsyncRepositoryInterface):
+    """Runs a blocking repository on a bounded thread pool
+
+    At most ``max_workers`` storage calls run at once however many
+    coroutines are waiting. Identical reads that overlap in time share a
+    single call, so a burst of shoppers loading the same entity file reads
+    it once; every waiter receives the same result, which must be treated
+    as read-only. A write makes later reads start afresh instead of joining
+    one that began before it finished.
+
+    The wrapped repository is called from several threads: create JSON
+    and CSV repositories with ``thread_safe=True`` unless ``max_workers``
+    is 1 (SQLite opens a connection per thread by itself). Use one
+    instance per event loop.
+    """
+
+    def __init__(self, repository: RepositoryInterface, max_workers: int = 4):
+        """Initialize with the blocking repository to wrap
+
+        Args:
+            repository: Repository to run in the executor
+            max_workers: Upper bound on concurrent storage calls
+        """
+        self.repository = repository
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="repository")
+        # entity_type -> call key -> in-flight read shared by its callers
+        self._reads: Dict[str, Dict[tuple, asyncio.Future]] = {}
+        self.coalesced_reads = 0
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run any blocking callable on the repository's executor"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs))
+
+    async def _read(self, method: str, entity_type: str, *args) -> Any:
+        """Run a read, sharing it with identical reads already in flight"""
+        try:
+            key = (method, _freeze(args))
+        except TypeError:
+            # Unhashable arguments: just run the call on its own
+            return await self.run(getattr(self.repository, method),
+                                  entity_type, *args)
+
+        pending = self._reads.setdefault(entity_type, {})
+        future = pending.get(key)
+        if future is not None:
+            self.coalesced_reads += 1
+        else:
+            future = asyncio.ensure_future(self.run(
+                getattr(self.repository, method), entity_type, *args))
+            pending[key] = future
+            future.add_done_callback(
+                lambda done: pending.get(key) is done and pending.pop(key))
+        # A cancelled waiter must not cancel the read for the others
+        return await asyncio.shield(future)
+
+    async def _write(self, method: str, entity_type: str, *args) -> Any:
+        """Run a write, then stop sharing reads that started before it"""
+        try:
+            return await self.run(getattr(self.repository, method),
+                                  entity_type, *args)
+        finally:
+            self._reads.pop(entity_type, None)
+
+    async def save(self, entity_type: str, data: Dict[str, Any]) -> bool:
+        """Save entity data to storage"""
+        return await self._write('save', entity_type, data)
+
+    async def load_all(self, entity_type: str,
+                       fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Load all entities of given type (optionally only some fields)"""
+        return await self._read('load_all', entity_type, fields)
+
+    async def load_by_id(self, entity_type: str,
+                         entity_id: str) -> Optional[Dict[str, Any]]:
+        """Load single entity by ID"""
+        return await self._read('load_by_id', entity_type, entity_id)
+
+    async def load_by_filter(self, entity_type: str, filters: Dict[str, Any],
+                             fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Load entities matching filters (optionally only some fields)"""
+        return await self._read('load_by_filter', entity_type, filters, fields)
+
+    async def update(self, entity_type: str, entity_id: str,
+                     data: Dict[str, Any]) -> bool:
+        """Update entity by ID"""
+        return await self._write('update', entity_type, entity_id, data)
+
+    async def delete(self, entity_type: str, entity_id: str) -> bool:
+        """Delete entity by ID"""
+        return await self._write('delete', entity_type, entity_id)
+
+    async def exists(self, entity_type: str, entity_id: str) -> bool:
+        """Check if entity exists"""
+        return await self._read('exists', entity_type, entity_id)
+
+    async def save_many(self, entity_type: str,
+                        records: Iterable[Dict[str, Any]]) -> int:
+        """Save several entities in one storage call"""
+        return await self._write('save_many', entity_type, list(records))
+
+    async def update_many(self, entity_type: str,
+                          updates: Dict[str, Dict[str, Any]]) -> int:
+        """Update several entities by ID in one storage call"""
+        return await self._write('update_many', entity_type, updates)
+
+    async def delete_many(self, entity_type: str,
+                          entity_ids: Iterable[str]) -> int:
+        """Delete several entities by ID in one storage call"""
+        return await self._write('delete_many', entity_type, list(entity_ids))
+
+    async def get_count(self, entity_type: str) -> int:
+        """Get number of stored entities"""
+        return await self._read('get_count', entity_type)
+
+    def close(self) -> None:
+        """Wait for running storage calls and stop the executor"""
+        self._executor.shutdown(wait=True)
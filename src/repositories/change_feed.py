@@ -0,0 +1,375 @@
+"""
+Change Feed - Change-data-capture events for any repository
+"""
+import bisect
+import json
+import os
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional, Any, Callable, Iterable, Iterator, Tuple
+
+from .entity_table import matches_filters
+from .repository_interface import RepositoryInterface
+
+# Change events are plain dicts:
+# {'seq': 42, 'entity_type': 'products', 'id': 'PRD-...',
+#  'op': 'save' | 'update' | 'delete' | 'clear', 'data': {...} | None}
+ChangeEvent = Dict[str, Any]
+Subscriber = Callable[[ChangeEvent], None]
+
+
+class ChangeLog:
+    """Durable, append-only log of change events, one JSON line each
+
+    Sequence numbers start at 1 and grow by one per event, continuing
+    across restarts. A sparse in-memory index of (seq, byte offset) lets
+    since() seek close to the requested position instead of rescanning
+    the whole log. One process appends at a time.
+
+    With ``fsync`` every append is flushed to disk before it returns, so
+    an event a consumer has seen survives a crash. The log keeps growing
+    until truncate() drops what every consumer has processed.
+    """
+
+    def __init__(self, path: Path, index_every: int = 1000,
+                 fsync: bool = True):
+        self.path = Path(path)
+        self.index_every = index_every
+        self.fsync = fsync
+        self._checkpoints: List[Tuple[int, int]] = []
+        self.last_seq = 0
+        self._recover()
+
+    def _iter_from(self, offset: int) -> Iterator[Tuple[int, ChangeEvent]]:
+        """Stream (byte offset, event) for complete lines after offset"""
+        if not self.path.exists():
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                start = offset
+                offset += len(line)
+                if not line.endswith(b'\n'):
+                    break  # Interrupted append
+                yield start, json.loads(line)
+
+    def _recover(self) -> None:
+        """Find the last sequence number and drop a torn or corrupt tail"""
+        if not self.path.exists():
+            return
+        good_end = 0
+        with open(self.path, 'rb') as f:
+            offset = 0
+            for line in f:
+                start = offset
+                offset += len(line)
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    seq = json.loads(line)['seq']
+                except (ValueError, KeyError, TypeError):
+                    break
+                self._checkpoint(seq, start)
+                self.last_seq = seq
+                good_end = offset
+        if good_end < self.path.stat().st_size:
+            with open(self.path, 'r+b') as f:
+                f.truncate(good_end)
+
+    def _checkpoint(self, seq: int, offset: int) -> None:
+        """Remember the offset of every index_every-th event"""
+        if seq % self.index_every == 1 or self.index_every == 1:
+            self._checkpoints.append((seq, offset))
+
+    def append(self, events: List[Dict[str, Any]]) -> List[ChangeEvent]:
+        """Number and durably append events, returning them with seq"""
+        numbered = []
+        lines = []
+        for event in events:
+            event = dict(event, seq=self.last_seq + len(numbered) + 1)
+            numbered.append(event)
+            lines.append(json.dumps(event, ensure_ascii=False,
+                                    separators=(',', ':')) + '\n')
+
+        payload = [line.encode('utf-8') for line in lines]
+        with open(self.path, 'ab') as f:
+            offset = f.tell()
+            f.write(b''.join(payload))
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        for event, line in zip(numbered, payload):
+            self._checkpoint(event['seq'], offset)
+            offset += len(line)
+        self.last_seq += len(numbered)
+        return numbered
+
+    def truncate(self, seq: int) -> int:
+        """Drop events up to and including seq, returning how many
+
+        Call with the lowest sequence number every consumer has processed
+        (its checkpoint). The latest event is always kept so numbering
+        continues after a restart. The log is rewritten and replaced
+        atomically.
+        """
+        seq = min(seq, self.last_seq - 1)
+        if seq < 1 or not self.path.exists():
+            return 0
+        temp_path = self.path.with_name(self.path.name + '.tmp')
+        checkpoints: List[Tuple[int, int]] = []
+        dropped = 0
+        with open(self.path, 'rb') as source, open(temp_path, 'wb') as target:
+            for line in source:
+                if not line.endswith(b'\n'):
+                    break
+                event_seq = json.loads(line)['seq']
+                if event_seq <= seq:
+                    dropped += 1
+                    continue
+                if event_seq % self.index_every == 1 or self.index_every == 1:
+                    checkpoints.append((event_seq, target.tell()))
+                target.write(line)
+            target.flush()
+            os.fsync(target.fileno())
+        os.replace(temp_path, self.path)
+        self._checkpoints = checkpoints
+        return dropped
+
+    def since(self, seq: int) -> Iterator[ChangeEvent]:
+        """Stream events with a sequence number greater than seq"""
+        # Start at the last checkpoint at or before the first wanted event
+        pos = bisect.bisect_right(self._checkpoints, (seq + 1, float('inf')))
+        offset = self._checkpoints[pos - 1][1] if pos else 0
+        for _, event in self._iter_from(offset):
+            if event['seq'] > seq:
+                yield event
+
+
+class ChangeFeedRepository(RepositoryInterface):
+    """Wraps a repository and reports every successful write
+
+    Each committed write becomes one event per affected record, numbered
+    by a sequence that only grows, appended to the durable change log and
+    then passed to subscribers. Caches, search indexes and replicas can
+    subscribe for live updates, and after a restart catch up with
+    changes_since(last_seq_they_saw) instead of rescanning everything.
+    Events for updates carry the full record as stored after the update.
+    """
+
+    def __init__(self, repository: RepositoryInterface,
+                 data_dir: str = "data", log_name: str = "changes.log",
+                 fsync: bool = True):
+        """Initialize feed around a repository
+
+        Args:
+            repository: Repository that stores the data
+            data_dir: Directory for the change log
+            log_name: Change log file name inside data_dir
+            fsync: Flush every log append to disk before subscribers
+                hear of it
+        """
+        self.repository = repository
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(exist_ok=True)
+        self.log = ChangeLog(self.data_dir / log_name, fsync=fsync)
+        self._subscribers: List[Subscriber] = []
+        # Keeps sequence order equal to commit order
+        self._lock = threading.RLock()
+
+    # Feed
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the most recent change"""
+        return self.log.last_seq
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """Call ``callback(event)`` for every future change
+
+        Returns a function that cancels the subscription.
+        """
+        self._subscribers.append(callback)
+        return lambda: self._subscribers.remove(callback)
+
+    def changes_since(self, seq: int, entity_type: Optional[str] = None,
+                      limit: Optional[int] = None) -> List[ChangeEvent]:
+        """Get logged changes after sequence number seq, oldest first"""
+        changes = []
+        for event in self.log.since(seq):
+            if entity_type is not None and event['entity_type'] != entity_type:
+                continue
+            changes.append(event)
+            if limit is not None and len(changes) >= limit:
+                break
+        return changes
+
+    def truncate_changes(self, seq: int) -> int:
+        """Drop logged changes up to seq, once every consumer is past it"""
+        with self._lock:
+            return self.log.truncate(seq)
+
+    def _emit(self, events: List[Dict[str, Any]]) -> None:
+        """Log changes and notify subscribers"""
+        if not events:
+            return
+        try:
+            events = self.log.append(events)
+        except IOError as e:
+            print(f"Error writing change log: {e}")
+            return
+        for event in events:
+            for callback in list(self._subscribers):
+                try:
+                    callback(event)
+                except Exception as e:
+                    print(f"Error in change subscriber: {e}")
+
+    def _current(self, entity_type: str, entity_ids: Iterable[str],
+                 op: str) -> List[Dict[str, Any]]:
+        """Events carrying the stored version of each record
+
+        The records are read in one pass however many there are.
+        """
+        entity_ids = list(dict.fromkeys(entity_ids))
+        if len(entity_ids) == 1:
+            record = self.repository.load_by_id(entity_type, entity_ids[0])
+            found = {} if record is None else {entity_ids[0]: record}
+        else:
+            wanted = set(entity_ids)
+            found = {record['id']: record
+                     for record in self.repository.iter_all(entity_type)
+                     if record.get('id') in wanted}
+        return [{'entity_type': entity_type, 'id': entity_id, 'op': op,
+                 'data': found[entity_id]}
+                for entity_id in entity_ids if entity_id in found]
+
+    # Writes
+
+    def save(self, entity_type: str, data: Dict[str, Any]) -> bool:
+        """Save entity and emit a 'save' event"""
+        with self._lock:
+            if not self.repository.save(entity_type, data):
+                return False
+            self._emit([{'entity_type': entity_type, 'id': data.get('id'),
+                         'op': 'save', 'data': dict(data)}])
+            return True
+
+    def update(self, entity_type: str, entity_id: str,
+              data: Dict[str, Any]) -> bool:
+        """Update entity and emit an 'update' event with the new record"""
+        with self._lock:
+            if not self.repository.update(entity_type, entity_id, data):
+                return False
+            self._emit(self._current(entity_type, [entity_id], 'update'))
+            return True
+
+    def delete(self, entity_type: str, entity_id: str) -> bool:
+        """Delete entity and emit a 'delete' event"""
+        with self._lock:
+            if not self.repository.delete(entity_type, entity_id):
+                return False
+            self._emit([{'entity_type': entity_type, 'id': entity_id,
+                         'op': 'delete', 'data': None}])
+            return True
+
+    def save_many(self, entity_type: str,
+                  records: Iterable[Dict[str, Any]]) -> int:
+        """Save several entities and emit one event per stored record"""
+        records = list(records)
+        with self._lock:
+            count = self.repository.save_many(entity_type, records)
+            if count == len(records):
+                self._emit([{'entity_type': entity_type, 'id': data.get('id'),
+                             'op': 'save', 'data': dict(data)}
+                            for data in records])
+            elif count:
+                # Only some were stored: report those now holding the data
+                given = {data.get('id'): data for data in records}
+                self._emit([event for event in
+                            self._current(entity_type, list(given), 'save')
+                            if matches_filters(event['data'],
+                                               given[event['id']])])
+            return count
+
+    def update_many(self, entity_type: str,
+                    updates: Dict[str, Dict[str, Any]]) -> int:
+        """Update several entities and emit one event per updated record"""
+        with self._lock:
+            count = self.repository.update_many(entity_type, updates)
+            if count:
+                self._emit(self._current(entity_type, updates, 'update'))
+            return count
+
+    def delete_many(self, entity_type: str, entity_ids: Iterable[str]) -> int:
+        """Delete several entities and emit one event per deleted record"""
+        entity_ids = list(dict.fromkeys(entity_ids))
+        with self._lock:
+            if len(entity_ids) == 1:
+                stored = {entity_id for entity_id in entity_ids
+                          if self.repository.exists(entity_type, entity_id)}
+            else:
+                # One pass over the IDs instead of an exists() per ID
+                stored = {item['id'] for item in
+                          self.repository.iter_all(entity_type, ['id'])}
+            present = [entity_id for entity_id in entity_ids
+                       if entity_id in stored]
+            count = self.repository.delete_many(entity_type, present)
+            if count:
+                self._emit([{'entity_type': entity_type, 'id': entity_id,
+                             'op': 'delete', 'data': None}
+                            for entity_id in present])
+            return count
+
+    def clear_all(self, entity_type: str) -> bool:
+        """Clear an entity type and emit a single 'clear' event"""
+        with self._lock:
+            if not self.repository.clear_all(entity_type):
+                return False
+            self._emit([{'entity_type': entity_type, 'id': None,
+                         'op': 'clear', 'data': None}])
+            return True
+
+    # Reads go straight to the wrapped repository
+
+    def load_all(self, entity_type: str,
+                 fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Load all entities"""
+        return self.repository.load_all(entity_type, fields)
+
+    def iter_all(self, entity_type: str,
+                 fields: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Stream all entities"""
+        return self.repository.iter_all(entity_type, fields)
+
+    def load_by_id(self, entity_type: str, entity_id: str) -> Optional[Dict[str, Any]]:
+        """Load single entity by ID"""
+        return self.repository.load_by_id(entity_type, entity_id)
+
+    def load_by_filter(self, entity_type: str, filters: Dict[str, Any],
+                      fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Load entities matching filters"""
+        return self.repository.load_by_filter(entity_type, filters, fields)
+
+    def exists(self, entity_type: str, entity_id: str) -> bool:
+        """Check if entity exists"""
+        return self.repository.exists(entity_type, entity_id)
+
+    def get_count(self, entity_type: str) -> int:
+        """Count entities"""
+        return self.repository.get_count(entity_type)
+
+    def is_empty(self, entity_type: str) -> bool:
+        """Check whether no entities are stored"""
+        return self.repository.is_empty(entity_type)
+
+    def get_metadata(self, entity_type: str) -> Dict[str, int]:
+        """Count and generation of the wrapped repository"""
+        return self.repository.get_metadata(entity_type)
+
+    def get_version(self, entity_type: str) -> Tuple[int, Any]:
+        """Write version of the wrapped repository"""
+        return self.repository.get_version(entity_type)
+
+    def get_write_version(self, entity_type: str) -> Optional[Tuple[int, Any]]:
+        """Version the wrapped repository's latest write in this thread left"""
+        return self.repository.get_write_version(entity_type)
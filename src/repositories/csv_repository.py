@@ -2,26 +2,67 @@
 CSV Repository - File-based data storage using CSV format
 """
 import csv
+import io
 import os
 from pathlib import Path
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Iterable, Iterator, Tuple
 from .repository_interface import RepositoryInterface
+from .entity_table import EntityTable, DEFAULT_INDEXES, file_signature, project
+from .file_codec import (
+    check_compression, open_text, open_text_write, write_bytes
+)
+from .csv_schema import SCHEMAS, UNTYPED
+from .metadata import MetadataStore
+from .file_lock import EntityLocks, exclusive_entity, shared_entity
 
 
 class CSVRepository(RepositoryInterface):
     """CSV file-based repository implementation"""
     
-    def __init__(self, data_dir: str = "data"):
-        """Initialize CSV repository with data directory"""
+    def __init__(self, data_dir: str = "data", cache: bool = False,
+                 indexes: Optional[Dict[str, Iterable[str]]] = None,
+                 compression: Optional[str] = None,
+                 locking: bool = False, thread_safe: bool = False):
+        """Initialize CSV repository with data directory
+        
+        Args:
+            data_dir: Directory for data files
+            cache: Keep parsed, indexed entity tables in memory and only
+                re-read a file when its mtime/size/inode changes
+            indexes: Fields per entity type to keep secondary indexes on
+                for load_by_filter (defaults to DEFAULT_INDEXES)
+            compression: None, "gzip" or "zlib"; files of any encoding
+                are always readable
+            locking: Share the data directory safely between processes:
+                reads take a shared fcntl lock, read-modify-write
+                operations an exclusive one, and files are replaced
+                atomically (POSIX only)
+            thread_safe: Allow calls from many threads: reads of an entity
+                type run concurrently, writes to it one at a time
+        """
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
+        self.indexes = dict(DEFAULT_INDEXES if indexes is None else indexes)
+        self.compression = check_compression(compression)
         
-        # Define CSV headers for each entity type
-        self.headers = {
-            'products': ['id', 'name', 'price', 'category', 'stock', 'description'],
-            'users': ['id', 'username', 'email', 'role', 'created_at'],
-            'cart': ['user_id', 'product_id', 'quantity', 'price']
-        }
+        # Typed column schema and CSV headers for each entity type
+        self.schemas = dict(SCHEMAS)
+        self.headers = {entity_type: schema.headers
+                        for entity_type, schema in self.schemas.items()}
+        
+        # Optional in-memory cache: entity_type -> EntityTable
+        self.cache_enabled = cache
+        self._cache: Dict[str, EntityTable] = {}
+        self.cache_hits = 0
+        self.cache_misses = 0
+        
+        # Record count / generation sidecars kept current by every write
+        self._meta = MetadataStore(self.data_dir)
+        
+        # Optional per-entity reader/writer locks for threads and, in
+        # multi-process mode, <entity>.lock files
+        self._locks = EntityLocks(self.data_dir, processes=locking,
+                                  threads=thread_safe)
     
     def _get_file_path(self, entity_type: str) -> Path:
         """Get CSV file path for entity type"""
@@ -37,88 +78,208 @@ class CSVRepository(RepositoryInterface):
                 if entity_type in self.headers:
                     writer.writerow(self.headers[entity_type])
     
+    def _iter_file(self, entity_type: str,
+                   fields: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Stream converted rows of a CSV file one at a time
+        
+        With ``fields`` only those columns are extracted and converted.
+        """
+        file_path = self._get_file_path(entity_type)
+        
+        if not file_path.exists():
+            return
+        
+        with open_text(file_path, newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            if header is None:
+                return
+            width = len(header)
+            # Column positions and converters are resolved once per file
+            convert = self.schemas.get(entity_type, UNTYPED).reader_for(
+                header, fields)
+            
+            for values in reader:
+                if not values:
+                    continue
+                if len(values) < width:
+                    values = values + [None] * (width - len(values))
+                yield convert(values)
+    
+    def _read_file(self, entity_type: str) -> List[Dict[str, Any]]:
+        """Read and convert all rows of a CSV file"""
+        return list(self._iter_file(entity_type))
+    
+    def _cached_table(self, entity_type: str) -> Optional[EntityTable]:
+        """Get the cached table if it still matches the file, else None"""
+        cached = self._cache.get(entity_type)
+        if cached is None:
+            return None
+        signature = file_signature(self._get_file_path(entity_type))
+        if signature is None or cached.signature != signature:
+            return None
+        self.cache_hits += 1
+        return cached
+    
+    def _hand_out(self, record: Dict[str, Any]) -> Dict[str, Any]:
+        """Copy a cached record so callers cannot modify the cache"""
+        return dict(record) if self.cache_enabled else record
+    
+    def _new_table(self, entity_type: str, records: List[Dict[str, Any]],
+                   signature=None) -> EntityTable:
+        """Wrap rows in a table with the entity's declared indexes"""
+        return EntityTable(records, signature,
+                           self.indexes.get(entity_type, ()))
+    
+    def _load_table(self, entity_type: str) -> EntityTable:
+        """Load indexed rows (served from cache when still valid)"""
+        with self._locks.shared(entity_type):
+            return self._load_table_unlocked(entity_type)
+    
+    def _load_table_unlocked(self, entity_type: str) -> EntityTable:
+        """Load indexed rows without taking the entity lock"""
+        if not self.cache_enabled:
+            return self._new_table(entity_type, self._read_file(entity_type))
+        
+        cached = self._cached_table(entity_type)
+        if cached is not None:
+            return cached
+        
+        self.cache_misses += 1
+        signature = file_signature(self._get_file_path(entity_type))
+        table = self._new_table(entity_type, self._read_file(entity_type),
+                                signature)
+        if signature is not None:
+            self._cache[entity_type] = table
+        else:
+            self._cache.pop(entity_type, None)
+        return table
+    
+    def _write_rows(self, f, entity_type: str,
+                    records: List[Dict[str, Any]]) -> None:
+        """Write header and rows to an open text stream"""
+        schema = self.schemas.get(entity_type)
+        if schema is None:
+            return
+        
+        writer = csv.writer(f)
+        writer.writerow(schema.headers)
+        writer.writerows(map(schema.writer, records))
+    
+    def _write_table(self, entity_type: str, table: EntityTable):
+        """Write all rows back to file (write-through when caching)"""
+        file_path = self._get_file_path(entity_type)
+        
+        try:
+            if self.compression is None and not self._locks.enabled:
+                with open(file_path, 'w', newline='', encoding='utf-8') as f:
+                    self._write_rows(f, entity_type, table.records)
+            else:
+                buffer = io.StringIO(newline='')
+                self._write_rows(buffer, entity_type, table.records)
+                write_bytes(file_path, buffer.getvalue().encode('utf-8'),
+                            self.compression, atomic=self._locks.enabled)
+        except Exception:
+            # Cached table may have been modified before the failed write
+            self._cache.pop(entity_type, None)
+            raise
+        
+        signature = file_signature(file_path)
+        self._meta.record_write(entity_type, len(table), signature)
+        if self.cache_enabled:
+            table.signature = signature
+            if table.signature is not None:
+                self._cache[entity_type] = table
+    
+    @exclusive_entity
     def save(self, entity_type: str, data: Dict[str, Any]) -> bool:
         """Save entity data to CSV file"""
         try:
             self._ensure_file_exists(entity_type)
-            file_path = self._get_file_path(entity_type)
             
             # Read existing data
-            existing_data = self.load_all(entity_type)
+            table = self._load_table(entity_type)
             
             # Check if entity already exists (update) or new (append)
-            entity_id = data.get('id')
-            updated = False
-            
-            for i, row in enumerate(existing_data):
-                if row.get('id') == entity_id:
-                    existing_data[i] = data
-                    updated = True
-                    break
-            
-            if not updated:
-                existing_data.append(data)
+            pos = table.position_of(data.get('id'))
+            if pos is not None:
+                table.replace(pos, dict(data))
+            else:
+                table.append(dict(data))
             
             # Write all data back to file
-            with open(file_path, 'w', newline='', encoding='utf-8') as f:
-                if existing_data and entity_type in self.headers:
-                    writer = csv.DictWriter(f, fieldnames=self.headers[entity_type])
-                    writer.writeheader()
-                    writer.writerows(existing_data)
+            self._write_table(entity_type, table)
             
             return True
         except Exception as e:
             print(f"Error saving to CSV: {e}")
             return False
     
-    def load_all(self, entity_type: str) -> List[Dict[str, Any]]:
-        """Load all entities from CSV file"""
-        try:
-            file_path = self._get_file_path(entity_type)
+    def _iter_rows(self, entity_type: str,
+                   fields: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Rows from the current cached table, or streamed from the file"""
+        with self._locks.shared(entity_type):
+            cached = self._cached_table(entity_type)
+            if cached is None and self.cache_enabled:
+                cached = self._load_table(entity_type)
+            if cached is None:
+                return self._iter_file(entity_type, fields)
             
-            if not file_path.exists():
-                return []
-            
-            data = []
-            with open(file_path, 'r', encoding='utf-8') as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    # Convert numeric fields
-                    if entity_type == 'products':
-                        if 'price' in row:
-                            row['price'] = float(row['price'])
-                        if 'stock' in row:
-                            row['stock'] = int(row['stock'])
-                    elif entity_type == 'cart':
-                        if 'quantity' in row:
-                            row['quantity'] = int(row['quantity'])
-                        if 'price' in row:
-                            row['price'] = float(row['price'])
-                    
-                    data.append(row)
-            
-            return data
+            # Copy so callers never modify the cached list or rows
+            records = list(cached.records)
+        if fields is None:
+            return (self._hand_out(row) for row in records)
+        return (project(row, fields) for row in records)
+    
+    def load_all(self, entity_type: str,
+                 fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Load all entities from CSV file (optionally only some columns)"""
+        try:
+            return list(self._iter_rows(entity_type, fields))
         except Exception as e:
             print(f"Error loading from CSV: {e}")
             return []
     
+    def iter_all(self, entity_type: str,
+                 fields: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Stream entities from CSV without materializing the file"""
+        try:
+            yield from self._iter_rows(entity_type, fields)
+        except Exception as e:
+            print(f"Error loading from CSV: {e}")
+    
+    @shared_entity
     def load_by_id(self, entity_type: str, entity_id: str) -> Optional[Dict[str, Any]]:
         """Load single entity by ID from CSV"""
-        all_data = self.load_all(entity_type)
-        
-        for item in all_data:
-            if item.get('id') == entity_id:
-                return item
-        
-        return None
+        try:
+            record = self._load_table(entity_type).get(entity_id)
+            return None if record is None else self._hand_out(record)
+        except Exception as e:
+            print(f"Error loading from CSV: {e}")
+            return None
     
-    def load_by_filter(self, entity_type: str, 
-                      filters: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Load entities matching filters from CSV"""
-        all_data = self.load_all(entity_type)
+    def load_by_filter(self, entity_type: str, filters: Dict[str, Any],
+                      fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Load entities matching filters from CSV (optionally only some columns)"""
+        if filters and None not in filters.values() and self.cache_enabled:
+            try:
+                # Uses a secondary index when a filter key is indexed
+                with self._locks.shared(entity_type):
+                    results = self._load_table(entity_type).find(filters)
+            except Exception as e:
+                print(f"Error loading from CSV: {e}")
+                return []
+            if fields is not None:
+                return [project(row, fields) for row in results]
+            return [self._hand_out(row) for row in results]
+        
+        # Only decode the columns needed to filter and to return
+        columns = None
+        if fields is not None:
+            columns = list(fields) + [key for key in filters if key not in fields]
         results = []
         
-        for item in all_data:
+        for item in self.iter_all(entity_type, columns):
             match = True
             for key, value in filters.items():
                 if key not in item or item[key] != value:
@@ -126,41 +287,172 @@ class CSVRepository(RepositoryInterface):
                     break
             
             if match:
-                results.append(item)
+                results.append(item if fields is None else project(item, fields))
         
         return results
     
     def update(self, entity_type: str, entity_id: str, 
               data: Dict[str, Any]) -> bool:
-        """Update entity by ID in CSV"""
-        data['id'] = entity_id
-        return self.save(entity_type, data)
+        """Update entity by ID in CSV, keeping fields not in data"""
+        return self.update_many(entity_type, {entity_id: data}) == 1
     
+    @exclusive_entity
     def delete(self, entity_type: str, entity_id: str) -> bool:
         """Delete entity by ID from CSV"""
         try:
-            all_data = self.load_all(entity_type)
+            table = self._load_table(entity_type)
             
             # Filter out the entity to delete
-            filtered_data = [item for item in all_data if item.get('id') != entity_id]
+            table.remove(entity_id)
             
             # Write filtered data back
-            file_path = self._get_file_path(entity_type)
-            with open(file_path, 'w', newline='', encoding='utf-8') as f:
-                if filtered_data and entity_type in self.headers:
-                    writer = csv.DictWriter(f, fieldnames=self.headers[entity_type])
-                    writer.writeheader()
-                    writer.writerows(filtered_data)
-                elif entity_type in self.headers:
-                    # Write just headers if no data
-                    writer = csv.writer(f)
-                    writer.writerow(self.headers[entity_type])
+            self._write_table(entity_type, table)
             
             return True
         except Exception as e:
             print(f"Error deleting from CSV: {e}")
             return False
     
+    @exclusive_entity
+    def save_many(self, entity_type: str,
+                  records: Iterable[Dict[str, Any]]) -> int:
+        """Save several entities to CSV with a single write"""
+        try:
+            self._ensure_file_exists(entity_type)
+            table = self._load_table(entity_type)
+            
+            count = 0
+            for data in records:
+                pos = table.position_of(data.get('id'))
+                if pos is not None:
+                    table.replace(pos, dict(data))
+                else:
+                    table.append(dict(data))
+                count += 1
+            
+            if count:
+                self._write_table(entity_type, table)
+            return count
+        except Exception as e:
+            print(f"Error saving to CSV: {e}")
+            return 0
+    
+    @exclusive_entity
+    def update_many(self, entity_type: str,
+                    updates: Dict[str, Dict[str, Any]]) -> int:
+        """Update several existing entities by ID in CSV with a single write"""
+        try:
+            table = self._load_table(entity_type)
+            
+            count = 0
+            for entity_id, data in updates.items():
+                pos = table.position_of(entity_id)
+                if pos is None:
+                    continue
+                # Merge: callers pass only the fields they change
+                table.update_record(pos, dict(data, id=entity_id))
+                count += 1
+            
+            if count:
+                self._write_table(entity_type, table)
+            return count
+        except Exception as e:
+            print(f"Error saving to CSV: {e}")
+            return 0
+    
+    @exclusive_entity
+    def delete_many(self, entity_type: str, entity_ids: Iterable[str]) -> int:
+        """Delete several entities by ID from CSV with a single write"""
+        try:
+            table = self._load_table(entity_type)
+            count = table.remove_many(entity_ids)
+            if count:
+                self._write_table(entity_type, table)
+            return count
+        except Exception as e:
+            print(f"Error deleting from CSV: {e}")
+            return 0
+    
+    @shared_entity
     def exists(self, entity_type: str, entity_id: str) -> bool:
         """Check if entity exists in CSV"""
         return self.load_by_id(entity_type, entity_id) is not None
+    
+    @exclusive_entity
+    def replace_all(self, entity_type: str,
+                    records: Iterable[Dict[str, Any]],
+                    chunk_size: int = 1000) -> int:
+        """Stream rows into a new CSV file that replaces the current one"""
+        schema = self.schemas.get(entity_type)
+        if schema is None:
+            print(f"Error writing CSV: no headers for {entity_type}")
+            return 0
+        
+        file_path = self._get_file_path(entity_type)
+        temp_path = file_path.with_name(file_path.name + '.tmp')
+        count = 0
+        try:
+            with open_text_write(temp_path, self.compression,
+                                 newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(schema.headers)
+                for record in records:
+                    writer.writerow(schema.writer(record))
+                    count += 1
+            os.replace(temp_path, file_path)
+        except Exception as e:
+            print(f"Error writing CSV: {e}")
+            if temp_path.exists():
+                temp_path.unlink()
+            return 0
+        
+        self._cache.pop(entity_type, None)
+        self._meta.record_write(entity_type, count, file_signature(file_path))
+        return count
+    
+    def get_metadata(self, entity_type: str) -> Dict[str, int]:
+        """Get row count and write generation without parsing the file"""
+        meta = self._current_meta(entity_type)
+        return {'count': meta['count'], 'generation': meta['generation']}
+    
+    def _current_meta(self, entity_type: str) -> Dict[str, Any]:
+        """Sidecar of the current file
+        
+        Falls back to one full read when the sidecar is missing or was
+        written for different file contents.
+        """
+        signature = file_signature(self._get_file_path(entity_type))
+        meta = self._meta.read(entity_type, signature)
+        if meta is None:
+            with self._locks.exclusive(entity_type):
+                signature = file_signature(self._get_file_path(entity_type))
+                table = self._load_table(entity_type)
+                meta = self._meta.record_write(entity_type, len(table),
+                                               signature)
+        return meta
+
+    def get_version(self, entity_type: str) -> Tuple[int, Any]:
+        """Sidecar generation and file signature (a stat while current)"""
+        return MetadataStore.version(self._current_meta(entity_type))
+    
+    def get_write_version(self, entity_type: str) -> Optional[Tuple[int, Any]]:
+        """Version left by this thread's latest write of the entity type"""
+        meta = self._meta.last_written(entity_type)
+        return None if meta is None else MetadataStore.version(meta)
+    
+    def get_count(self, entity_type: str) -> int:
+        """Get count of entities (utility method)"""
+        return self.get_metadata(entity_type)['count']
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get cache hit/miss counters (utility method)"""
+        return {
+            'enabled': self.cache_enabled,
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'cached_entities': sorted(self._cache.keys())
+        }
+    
+    def clear_cache(self) -> None:
+        """Drop all cached entity tables (utility method)"""
+        self._cache.clear()
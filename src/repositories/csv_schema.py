@@ -0,0 +1,100 @@
+"""
+CSV Schema - Typed column registry with prebuilt row converters
+"""
+from operator import itemgetter
+from typing import Callable, Dict, List, Any, Optional, Sequence, Tuple
+
+RowReader = Callable[[Sequence[str]], Dict[str, Any]]
+RowWriter = Callable[[Dict[str, Any]], List[Any]]
+
+
+def _build_reader(columns: Sequence[Tuple[int, str, Callable]]) -> RowReader:
+    """Build one function turning a csv.reader row into a record dict
+    
+    The positions are picked with one itemgetter and zipped with the
+    column names; only the typed (non-str) columns are then converted, so
+    per row there is no header lookup and no per-field dispatch.
+    """
+    names = [name for _, name, _ in columns]
+    positions = [pos for pos, _, _ in columns]
+    typed = [(name, converter) for _, name, converter in columns
+             if converter is not str]
+    if not positions:
+        return lambda row: {}
+    if len(positions) == 1:
+        position = positions[0]
+        pick = lambda row: (row[position],)
+    else:
+        pick = itemgetter(*positions)
+
+    def read_row(row: Sequence[str]) -> Dict[str, Any]:
+        record = dict(zip(names, pick(row)))
+        for name, converter in typed:
+            record[name] = converter(record[name])
+        return record
+
+    return read_row
+
+
+class CSVSchema:
+    """Ordered, typed columns of one entity type"""
+
+    def __init__(self, columns: Sequence[Tuple[str, Callable]]):
+        """Create schema from (column name, converter) pairs"""
+        self.columns = list(columns)
+        self.headers = [name for name, _ in self.columns]
+        self._types = dict(self.columns)
+        self._readers: Dict[tuple, RowReader] = {}
+        self.writer = self._build_writer()
+
+    def reader_for(self, header: Sequence[str],
+                   fields: Optional[Sequence[str]] = None) -> RowReader:
+        """Get the converter for a file header (built once per layout)
+        
+        Column positions come from the header actually found in the file;
+        columns the schema does not know are kept as strings. With
+        ``fields`` only those columns are extracted and converted.
+        """
+        key = (tuple(header), tuple(fields) if fields is not None else None)
+        if key not in self._readers:
+            wanted = set(header if fields is None else fields)
+            self._readers[key] = _build_reader([
+                (pos, name, self._types.get(name, str))
+                for pos, name in enumerate(header) if name in wanted
+            ])
+        return self._readers[key]
+
+    def _build_writer(self) -> RowWriter:
+        """Build the record -> row function used when writing"""
+        headers = self.headers
+        fields = set(headers)
+
+        def write_row(record: Dict[str, Any]) -> List[Any]:
+            # Same contract as csv.DictWriter: unknown fields are an error
+            if not fields.issuperset(record):
+                wrong = ", ".join(repr(k) for k in record if k not in fields)
+                raise ValueError(f"dict contains fields not in fieldnames: {wrong}")
+            return [record.get(name, '') for name in headers]
+
+        return write_row
+
+
+# Registered schemas: column order is the on-disk header order
+SCHEMAS: Dict[str, CSVSchema] = {
+    'products': CSVSchema([
+        ('id', str), ('name', str), ('price', float),
+        ('category', str), ('stock', int), ('description', str)
+    ]),
+    'users': CSVSchema([
+        ('id', str), ('username', str), ('email', str),
+        ('role', str), ('created_at', str)
+    ]),
+    'cart': CSVSchema([
+        ('user_id', str), ('product_id', str),
+        ('quantity', int), ('price', float)
+    ])
+}
+
+
+# Fallback for entity types without a schema: every column is a string
+UNTYPED = CSVSchema([])
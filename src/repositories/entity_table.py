@@ -0,0 +1,188 @@
+"""
+Entity Table - In-memory records of one entity type with ID and field indexes
+"""
+from bisect import insort
+from pathlib import Path
+from typing import List, Dict, Optional, Any, Tuple, Iterable
+
+# Equality fields resolved through load_by_filter on hot paths
+# (login/registration by username, browsing by category, admin by role)
+DEFAULT_INDEXES: Dict[str, Tuple[str, ...]] = {
+    'users': ('username', 'role'),
+    'products': ('category',)
+}
+
+
+def file_signature(file_path: Path) -> Optional[Tuple[int, int, int]]:
+    """Get (mtime, size, inode) of a file, or None if missing"""
+    try:
+        stat = file_path.stat()
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def project(record: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    """Copy only the requested fields of a record (missing ones omitted)"""
+    return {field: record[field] for field in fields if field in record}
+
+
+def matches_filters(record: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+    """Check a record against equality filters (missing key == None)"""
+    for key, value in filters.items():
+        if record.get(key) != value:
+            return False
+    return True
+
+
+class EntityTable:
+    """Ordered list of records plus primary-key and secondary hash indexes
+    
+    The primary index maps id -> position. Each secondary index maps a
+    field value -> ascending list of positions of the records holding it.
+    Secondary indexes are built by the first find() on an indexed field,
+    so tables that are read once and dropped never pay for them.
+    """
+
+    def __init__(self, records: List[Dict[str, Any]],
+                 signature: Optional[Tuple[int, int, int]] = None,
+                 indexed_fields: Iterable[str] = ()):
+        """Wrap loaded records and build the primary index"""
+        self.records = records
+        self.signature = signature
+        self.indexed_fields = tuple(indexed_fields)
+        self._positions: Dict[Any, int] = {}
+        # None until a find() needs the secondary indexes
+        self._field_indexes: Optional[Dict[str, Dict[Any, List[int]]]] = None
+        self.reindex()
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def reindex(self) -> None:
+        """Rebuild the primary index (first occurrence of an id wins)
+
+        Secondary indexes are dropped and rebuilt when next needed.
+        """
+        positions: Dict[Any, int] = {}
+        for pos, record in enumerate(self.records):
+            entity_id = record.get('id')
+            if entity_id is not None and entity_id not in positions:
+                positions[entity_id] = pos
+        self._positions = positions
+        self._field_indexes = None
+
+    def _secondary_indexes(self) -> Dict[str, Dict[Any, List[int]]]:
+        """Secondary indexes, built on first use"""
+        if self._field_indexes is None:
+            self._field_indexes = {field: {} for field in self.indexed_fields}
+            for pos, record in enumerate(self.records):
+                self._index_record(pos, record)
+        return self._field_indexes
+
+    def _index_record(self, pos: int, record: Dict[str, Any]) -> None:
+        """Add a record's field values to the secondary indexes"""
+        for field, index in (self._field_indexes or {}).items():
+            value = record.get(field)
+            if value is None:
+                continue
+            try:
+                insort(index.setdefault(value, []), pos)
+            except TypeError:
+                continue  # Unhashable values are only found by scanning
+
+    def _unindex_record(self, pos: int, record: Dict[str, Any]) -> None:
+        """Remove a record's field values from the secondary indexes"""
+        for field, index in (self._field_indexes or {}).items():
+            value = record.get(field)
+            try:
+                bucket = index.get(value)
+            except TypeError:
+                continue
+            if bucket and pos in bucket:
+                bucket.remove(pos)
+                if not bucket:
+                    del index[value]
+
+    def position_of(self, entity_id: Any) -> Optional[int]:
+        """Get list position of an entity, or None"""
+        return self._positions.get(entity_id)
+
+    def get(self, entity_id: Any) -> Optional[Dict[str, Any]]:
+        """Get record by ID in constant time"""
+        pos = self._positions.get(entity_id)
+        return self.records[pos] if pos is not None else None
+
+    def contains(self, entity_id: Any) -> bool:
+        """Check if an ID is present"""
+        return entity_id in self._positions
+
+    def find(self, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Get records matching equality filters, in storage order
+        
+        Uses the most selective secondary index among the filter keys and
+        falls back to a full scan when no filter key is indexed.
+        """
+        field_indexes = {}
+        if any(key in self.indexed_fields for key in filters):
+            field_indexes = self._secondary_indexes()
+
+        candidates = None
+        for key, value in filters.items():
+            index = field_indexes.get(key)
+            if index is None or value is None:
+                continue
+            try:
+                bucket = index.get(value, [])
+            except TypeError:
+                continue
+            if candidates is None or len(bucket) < len(candidates):
+                candidates = bucket
+
+        if candidates is None:
+            return [record for record in self.records
+                    if matches_filters(record, filters)]
+
+        records = self.records
+        return [records[pos] for pos in candidates
+                if matches_filters(records[pos], filters)]
+
+    def append(self, record: Dict[str, Any]) -> None:
+        """Append a record and index it"""
+        self.records.append(record)
+        pos = len(self.records) - 1
+        entity_id = record.get('id')
+        if entity_id is not None and entity_id not in self._positions:
+            self._positions[entity_id] = pos
+        self._index_record(pos, record)
+
+    def replace(self, pos: int, record: Dict[str, Any]) -> None:
+        """Replace the record at a position"""
+        old = self.records[pos]
+        self._unindex_record(pos, old)
+        self.records[pos] = record
+        if old.get('id') != record.get('id'):
+            self.reindex()
+        else:
+            self._index_record(pos, record)
+
+    def update_record(self, pos: int, changes: Dict[str, Any]) -> None:
+        """Merge changes into the record at a position"""
+        merged = dict(self.records[pos])
+        merged.update(changes)
+        self.replace(pos, merged)
+
+    def remove(self, entity_id: Any) -> bool:
+        """Remove all records with an ID, keeping storage order"""
+        return self.remove_many([entity_id]) > 0
+
+    def remove_many(self, entity_ids: Iterable[Any]) -> int:
+        """Remove all records with any of the IDs in one pass"""
+        doomed = {entity_id for entity_id in entity_ids
+                  if entity_id in self._positions}
+        if not doomed:
+            return 0
+        self.records = [record for record in self.records
+                        if record.get('id') not in doomed]
+        self.reindex()
+        return len(doomed)
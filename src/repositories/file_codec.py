@@ -0,0 +1,145 @@
+"""
+File Codec - Optional compression for repository data files
+"""
+import gzip
+import io
+import os
+import zlib
+from pathlib import Path
+from typing import Optional, TextIO
+
+COMPRESSIONS = (None, 'gzip', 'zlib')
+
+_GZIP_MAGIC = b'\x1f\x8b'
+# zlib headers for the default window size at every compression level;
+# none of them can start JSON or CSV text
+_ZLIB_HEADERS = (b'\x78\x01', b'\x78\x5e', b'\x78\x9c', b'\x78\xda')
+
+
+def check_compression(compression: Optional[str]) -> Optional[str]:
+    """Validate a compression option"""
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Unsupported compression: {compression}")
+    return compression
+
+
+def sniff_compression(head: bytes) -> Optional[str]:
+    """Detect compression from the first bytes of a file"""
+    if head.startswith(_GZIP_MAGIC):
+        return 'gzip'
+    if head[:2] in _ZLIB_HEADERS:
+        return 'zlib'
+    return None
+
+
+def compress(raw: bytes, compression: Optional[str]) -> bytes:
+    """Compress bytes for storage"""
+    if compression == 'gzip':
+        return gzip.compress(raw, compresslevel=6)
+    if compression == 'zlib':
+        return zlib.compress(raw, 6)
+    return raw
+
+
+def decompress(raw: bytes) -> bytes:
+    """Decompress stored bytes of any supported encoding"""
+    compression = sniff_compression(raw[:2])
+    if compression == 'gzip':
+        return gzip.decompress(raw)
+    if compression == 'zlib':
+        return zlib.decompress(raw)
+    return raw
+
+
+class _ZlibReader(io.RawIOBase):
+    """Incrementally inflate a zlib stream from a binary file"""
+
+    def __init__(self, raw_file, chunk_size: int = 64 * 1024):
+        self._file = raw_file
+        self._chunk_size = chunk_size
+        self._inflater = zlib.decompressobj()
+        self._pending = b''
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            chunk = self._file.read(self._chunk_size)
+            if not chunk:
+                self._pending = self._inflater.flush()
+                break
+            self._pending = self._inflater.decompress(chunk)
+        size = min(len(buffer), len(self._pending))
+        buffer[:size] = self._pending[:size]
+        self._pending = self._pending[size:]
+        return size
+
+    def close(self) -> None:
+        self._file.close()
+        super().close()
+
+
+class _ZlibWriter(io.RawIOBase):
+    """Incrementally deflate written bytes into a binary file"""
+
+    def __init__(self, raw_file):
+        self._file = raw_file
+        self._deflater = zlib.compressobj(6)
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._file.write(self._deflater.compress(bytes(data)))
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            self._file.write(self._deflater.flush())
+            self._file.close()
+        super().close()
+
+
+def open_text(file_path: Path, newline: Optional[str] = None) -> TextIO:
+    """Open a data file for streaming text reads, whatever its encoding"""
+    raw_file = open(file_path, 'rb')
+    compression = sniff_compression(raw_file.peek(2)[:2])
+    if compression == 'gzip':
+        raw_file.close()
+        stream = gzip.open(file_path, 'rb')
+    elif compression == 'zlib':
+        stream = io.BufferedReader(_ZlibReader(raw_file))
+    else:
+        stream = raw_file
+    return io.TextIOWrapper(stream, encoding='utf-8', newline=newline)
+
+
+def write_bytes(file_path: Path, raw: bytes,
+                compression: Optional[str], atomic: bool = False) -> None:
+    """Write (optionally compressed) bytes to a data file
+
+    With ``atomic`` the bytes go to a temporary file that then replaces the
+    data file, so concurrent readers see either the old or the new file.
+    """
+    if not atomic:
+        with open(file_path, 'wb') as f:
+            f.write(compress(raw, compression))
+        return
+
+    temp_path = file_path.with_name(file_path.name + '.tmp')
+    with open(temp_path, 'wb') as f:
+        f.write(compress(raw, compression))
+    os.replace(temp_path, file_path)
+
+
+def open_text_write(file_path: Path, compression: Optional[str],
+                    newline: Optional[str] = None) -> TextIO:
+    """Open a data file for streaming text writes in the given encoding"""
+    if compression == 'gzip':
+        stream = gzip.open(file_path, 'wb', compresslevel=6)
+    elif compression == 'zlib':
+        stream = io.BufferedWriter(_ZlibWriter(open(file_path, 'wb')))
+    else:
+        stream = open(file_path, 'wb')
+    return io.TextIOWrapper(stream, encoding='utf-8', newline=newline)
@@ -0,0 +1,198 @@
+"""
+File Lock - Reader/writer locks shared between threads and processes
+"""
+import functools
+import threading
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Dict, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows
+    fcntl = None
+
+
+class FileLock:
+    """fcntl lock on a dedicated ``<entity>.lock`` file
+
+    Data files are replaced atomically, which gives them a new inode, so
+    the lock lives on a separate file that is never replaced. The lock file
+    is opened per acquisition so that forked processes never share a lock.
+    """
+
+    def __init__(self, path: Path):
+        if fcntl is None:
+            raise RuntimeError("File locking requires fcntl (POSIX only)")
+        self.path = Path(path)
+        self._file = None
+
+    def lock(self, exclusive: bool) -> None:
+        """Block until the lock is held shared or exclusive"""
+        lock_file = open(self.path, 'a+b')
+        try:
+            fcntl.flock(lock_file.fileno(),
+                        fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        except BaseException:
+            lock_file.close()
+            raise
+        self._file = lock_file
+
+    def unlock(self) -> None:
+        """Release the lock"""
+        fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._file.close()
+        self._file = None
+
+
+class EntityLock:
+    """Reentrant reader/writer lock for one entity type
+
+    Many threads may read at once; a writer waits for them to finish and
+    new readers wait behind a waiting writer so writes are not starved.
+    A thread may nest reads and writes inside its own write, or reads
+    inside its own read, but cannot upgrade a read to a write. With a
+    FileLock the process takes the matching fcntl lock while any thread
+    holds this one.
+    """
+
+    def __init__(self, file_lock: Optional[FileLock] = None):
+        self.file_lock = file_lock
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = None
+        self._write_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def shared(self) -> Iterator[None]:
+        """Hold the lock for reading"""
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer == me:
+                # Reading inside our own write keeps the write lock
+                self._write_depth += 1
+                nested_write = True
+            else:
+                nested_write = False
+                depth = getattr(self._local, 'depth', 0)
+                if depth == 0:
+                    while self._writer is not None or self._waiting_writers:
+                        self._condition.wait()
+                    if self._readers == 0 and self.file_lock:
+                        self.file_lock.lock(False)
+                    self._readers += 1
+                self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                if nested_write:
+                    self._write_depth -= 1
+                else:
+                    self._local.depth -= 1
+                    if self._local.depth == 0:
+                        self._readers -= 1
+                        if self._readers == 0:
+                            if self.file_lock:
+                                self.file_lock.unlock()
+                            self._condition.notify_all()
+
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        """Hold the lock for writing"""
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer == me:
+                self._write_depth += 1
+            elif getattr(self._local, 'depth', 0):
+                # Waiting here would deadlock against our own read
+                raise RuntimeError("Cannot upgrade a read lock to a write lock")
+            else:
+                self._waiting_writers += 1
+                try:
+                    while self._writer is not None or self._readers:
+                        self._condition.wait()
+                finally:
+                    self._waiting_writers -= 1
+                if self.file_lock:
+                    try:
+                        self.file_lock.lock(True)
+                    except BaseException:
+                        self._condition.notify_all()
+                        raise
+                self._writer = me
+                self._write_depth = 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._write_depth -= 1
+                if self._write_depth == 0:
+                    self._writer = None
+                    if self.file_lock:
+                        self.file_lock.unlock()
+                    self._condition.notify_all()
+
+
+class EntityLocks:
+    """One EntityLock per entity type, or no-op locks when disabled
+
+    ``threads`` coordinates threads of this process; ``processes`` also
+    takes fcntl locks on ``<entity>.lock`` files for other processes.
+    """
+
+    def __init__(self, data_dir: Path, processes: bool = False,
+                 threads: bool = False):
+        if processes and fcntl is None:
+            raise RuntimeError("File locking requires fcntl (POSIX only)")
+        self.data_dir = Path(data_dir)
+        self.processes = processes
+        self.enabled = processes or threads
+        self._locks: Dict[str, EntityLock] = {}
+
+    def _get(self, entity_type: str) -> EntityLock:
+        """Get the lock for an entity type"""
+        lock = self._locks.get(entity_type)
+        if lock is None:
+            file_lock = None
+            if self.processes:
+                file_lock = FileLock(self.data_dir / f"{entity_type}.lock")
+            # setdefault is atomic, so racing threads end up sharing one
+            lock = self._locks.setdefault(entity_type, EntityLock(file_lock))
+        return lock
+
+    def shared(self, entity_type: str):
+        """Context manager holding the entity's lock for reading"""
+        if not self.enabled:
+            return nullcontext()
+        return self._get(entity_type).shared()
+
+    def exclusive(self, entity_type: str):
+        """Context manager holding the entity's lock for writing"""
+        if not self.enabled:
+            return nullcontext()
+        return self._get(entity_type).exclusive()
+
+
+def shared_entity(method):
+    """Run a repository method under the shared lock of its entity type
+
+    The decorated method takes ``entity_type`` as its first argument and
+    the repository keeps an EntityLocks instance in ``self._locks``.
+    """
+    @functools.wraps(method)
+    def wrapper(self, entity_type, *args, **kwargs):
+        with self._locks.shared(entity_type):
+            return method(self, entity_type, *args, **kwargs)
+    return wrapper
+
+
+def exclusive_entity(method):
+    """Run a repository method under the exclusive lock of its entity type"""
+    @functools.wraps(method)
+    def wrapper(self, entity_type, *args, **kwargs):
+        with self._locks.exclusive(entity_type):
+            return method(self, entity_type, *args, **kwargs)
+    return wrapper
@@ -0,0 +1,346 @@
+"""
+Instrumented Repository - Call, latency and file I/O counters for any repository
+"""
+import bisect
+import os
+import sys
+import threading
+import time
+from typing import List, Dict, Optional, Any, Callable, Iterable, Iterator, Tuple
+
+from .repository_interface import RepositoryInterface
+
+# Upper bounds of the latency histogram buckets; slower calls land in a
+# final open-ended bucket
+LATENCY_BUCKETS_MS = (0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000)
+
+# Calls currently being measured on this thread: [(repository, entity_type)]
+_active = threading.local()
+_hook_lock = threading.Lock()
+_hook_installed = False
+
+
+def _audit(event: str, args: tuple) -> None:
+    """Attribute file opens and renames to the call that made them
+
+    Runs for every audit event in the process once installed, so anything
+    outside a measured call returns after one lookup.
+    """
+    if event != 'open' and event != 'os.rename':
+        return
+    calls = getattr(_active, 'calls', None)
+    if calls:
+        repository, entity_type = calls[-1]
+        if event == 'open':
+            repository._file_opened(entity_type, args[0], args[1])
+        else:
+            repository._file_renamed(args[0], args[1])
+
+
+def _install_audit_hook() -> None:
+    """Install the process-wide audit hook on first use (it cannot be removed)"""
+    global _hook_installed
+    with _hook_lock:
+        if not _hook_installed:
+            sys.addaudithook(_audit)
+            _hook_installed = True
+
+
+def _file_size(path: str) -> int:
+    """Size of a file, 0 if it does not exist (yet)"""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+class InstrumentedRepository(RepositoryInterface):
+    """Wraps a repository and measures what every call costs
+
+    Per method it counts calls and keeps a latency histogram; per entity
+    type it counts the files opened and the bytes read and written while
+    serving those calls, including which files were opened how often.
+    Bytes read are the sizes of files opened for reading (the backends
+    read whole files); bytes written are how much each file opened for
+    writing grew, or its final size when it was recreated. SQLite does its
+    file I/O below Python, so only its calls and latencies are recorded.
+
+    With ``enabled`` False calls go straight through; set it at any time.
+    Methods not part of the repository interface (close(), compact(), ...)
+    are passed to the wrapped repository unmeasured.
+    """
+
+    def __init__(self, repository: RepositoryInterface, enabled: bool = True):
+        """Initialize instrumentation around a repository
+
+        Args:
+            repository: Repository that stores the data
+            enabled: Start measuring immediately
+        """
+        self.repository = repository
+        data_dir = getattr(repository, 'data_dir', None)
+        # Only files inside the data directory count (not lazy imports)
+        self._data_dir = (os.path.join(os.path.abspath(data_dir), '')
+                          if data_dir is not None else None)
+        self._stats_lock = threading.Lock()
+        self._enabled = False
+        self.reset()
+        self.enabled = enabled
+
+    @property
+    def enabled(self) -> bool:
+        """Whether calls are being measured"""
+        return self._enabled
+
+    @enabled.setter
+    def enabled(self, value: bool) -> None:
+        if value:
+            _install_audit_hook()
+        self._enabled = value
+
+    def __getattr__(self, name: str) -> Any:
+        """Pass backend-specific utilities through to the repository"""
+        return getattr(self.repository, name)
+
+    # Recording
+
+    def reset(self) -> None:
+        """Forget everything measured so far"""
+        with self._stats_lock:
+            # method -> {'calls', 'total_ms', 'max_ms', 'histogram'}
+            self._methods: Dict[str, Dict[str, Any]] = {}
+            # entity_type -> {'file_opens', 'bytes_read', 'bytes_written',
+            #                 'files': {file name: opens}}
+            self._entities: Dict[str, Dict[str, Any]] = {}
+            self._writes: Dict[str, List[Any]] = {}
+
+    def _entity(self, entity_type: str) -> Dict[str, Any]:
+        """I/O counters of an entity type (stats lock held)"""
+        if entity_type not in self._entities:
+            self._entities[entity_type] = {'file_opens': 0, 'bytes_read': 0,
+                                           'bytes_written': 0, 'files': {}}
+        return self._entities[entity_type]
+
+    def _file_opened(self, entity_type: str, path: Any, mode: Any) -> None:
+        """Count an open made while serving a call for entity_type"""
+        if isinstance(path, int):
+            return  # Re-opened descriptor, already counted
+        path = os.path.abspath(os.fsdecode(path))
+        if self._data_dir and not path.startswith(self._data_dir):
+            return
+        mode = mode or ''
+        with self._stats_lock:
+            stats = self._entity(entity_type)
+            stats['file_opens'] += 1
+            name = os.path.basename(path)
+            stats['files'][name] = stats['files'].get(name, 0) + 1
+            if mode.startswith('r') and '+' not in mode:
+                stats['bytes_read'] += _file_size(path)
+            elif mode.startswith('a') or '+' in mode:
+                # Appends count what the file grows by
+                self._writes[path] = [entity_type, _file_size(path)]
+            else:
+                self._writes[path] = [entity_type, 0]
+
+    def _file_renamed(self, source: Any, destination: Any) -> None:
+        """Follow a temp file written during the call to its final name"""
+        source = os.path.abspath(os.fsdecode(source))
+        with self._stats_lock:
+            if source in self._writes:
+                self._writes[os.path.abspath(os.fsdecode(destination))] = \
+                    self._writes.pop(source)
+
+    def _finish_writes(self) -> None:
+        """Add the growth of files opened for writing to their entity type"""
+        with self._stats_lock:
+            writes, self._writes = self._writes, {}
+            for path, (entity_type, size_before) in writes.items():
+                grown = _file_size(path) - size_before
+                if grown > 0:
+                    self._entity(entity_type)['bytes_written'] += grown
+
+    def _record_call(self, method: str, elapsed_ms: float) -> None:
+        """Count a call and place its latency in the histogram"""
+        with self._stats_lock:
+            stats = self._methods.get(method)
+            if stats is None:
+                stats = self._methods[method] = {
+                    'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'histogram': [0] * (len(LATENCY_BUCKETS_MS) + 1)}
+            stats['calls'] += 1
+            stats['total_ms'] += elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            stats['histogram'][bisect.bisect_left(LATENCY_BUCKETS_MS,
+                                                  elapsed_ms)] += 1
+
+    def _measure(self, method: str, entity_type: str,
+                 func: Callable[..., Any], *args) -> Any:
+        """Run one repository call, measuring it when enabled"""
+        if not self._enabled:
+            return func(*args)
+
+        calls = getattr(_active, 'calls', None)
+        if calls is None:
+            calls = _active.calls = []
+        calls.append((self, entity_type))
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            calls.pop()
+            self._finish_writes()
+            self._record_call(method, elapsed_ms)
+
+    def _measure_iter(self, entity_type: str,
+                      iterator: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Stream records, measuring only the time spent producing them"""
+        calls = getattr(_active, 'calls', None)
+        if calls is None:
+            calls = _active.calls = []
+        elapsed = 0.0
+        try:
+            while True:
+                calls.append((self, entity_type))
+                start = time.perf_counter()
+                try:
+                    record = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    elapsed += time.perf_counter() - start
+                    calls.pop()
+                yield record
+        finally:
+            self._finish_writes()
+            self._record_call('iter_all', elapsed * 1000)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Snapshot of all counters
+
+        Returns {'methods': {method: {'calls', 'total_ms', 'avg_ms',
+        'max_ms', 'histogram': [(upper bound in ms or None, calls)]}},
+        'entities': {entity_type: {'file_opens', 'bytes_read',
+        'bytes_written', 'files'}}}.
+        """
+        bounds = list(LATENCY_BUCKETS_MS) + [None]
+        with self._stats_lock:
+            methods = {
+                method: {
+                    'calls': stats['calls'],
+                    'total_ms': stats['total_ms'],
+                    'avg_ms': stats['total_ms'] / stats['calls'],
+                    'max_ms': stats['max_ms'],
+                    'histogram': list(zip(bounds, stats['histogram']))
+                }
+                for method, stats in sorted(self._methods.items())
+            }
+            entities = {
+                entity_type: dict(stats, files=dict(stats['files']))
+                for entity_type, stats in sorted(self._entities.items())
+            }
+        return {'methods': methods, 'entities': entities}
+
+    # Interface methods, each measured
+
+    def save(self, entity_type: str, data: Dict[str, Any]) -> bool:
+        """Save entity"""
+        return self._measure('save', entity_type, self.repository.save,
+                             entity_type, data)
+
+    def load_all(self, entity_type: str,
+                 fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Load all entities"""
+        return self._measure('load_all', entity_type, self.repository.load_all,
+                             entity_type, fields)
+
+    def iter_all(self, entity_type: str,
+                 fields: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Stream all entities"""
+        iterator = iter(self.repository.iter_all(entity_type, fields))
+        if not self._enabled:
+            return iterator
+        return self._measure_iter(entity_type, iterator)
+
+    def load_by_id(self, entity_type: str, entity_id: str) -> Optional[Dict[str, Any]]:
+        """Load single entity by ID"""
+        return self._measure('load_by_id', entity_type,
+                             self.repository.load_by_id, entity_type, entity_id)
+
+    def load_by_filter(self, entity_type: str, filters: Dict[str, Any],
+                      fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Load entities matching filters"""
+        return self._measure('load_by_filter', entity_type,
+                             self.repository.load_by_filter,
+                             entity_type, filters, fields)
+
+    def update(self, entity_type: str, entity_id: str,
+              data: Dict[str, Any]) -> bool:
+        """Update entity by ID"""
+        return self._measure('update', entity_type, self.repository.update,
+                             entity_type, entity_id, data)
+
+    def delete(self, entity_type: str, entity_id: str) -> bool:
+        """Delete entity by ID"""
+        return self._measure('delete', entity_type, self.repository.delete,
+                             entity_type, entity_id)
+
+    def exists(self, entity_type: str, entity_id: str) -> bool:
+        """Check if entity exists"""
+        return self._measure('exists', entity_type, self.repository.exists,
+                             entity_type, entity_id)
+
+    def save_many(self, entity_type: str,
+                  records: Iterable[Dict[str, Any]]) -> int:
+        """Save several entities"""
+        return self._measure('save_many', entity_type,
+                             self.repository.save_many, entity_type, records)
+
+    def update_many(self, entity_type: str,
+                    updates: Dict[str, Dict[str, Any]]) -> int:
+        """Update several entities"""
+        return self._measure('update_many', entity_type,
+                             self.repository.update_many, entity_type, updates)
+
+    def delete_many(self, entity_type: str, entity_ids: Iterable[str]) -> int:
+        """Delete several entities"""
+        return self._measure('delete_many', entity_type,
+                             self.repository.delete_many, entity_type,
+                             entity_ids)
+
+    def replace_all(self, entity_type: str,
+                    records: Iterable[Dict[str, Any]],
+                    chunk_size: int = 1000) -> int:
+        """Replace all entities"""
+        return self._measure('replace_all', entity_type,
+                             self.repository.replace_all, entity_type,
+                             records, chunk_size)
+
+    def clear_all(self, entity_type: str) -> bool:
+        """Clear all data for entity type"""
+        return self._measure('clear_all', entity_type,
+                             self.repository.clear_all, entity_type)
+
+    def get_count(self, entity_type: str) -> int:
+        """Count entities"""
+        return self._measure('get_count', entity_type,
+                             self.repository.get_count, entity_type)
+
+    def is_empty(self, entity_type: str) -> bool:
+        """Check whether no entities are stored"""
+        return self._measure('is_empty', entity_type,
+                             self.repository.is_empty, entity_type)
+
+    def get_metadata(self, entity_type: str) -> Dict[str, int]:
+        """Count and generation of the wrapped repository"""
+        return self._measure('get_metadata', entity_type,
+                             self.repository.get_metadata, entity_type)
+
+    def get_version(self, entity_type: str) -> Tuple[int, Any]:
+        """Write version of the wrapped repository"""
+        return self._measure('get_version', entity_type,
+                             self.repository.get_version, entity_type)
+
+    def get_write_version(self, entity_type: str) -> Optional[Tuple[int, Any]]:
+        """Version the wrapped repository's latest write in this thread left"""
+        return self.repository.get_write_version(entity_type)
@@ -0,0 +1,113 @@
+"""
+Journal - Append-only mutation log on top of a JSON snapshot file
+"""
+import json
+import zlib
+from pathlib import Path
+from typing import List, Dict, Any
+
+from src.repositories.entity_table import EntityTable
+
+
+def snapshot_fingerprint(raw: bytes) -> Dict[str, int]:
+    """Identify the exact snapshot contents a journal was written against"""
+    return {'size': len(raw), 'crc32': zlib.crc32(raw)}
+
+
+def file_fingerprint(path: Path, chunk_size: int = 1024 * 1024) -> Dict[str, int]:
+    """snapshot_fingerprint of a file, computed without reading it whole"""
+    size = crc = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            size += len(chunk)
+            crc = zlib.crc32(chunk, crc)
+    return {'size': size, 'crc32': crc}
+
+
+def replay(table: EntityTable, ops: List[Dict[str, Any]]) -> EntityTable:
+    """Apply journal records to a table in order"""
+    for op in ops:
+        kind = op.get('op')
+        if kind == 'save':
+            table.append(op['data'])
+        elif kind == 'update':
+            pos = table.position_of(op['id'])
+            if pos is not None:
+                table.update_record(pos, op['data'])
+        elif kind == 'delete':
+            table.remove(op['id'])
+    return table
+
+
+class EntityJournal:
+    """Append-only log of mutations for one entity type
+    
+    The first line is a header holding the fingerprint of the snapshot the
+    log applies to. After a compaction rewrites the snapshot, an old log no
+    longer matches and is ignored, so a crash between writing the snapshot
+    and removing the log never replays records twice.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.length = 0
+        self._torn_tail = False
+
+    def read(self, fingerprint: Dict[str, int]) -> List[Dict[str, Any]]:
+        """Read records written against the given snapshot"""
+        self.length = 0
+        self._torn_tail = False
+        if not self.path.exists():
+            return []
+
+        ops = []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                header = f.readline()
+                try:
+                    if json.loads(header).get('snapshot') != fingerprint:
+                        return []
+                except (ValueError, AttributeError):
+                    return []
+
+                for line in f:
+                    if not line.endswith('\n'):
+                        # Interrupted append; the next append starts fresh
+                        self._torn_tail = True
+                        break
+                    try:
+                        ops.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except IOError:
+            return []
+
+        self.length = len(ops)
+        return ops
+
+    def append(self, ops: List[Dict[str, Any]],
+               fingerprint: Dict[str, int]) -> None:
+        """Append records, starting a new log if none is active"""
+        lines = "".join(
+            json.dumps(op, ensure_ascii=False, separators=(',', ':')) + '\n'
+            for op in ops)
+        if self.length == 0:
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'snapshot': fingerprint}) + '\n')
+                f.write(lines)
+        else:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                if self._torn_tail:
+                    f.write('\n')
+                f.write(lines)
+        self._torn_tail = False
+        self.length += len(ops)
+
+    def reset(self) -> None:
+        """Discard the log after its records reached the snapshot"""
+        self.length = 0
+        self._torn_tail = False
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
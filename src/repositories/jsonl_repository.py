@@ -0,0 +1,301 @@
+"""
+JSON Lines Repository - Append-only storage with one JSON object per line
+"""
+import json
+import os
+from pathlib import Path
+from typing import List, Dict, Optional, Any, Iterable, Iterator, Tuple
+
+from .repository_interface import RepositoryInterface
+from .entity_table import file_signature, matches_filters, project
+from .metadata import MetadataStore
+
+# Key marking a tombstone line: {"_deleted": "<id>"}
+TOMBSTONE_KEY = '_deleted'
+
+
+class JSONLRepository(RepositoryInterface):
+    """JSON Lines file-based repository implementation
+    
+    Every write is an O(1) append to ``<entity>.jsonl``. A later line with
+    the same id replaces the earlier record in place; a tombstone line
+    deletes it. compact() rewrites the file with only the live records.
+    """
+    
+    def __init__(self, data_dir: str = "data", compact_threshold: int = 1000):
+        """Initialize JSON Lines repository with data directory
+        
+        Args:
+            data_dir: Directory for data files
+            compact_threshold: Replacement/tombstone lines appended by this
+                instance after which the entity file is compacted
+        """
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(exist_ok=True)
+        self.compact_threshold = compact_threshold
+        self._dead_lines: Dict[str, int] = {}
+        self._meta = MetadataStore(self.data_dir)
+    
+    def _get_file_path(self, entity_type: str) -> Path:
+        """Get file path for entity type"""
+        return self.data_dir / f"{entity_type}.jsonl"
+    
+    @staticmethod
+    def _encode(record: Dict[str, Any]) -> bytes:
+        """Encode one record as a compact JSON line"""
+        return (json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+                + '\n').encode('utf-8')
+    
+    def _iter_lines(self, entity_type: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """Stream (byte offset, decoded object) for every valid line"""
+        file_path = self._get_file_path(entity_type)
+        if not file_path.exists():
+            return
+        
+        with open(file_path, 'rb') as f:
+            offset = 0
+            for line in f:
+                start = offset
+                offset += len(line)
+                if not line.endswith(b'\n'):
+                    break  # Interrupted append
+                try:
+                    yield start, json.loads(line)
+                except ValueError:
+                    continue
+    
+    def _append(self, entity_type: str, records: List[Dict[str, Any]]) -> bool:
+        """Append lines in a single write"""
+        file_path = self._get_file_path(entity_type)
+        payload = b''.join(self._encode(record) for record in records)
+        try:
+            with open(file_path, 'a+b') as f:
+                # Terminate a torn last line so the new lines stay valid
+                if f.tell() > 0:
+                    f.seek(-1, os.SEEK_END)
+                    if f.read(1) != b'\n':
+                        payload = b'\n' + payload
+                f.write(payload)
+        except IOError:
+            return False
+        # Whether the lines added or replaced records is only known after
+        # a read, so the count is filled in lazily by get_metadata
+        self._meta.record_write(entity_type, None, file_signature(file_path))
+        return True
+    
+    def _record_dead(self, entity_type: str, count: int) -> None:
+        """Count superseded lines and compact once enough piled up"""
+        dead = self._dead_lines.get(entity_type, 0) + count
+        self._dead_lines[entity_type] = dead
+        if dead >= self.compact_threshold:
+            self.compact(entity_type)
+    
+    def _find(self, entity_type: str,
+              entity_ids: Iterable[Any]) -> Dict[Any, Dict[str, Any]]:
+        """Current version of each wanted ID in one pass over the file"""
+        wanted = set(entity_ids)
+        found: Dict[Any, Dict[str, Any]] = {}
+        for _, obj in self._iter_lines(entity_type):
+            if TOMBSTONE_KEY in obj:
+                found.pop(obj[TOMBSTONE_KEY], None)
+            elif obj.get('id') in wanted:
+                found[obj['id']] = obj
+        return found
+    
+    def save(self, entity_type: str, data: Dict[str, Any]) -> bool:
+        """Save entity by appending one line"""
+        return self._append(entity_type, [data])
+    
+    def iter_all(self, entity_type: str,
+                 fields: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Stream live records in storage order
+        
+        A first pass remembers, per ID, the offsets of its first and latest
+        line; the second pass yields each record at its first position using
+        its latest version. Only offsets are held in memory, never records.
+        """
+        spans: Dict[Any, Optional[List[int]]] = {}
+        for offset, obj in self._iter_lines(entity_type):
+            if TOMBSTONE_KEY in obj:
+                spans[obj[TOMBSTONE_KEY]] = None
+            elif obj.get('id') is not None:
+                span = spans.get(obj['id'])
+                if span is None:
+                    spans[obj['id']] = [offset, offset]
+                else:
+                    span[1] = offset
+        
+        file_path = self._get_file_path(entity_type)
+        if not file_path.exists():
+            return
+        with open(file_path, 'rb') as latest:
+            for offset, obj in self._iter_lines(entity_type):
+                if TOMBSTONE_KEY in obj:
+                    continue
+                entity_id = obj.get('id')
+                if entity_id is None:
+                    yield obj if fields is None else project(obj, fields)
+                    continue
+                span = spans.get(entity_id)
+                if span is None or span[0] != offset:
+                    continue
+                if span[1] != offset:
+                    latest.seek(span[1])
+                    obj = json.loads(latest.readline())
+                yield obj if fields is None else project(obj, fields)
+    
+    def load_all(self, entity_type: str,
+                 fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Load all entities of given type (optionally only some fields)"""
+        return list(self.iter_all(entity_type, fields))
+    
+    def load_by_id(self, entity_type: str, entity_id: str) -> Optional[Dict[str, Any]]:
+        """Load single entity by ID in one streaming pass"""
+        return self._find(entity_type, [entity_id]).get(entity_id)
+    
+    def load_by_filter(self, entity_type: str, filters: Dict[str, Any],
+                      fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Load entities matching filters (optionally only some fields)"""
+        return [record if fields is None else project(record, fields)
+                for record in self.iter_all(entity_type)
+                if matches_filters(record, filters)]
+    
+    def update(self, entity_type: str, entity_id: str, 
+              data: Dict[str, Any]) -> bool:
+        """Update entity by appending a replacement line"""
+        return self.update_many(entity_type, {entity_id: data}) == 1
+    
+    def delete(self, entity_type: str, entity_id: str) -> bool:
+        """Delete entity by appending a tombstone line"""
+        return self.delete_many(entity_type, [entity_id]) == 1
+    
+    def exists(self, entity_type: str, entity_id: str) -> bool:
+        """Check if entity exists"""
+        return self.load_by_id(entity_type, entity_id) is not None
+    
+    def save_many(self, entity_type: str,
+                  records: Iterable[Dict[str, Any]]) -> int:
+        """Save several entities with a single append"""
+        records = list(records)
+        if not records or not self._append(entity_type, records):
+            return 0
+        return len(records)
+    
+    def update_many(self, entity_type: str,
+                    updates: Dict[str, Dict[str, Any]]) -> int:
+        """Update several entities with one read pass and one append"""
+        current = self._find(entity_type, updates.keys())
+        replacements = []
+        for entity_id, record in current.items():
+            merged = dict(record)
+            merged.update(updates[entity_id])
+            merged['id'] = entity_id
+            replacements.append(merged)
+        
+        if not replacements or not self._append(entity_type, replacements):
+            return 0
+        self._record_dead(entity_type, len(replacements))
+        return len(replacements)
+    
+    def delete_many(self, entity_type: str, entity_ids: Iterable[str]) -> int:
+        """Delete several entities with one read pass and one append"""
+        current = self._find(entity_type, entity_ids)
+        tombstones = [{TOMBSTONE_KEY: entity_id} for entity_id in current]
+        
+        if not tombstones or not self._append(entity_type, tombstones):
+            return 0
+        self._record_dead(entity_type, len(tombstones))
+        return len(tombstones)
+    
+    def clear_all(self, entity_type: str) -> bool:
+        """Clear all data for entity type (utility method)"""
+        try:
+            file_path = self._get_file_path(entity_type)
+            file_path.write_bytes(b'')
+            self._dead_lines[entity_type] = 0
+            self._meta.record_write(entity_type, 0, file_signature(file_path))
+            return True
+        except IOError:
+            return False
+    
+    def replace_all(self, entity_type: str,
+                    records: Iterable[Dict[str, Any]],
+                    chunk_size: int = 1000) -> int:
+        """Stream records into a fresh file that replaces the current one"""
+        file_path = self._get_file_path(entity_type)
+        temp_path = file_path.with_name(file_path.name + '.tmp')
+        count = 0
+        try:
+            with open(temp_path, 'wb') as f:
+                for record in records:
+                    f.write(self._encode(record))
+                    count += 1
+            os.replace(temp_path, file_path)
+        except (IOError, TypeError, ValueError) as e:
+            print(f"Error writing {entity_type}: {e}")
+            if temp_path.exists():
+                temp_path.unlink()
+            return 0
+        
+        self._dead_lines[entity_type] = 0
+        self._meta.record_write(entity_type, count, file_signature(file_path))
+        return count
+    
+    def get_metadata(self, entity_type: str) -> Dict[str, int]:
+        """Get record count and generation, recounting only after a change
+        
+        Appends do not tell whether a line adds or replaces a record, so
+        the count is refreshed lazily the first time it is asked for after
+        an append. A file changed by anyone else also advances the
+        generation.
+        """
+        signature = file_signature(self._get_file_path(entity_type))
+        meta = self._meta.read(entity_type, signature)
+        if meta is None or meta['count'] is None:
+            count = sum(1 for _ in self.iter_all(entity_type, ['id']))
+            if meta is None:
+                meta = self._meta.record_write(entity_type, count, signature)
+            else:
+                meta = self._meta.record_count(entity_type, count, signature)
+        return {'count': meta['count'], 'generation': meta['generation']}
+    
+    def get_version(self, entity_type: str) -> Tuple[int, Any]:
+        """Sidecar generation and file signature, without recounting"""
+        signature = file_signature(self._get_file_path(entity_type))
+        meta = self._meta.read(entity_type, signature)
+        if meta is None:
+            # Changed by someone else: advance, counting later if asked
+            meta = self._meta.record_write(entity_type, None, signature)
+        return MetadataStore.version(meta)
+    
+    def get_write_version(self, entity_type: str) -> Optional[Tuple[int, Any]]:
+        """Version left by this thread's latest write of the entity type"""
+        meta = self._meta.last_written(entity_type)
+        return None if meta is None else MetadataStore.version(meta)
+    
+    def get_count(self, entity_type: str) -> int:
+        """Get count of entities (utility method)"""
+        return self.get_metadata(entity_type)['count']
+    
+    def compact(self, entity_type: str) -> bool:
+        """Rewrite the file with only live records (utility method)"""
+        file_path = self._get_file_path(entity_type)
+        if not file_path.exists():
+            return True
+        
+        temp_path = file_path.with_name(file_path.name + '.tmp')
+        count = 0
+        try:
+            with open(temp_path, 'wb') as f:
+                for record in self.iter_all(entity_type):
+                    f.write(self._encode(record))
+                    count += 1
+            os.replace(temp_path, file_path)
+        except IOError:
+            return False
+        
+        # Same records, new file: keep the generation, follow the signature
+        self._meta.record_write(entity_type, count, file_signature(file_path),
+                                advance=False)
+        self._dead_lines[entity_type] = 0
+        return True
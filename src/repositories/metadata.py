@@ -0,0 +1,115 @@
+"""
+Metadata Store - Per-entity record count and generation sidecar files
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Any, Tuple
+
+
+def _normalize(signature) -> Any:
+    """Make a file signature comparable with its JSON round trip"""
+    return json.loads(json.dumps(signature))
+
+
+class MetadataStore:
+    """Keeps ``<entity>.meta.json`` next to each entity file
+    
+    The sidecar holds the record count, a generation counter that grows
+    on every write, and the signature of the data file it describes. A
+    sidecar whose signature no longer matches the data file (e.g. after an
+    edit by a tool that does not maintain it) is treated as missing.
+    The count may be None when a write could not tell it (appends).
+    """
+
+    def __init__(self, data_dir: Path):
+        self.data_dir = Path(data_dir)
+        self._known: Dict[str, Dict[str, Any]] = {}
+        # Per thread: entity type -> metadata of its latest write
+        self._local = threading.local()
+
+    @staticmethod
+    def version(meta: Dict[str, Any]) -> Tuple[int, Any]:
+        """(generation, file signature) identifying a sidecar state"""
+        return (meta['generation'], meta['signature'])
+
+    def _get_path(self, entity_type: str) -> Path:
+        """Get sidecar path for entity type"""
+        return self.data_dir / f"{entity_type}.meta.json"
+
+    def _read_any(self, entity_type: str) -> Optional[Dict[str, Any]]:
+        """Read the sidecar regardless of whether it is current"""
+        try:
+            with open(self._get_path(entity_type), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return None
+
+    def read(self, entity_type: str, signature) -> Optional[Dict[str, Any]]:
+        """Get metadata if it describes the data file's current signature"""
+        signature = _normalize(signature)
+        meta = self._known.get(entity_type)
+        if meta is None or meta.get('signature') != signature:
+            meta = self._read_any(entity_type)
+            if meta is None or meta.get('signature') != signature:
+                return None
+            self._known[entity_type] = meta
+        return meta
+
+    def record_write(self, entity_type: str, count: int, signature,
+                     advance: bool = True) -> Dict[str, Any]:
+        """Store the count after a write and advance the generation
+
+        Call with the entity's write lock held: the generation continues
+        from the sidecar on disk, which other instances (or processes)
+        writing the same files may have advanced since we last read it.
+        A rewrite that keeps the records (compaction) passes
+        ``advance=False`` to only move the sidecar to the new file.
+        """
+        on_disk = self._read_any(entity_type) or {}
+        known = self._known.get(entity_type) or {}
+        meta = {
+            'count': count,
+            'generation': max(on_disk.get('generation', 0),
+                              known.get('generation', 0)) + int(advance),
+            'signature': _normalize(signature)
+        }
+        self._store(entity_type, meta)
+        self._written()[entity_type] = meta
+        return meta
+
+    def record_count(self, entity_type: str, count: int,
+                     signature) -> Dict[str, Any]:
+        """Fill in a count the last write left unknown (same generation)"""
+        meta = self.read(entity_type, signature)
+        if meta is None:
+            # Written again in the meantime
+            return self.record_write(entity_type, count, signature)
+        meta = dict(meta, count=count)
+        self._store(entity_type, meta)
+        return meta
+
+    def last_written(self, entity_type: str) -> Optional[Dict[str, Any]]:
+        """Metadata of the calling thread's latest write, if any"""
+        return self._written().get(entity_type)
+
+    def _written(self) -> Dict[str, Dict[str, Any]]:
+        """The calling thread's entity type -> latest write metadata"""
+        written = getattr(self._local, 'written', None)
+        if written is None:
+            written = self._local.written = {}
+        return written
+
+    def _store(self, entity_type: str, meta: Dict[str, Any]) -> None:
+        """Write the sidecar atomically and remember it"""
+        path = self._get_path(entity_type)
+        temp_path = path.with_name(path.name + '.tmp')
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(meta, f)
+            os.replace(temp_path, path)
+        except IOError:
+            # Counts fall back to a full read while the sidecar is stale
+            pass
+        self._known[entity_type] = meta
@@ -0,0 +1,333 @@
+"""
+Mirrored Repository - Primary storage with an asynchronously updated replica
+"""
+import atexit
+import queue
+import threading
+import time
+from typing import List, Dict, Optional, Any, Iterable, Iterator, Tuple
+
+from .repository_interface import RepositoryInterface
+from .entity_table import project
+
+# Change queue entries: (entity_type, kind, payload, enqueued_at) where kind
+# is 'upsert' (full record), 'delete' (entity id) or 'clear' (None)
+Change = Tuple[str, str, Any, float]
+
+
+class MirroredRepository(RepositoryInterface):
+    """Serves everything from ``primary`` and mirrors writes to ``replica``
+
+    A write returns as soon as the primary has committed it. The change is
+    then queued and a background thread applies queued changes to the
+    replica in batches, so keeping e.g. a CSV export current costs one
+    batched replica write per burst instead of one per request. Updates
+    are mirrored as the full record read back from the primary, and
+    records are cut down to the replica's CSV headers where it has them.
+    With ``entity_types`` only those are mirrored; writes to any other
+    type go to the primary alone.
+
+    ``max_pending`` bounds the lag: when that many changes are waiting,
+    writers block until the replica catches up. flush() waits for the
+    replica; close(), also run at interpreter exit, flushes and stops the
+    thread.
+    """
+
+    def __init__(self, primary: RepositoryInterface,
+                 replica: RepositoryInterface, batch_size: int = 100,
+                 max_pending: int = 10_000, flush_interval: float = 0.2,
+                 entity_types: Optional[Iterable[str]] = None):
+        """Initialize mirror and start the replication thread
+
+        Args:
+            primary: Repository that serves reads and commits writes first
+            replica: Repository that receives the same writes later
+            batch_size: Most changes applied to the replica in one batch
+            max_pending: Queued changes after which writers wait
+            flush_interval: Seconds the thread waits for more changes
+                before applying a partial batch
+            entity_types: Entity types to mirror (None: all of them)
+        """
+        self.primary = primary
+        self.replica = replica
+        self.entity_types = (None if entity_types is None
+                             else frozenset(entity_types))
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._changes: "queue.Queue[Change]" = queue.Queue(max_pending)
+        # Keeps queue order equal to primary commit order
+        self._write_lock = threading.Lock()
+        self.applied = 0
+        self.batches = 0
+        self.errors = 0
+
+        self._closed = False
+        # Set by close(); the thread stops once the queue is drained
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._replicate,
+                                        name="replica-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    # Replication
+
+    def _mirrors(self, entity_type: str) -> bool:
+        """Whether writes to an entity type reach the replica"""
+        return self.entity_types is None or entity_type in self.entity_types
+
+    def _replica_record(self, entity_type: str,
+                        record: Dict[str, Any]) -> Dict[str, Any]:
+        """Cut a record down to the replica's columns, if it declares any"""
+        headers = getattr(self.replica, 'headers', {}).get(entity_type)
+        return project(record, headers) if headers else dict(record)
+
+    def _enqueue(self, changes: List[Tuple[str, str, Any]]) -> None:
+        """Queue changes committed to the primary (blocks when full)"""
+        now = time.monotonic()
+        for entity_type, kind, payload in changes:
+            self._changes.put((entity_type, kind, payload, now))
+
+    def _next_batch(self) -> Optional[List[Change]]:
+        """Wait for changes and collect up to batch_size of them
+
+        Returns None once close() was called and nothing is left.
+        """
+        while True:
+            try:
+                first = self._changes.get(timeout=self.flush_interval)
+                break
+            except queue.Empty:
+                if self._stop.is_set():
+                    return None
+        batch = [first]
+
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                if timeout > 0:
+                    change = self._changes.get(timeout=timeout)
+                else:
+                    # Past the deadline: only take what is already queued
+                    change = self._changes.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(change)
+        return batch
+
+    def _apply(self, batch: List[Change]) -> None:
+        """Apply a batch, merging runs of the same entity type and kind"""
+        start = 0
+        while start < len(batch):
+            entity_type, kind = batch[start][0], batch[start][1]
+            end = start
+            while end < len(batch) and batch[end][:2] == (entity_type, kind):
+                end += 1
+            payloads = [change[2] for change in batch[start:end]]
+
+            try:
+                if kind == 'upsert':
+                    done = self.replica.save_many(entity_type, payloads)
+                    ok = done == len(payloads)
+                elif kind == 'delete':
+                    self.replica.delete_many(entity_type, payloads)
+                    ok = True
+                else:
+                    ok = self.replica.clear_all(entity_type)
+            except Exception as e:
+                print(f"Error writing replica: {e}")
+                ok = False
+            if not ok:
+                self.errors += 1
+            start = end
+
+    def _replicate(self) -> None:
+        """Replication thread: apply queued changes until closed"""
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            self._apply(batch)
+            self.applied += len(batch)
+            self.batches += 1
+            for _ in batch:
+                self._changes.task_done()
+
+    def get_replication_stats(self) -> Dict[str, Any]:
+        """Queued changes, age of the oldest one and replica totals"""
+        with self._changes.mutex:
+            pending = list(self._changes.queue)
+        oldest = pending[0][3] if pending else None
+        return {
+            'pending': len(pending),
+            'lag_seconds': time.monotonic() - oldest if oldest else 0.0,
+            'applied': self.applied,
+            'batches': self.batches,
+            'errors': self.errors
+        }
+
+    def flush(self) -> None:
+        """Block until every queued change has reached the replica"""
+        self._changes.join()
+
+    def close(self) -> None:
+        """Flush the replica and stop the replication thread"""
+        if self._closed:
+            return
+        self._closed = True
+        self._stop.set()
+        self._thread.join()
+        atexit.unregister(self.close)
+
+    # Writes: primary first, then queue the change for the replica
+
+    def _mirror_records(self, entity_type: str,
+                        entity_ids: Iterable[str]) -> List[Tuple[str, str, Any]]:
+        """Upsert changes carrying the primary's current records
+
+        Reads them back in one pass over the primary however many changed.
+        """
+        wanted = set(entity_ids)
+        if len(wanted) == 1:
+            record = self.primary.load_by_id(entity_type, next(iter(wanted)))
+            records = [] if record is None else [record]
+        else:
+            records = [record for record in self.primary.iter_all(entity_type)
+                       if record.get('id') in wanted]
+        return [(entity_type, 'upsert', self._replica_record(entity_type, record))
+                for record in records]
+
+    def save(self, entity_type: str, data: Dict[str, Any]) -> bool:
+        """Save to the primary and queue the record for the replica"""
+        if not self._mirrors(entity_type):
+            return self.primary.save(entity_type, data)
+        with self._write_lock:
+            if not self.primary.save(entity_type, data):
+                return False
+            self._enqueue([(entity_type, 'upsert',
+                            self._replica_record(entity_type, data))])
+            return True
+
+    def update(self, entity_type: str, entity_id: str,
+              data: Dict[str, Any]) -> bool:
+        """Update the primary and queue the updated record"""
+        if not self._mirrors(entity_type):
+            return self.primary.update(entity_type, entity_id, data)
+        with self._write_lock:
+            if not self.primary.update(entity_type, entity_id, data):
+                return False
+            self._enqueue(self._mirror_records(entity_type, [entity_id]))
+            return True
+
+    def delete(self, entity_type: str, entity_id: str) -> bool:
+        """Delete from the primary and queue the deletion"""
+        if not self._mirrors(entity_type):
+            return self.primary.delete(entity_type, entity_id)
+        with self._write_lock:
+            if not self.primary.delete(entity_type, entity_id):
+                return False
+            self._enqueue([(entity_type, 'delete', entity_id)])
+            return True
+
+    def save_many(self, entity_type: str,
+                  records: Iterable[Dict[str, Any]]) -> int:
+        """Save several entities to the primary and queue them"""
+        if not self._mirrors(entity_type):
+            return self.primary.save_many(entity_type, records)
+        records = list(records)
+        with self._write_lock:
+            count = self.primary.save_many(entity_type, records)
+            if count:
+                self._enqueue([(entity_type, 'upsert',
+                                self._replica_record(entity_type, record))
+                               for record in records])
+            return count
+
+    def update_many(self, entity_type: str,
+                    updates: Dict[str, Dict[str, Any]]) -> int:
+        """Update several entities in the primary and queue the results"""
+        if not self._mirrors(entity_type):
+            return self.primary.update_many(entity_type, updates)
+        with self._write_lock:
+            count = self.primary.update_many(entity_type, updates)
+            if count:
+                self._enqueue(self._mirror_records(entity_type, updates))
+            return count
+
+    def delete_many(self, entity_type: str, entity_ids: Iterable[str]) -> int:
+        """Delete several entities from the primary and queue the deletions"""
+        if not self._mirrors(entity_type):
+            return self.primary.delete_many(entity_type, entity_ids)
+        entity_ids = list(dict.fromkeys(entity_ids))
+        with self._write_lock:
+            if len(entity_ids) == 1:
+                stored = {entity_id for entity_id in entity_ids
+                          if self.primary.exists(entity_type, entity_id)}
+            else:
+                # One pass over the IDs instead of an exists() per ID
+                stored = {item['id'] for item in
+                          self.primary.iter_all(entity_type, ['id'])}
+            present = [entity_id for entity_id in entity_ids
+                       if entity_id in stored]
+            count = self.primary.delete_many(entity_type, present)
+            if count:
+                # Only IDs the primary held are deleted from the replica
+                self._enqueue([(entity_type, 'delete', entity_id)
+                               for entity_id in present])
+            return count
+
+    def clear_all(self, entity_type: str) -> bool:
+        """Clear the primary and queue clearing the replica"""
+        if not self._mirrors(entity_type):
+            return self.primary.clear_all(entity_type)
+        with self._write_lock:
+            if not self.primary.clear_all(entity_type):
+                return False
+            self._enqueue([(entity_type, 'clear', None)])
+            return True
+
+    # Reads are served by the primary alone
+
+    def load_all(self, entity_type: str,
+                 fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Load all entities from the primary"""
+        return self.primary.load_all(entity_type, fields)
+
+    def iter_all(self, entity_type: str,
+                 fields: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Stream entities from the primary"""
+        return self.primary.iter_all(entity_type, fields)
+
+    def load_by_id(self, entity_type: str, entity_id: str) -> Optional[Dict[str, Any]]:
+        """Load single entity from the primary"""
+        return self.primary.load_by_id(entity_type, entity_id)
+
+    def load_by_filter(self, entity_type: str, filters: Dict[str, Any],
+                      fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Load matching entities from the primary"""
+        return self.primary.load_by_filter(entity_type, filters, fields)
+
+    def exists(self, entity_type: str, entity_id: str) -> bool:
+        """Check the primary for an entity"""
+        return self.primary.exists(entity_type, entity_id)
+
+    def get_count(self, entity_type: str) -> int:
+        """Count entities in the primary"""
+        return self.primary.get_count(entity_type)
+
+    def is_empty(self, entity_type: str) -> bool:
+        """Check whether the primary has no entities"""
+        return self.primary.is_empty(entity_type)
+
+    def get_metadata(self, entity_type: str) -> Dict[str, int]:
+        """Count and generation of the primary"""
+        return self.primary.get_metadata(entity_type)
+
+    def get_version(self, entity_type: str) -> Tuple[int, Any]:
+        """Write version of the primary"""
+        return self.primary.get_version(entity_type)
+
+    def get_write_version(self, entity_type: str) -> Optional[Tuple[int, Any]]:
+        """Version the primary's latest write in this thread left"""
+        return self.primary.get_write_version(entity_type)
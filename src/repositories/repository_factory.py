@@ -1,32 +1,69 @@
 """
-Repository Factory - Choose between JSON and CSV storage
+Repository Factory - Choose between JSON, JSON Lines, CSV and SQLite storage
 """
 from .json_repository import JSONRepository
 from .csv_repository import CSVRepository
+from .sqlite_repository import SQLiteRepository
+from .jsonl_repository import JSONLRepository
+from .mirrored_repository import MirroredRepository
+
+# Entity types the CSV replica of a mirrored repository receives
+MIRRORED_ENTITY_TYPES = ('products', 'users')
 
 
 class RepositoryFactory:
     """Factory for creating repository instances"""
     
     @staticmethod
-    def create_repository(repo_type: str = "json", data_dir: str = "data"):
+    def create_repository(repo_type: str = "json", data_dir: str = "data",
+                          **options):
         """Create repository instance
         
         Args:
-            repo_type: "json" or "csv"
+            repo_type: "json", "jsonl", "csv" or "sqlite"
             data_dir: Directory for data files
+            **options: Backend options, e.g. cache=True, journal=True,
+                indent=None (compact JSON), compression="gzip"/"zlib" or
+                locking=True (multi-process access) for the JSON and CSV
+                backends
             
         Returns:
             Repository instance
         """
         if repo_type.lower() == "csv":
-            return CSVRepository(data_dir)
+            return CSVRepository(data_dir, **options)
         elif repo_type.lower() == "json":
-            return JSONRepository(data_dir)
+            return JSONRepository(data_dir, **options)
+        elif repo_type.lower() == "jsonl":
+            return JSONLRepository(data_dir, **options)
+        elif repo_type.lower() == "sqlite":
+            return SQLiteRepository(data_dir, **options)
         else:
             raise ValueError(f"Unsupported repository type: {repo_type}")
     
+    @staticmethod
+    def create_mirrored_repository(primary_type: str = "json",
+                                   data_dir: str = "data",
+                                   replica_dir: str = "data_csv",
+                                   **options) -> MirroredRepository:
+        """Create a primary repository mirrored to a CSV replica
+        
+        Args:
+            primary_type: Repository type serving reads and writes
+            data_dir: Directory for the primary's data files
+            replica_dir: Directory for the CSV replica
+            **options: Options for the primary repository
+            
+        Returns:
+            MirroredRepository instance (close() it to flush the replica)
+        """
+        primary = RepositoryFactory.create_repository(primary_type, data_dir,
+                                                      **options)
+        # Carts nest their items, which flat CSV rows cannot hold
+        return MirroredRepository(primary, CSVRepository(replica_dir),
+                                  entity_types=MIRRORED_ENTITY_TYPES)
+    
     @staticmethod
     def get_available_types():
         """Get list of available repository types"""
-        return ["json", "csv"]
+        return ["json", "jsonl", "csv", "sqlite"]
@@ -2,7 +2,7 @@
 Repository interface - Abstract base for data storage
 """
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Iterable, Iterator, Tuple
 
 
 class RepositoryInterface(ABC):
@@ -14,8 +14,9 @@ class RepositoryInterface(ABC):
         pass
     
     @abstractmethod
-    def load_all(self, entity_type: str) -> List[Dict[str, Any]]:
-        """Load all entities of given type"""
+    def load_all(self, entity_type: str,
+                 fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Load all entities of given type (optionally only some fields)"""
         pass
     
     @abstractmethod
@@ -24,9 +25,9 @@ class RepositoryInterface(ABC):
         pass
     
     @abstractmethod
-    def load_by_filter(self, entity_type: str, 
-                      filters: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Load entities matching filters"""
+    def load_by_filter(self, entity_type: str, filters: Dict[str, Any],
+                      fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Load entities matching filters (optionally only some fields)"""
         pass
     
     @abstractmethod
@@ -44,3 +45,80 @@ class RepositoryInterface(ABC):
     def exists(self, entity_type: str, entity_id: str) -> bool:
         """Check if entity exists"""
         pass
+
+    def iter_all(self, entity_type: str,
+                 fields: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Iterate over all entities (backends override to stream)"""
+        yield from self.load_all(entity_type, fields)
+
+    # Batch operations - backends override these to load and write once
+    # per batch instead of once per record
+
+    def save_many(self, entity_type: str,
+                  records: Iterable[Dict[str, Any]]) -> int:
+        """Save several entities, returning how many were saved"""
+        return sum(1 for data in records if self.save(entity_type, data))
+
+    def update_many(self, entity_type: str,
+                    updates: Dict[str, Dict[str, Any]]) -> int:
+        """Update several entities by ID, returning how many were updated"""
+        return sum(1 for entity_id, data in updates.items()
+                   if self.update(entity_type, entity_id, data))
+
+    def delete_many(self, entity_type: str, entity_ids: Iterable[str]) -> int:
+        """Delete several entities by ID, returning how many were deleted"""
+        return sum(1 for entity_id in entity_ids
+                   if self.delete(entity_type, entity_id))
+
+    def replace_all(self, entity_type: str,
+                    records: Iterable[Dict[str, Any]],
+                    chunk_size: int = 1000) -> int:
+        """Replace every stored entity with ``records``, returning the count
+
+        ``records`` may be a generator and is consumed once. Backends
+        override this to write the new contents in a single pass without
+        holding them in memory.
+        """
+        self.delete_many(entity_type,
+                         [item['id'] for item in self.iter_all(entity_type, ['id'])])
+        written = 0
+        chunk: List[Dict[str, Any]] = []
+        for record in records:
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                written += self.save_many(entity_type, chunk)
+                chunk = []
+        if chunk:
+            written += self.save_many(entity_type, chunk)
+        return written
+
+    # Metadata - backends override these to answer without a full read
+
+    def get_count(self, entity_type: str) -> int:
+        """Get number of stored entities"""
+        return sum(1 for _ in self.iter_all(entity_type, ['id']))
+
+    def is_empty(self, entity_type: str) -> bool:
+        """Check whether no entities of the given type are stored"""
+        return self.get_count(entity_type) == 0
+
+    def get_metadata(self, entity_type: str) -> Dict[str, int]:
+        """Get record count and a generation that changes on every write"""
+        return {'count': self.get_count(entity_type), 'generation': 0}
+
+    def get_version(self, entity_type: str) -> Tuple[int, Any]:
+        """Get a cheap (generation, signature) pair that changes on every write
+
+        Callers keeping derived state compare it to tell whether anyone
+        wrote the entity type since they last looked.
+        """
+        return (self.get_metadata(entity_type)['generation'], None)
+
+    def get_write_version(self, entity_type: str) -> Optional[Tuple[int, Any]]:
+        """Get the version this thread's latest write through this
+        repository produced, or None when the backend does not track it
+
+        Its generation is exactly one more than the version before that
+        write, which tells a caller whether anyone else wrote in between.
+        """
+        return None
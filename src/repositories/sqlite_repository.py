@@ -0,0 +1,442 @@
+"""
+SQLite Repository - Indexed storage using the standard library sqlite3
+"""
+import json
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import List, Dict, Optional, Any, Iterable, Iterator, Tuple
+
+from .repository_interface import RepositoryInterface
+from .entity_table import DEFAULT_INDEXES, matches_filters, project
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+class SQLiteRepository(RepositoryInterface):
+    """SQLite database repository implementation
+    
+    Each entity type gets its own table keyed by ``id``. The full record is
+    stored as JSON in ``data`` so records round-trip exactly; fields listed
+    in ``indexes`` are additionally kept in indexed columns and used to
+    answer load_by_filter in SQL.
+    
+    Any thread may call it: sqlite3 connections cannot be shared between
+    threads, so each thread opens its own on first use (readers then run
+    concurrently under WAL, writers take turns).
+    """
+    
+    def __init__(self, data_dir: str = "data", db_name: str = "webstore.db",
+                 indexes: Optional[Dict[str, Iterable[str]]] = None):
+        """Initialize SQLite repository with data directory
+        
+        Args:
+            data_dir: Directory for the database file
+            db_name: Database file name inside data_dir
+            indexes: Fields per entity type to keep in indexed columns
+                (defaults to DEFAULT_INDEXES)
+        """
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(exist_ok=True)
+        self.indexes = {
+            entity_type: tuple(fields) for entity_type, fields in
+            (DEFAULT_INDEXES if indexes is None else indexes).items()
+        }
+        
+        self.db_path = self.data_dir / db_name
+        # Per thread: its connection; all of them, for close()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        # Serializes table creation and column backfills
+        self._schema_lock = threading.Lock()
+        
+        # WAL lets readers (threads or processes) run alongside a writer
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        with self.connection:
+            # Write generation per entity type, bumped in each write
+            # transaction so readers can tell whether anything changed
+            self.connection.execute(
+                'CREATE TABLE IF NOT EXISTS _entity_meta ('
+                'entity_type TEXT PRIMARY KEY, generation INTEGER NOT NULL)')
+        self._tables: Dict[str, tuple] = {}
+        # Per thread: entity type -> generation of its latest write
+        self._written = threading.local()
+    
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """The calling thread's connection, opened on first use"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            # Only ever used by this thread; check_same_thread is off so
+            # that close() may run from any thread
+            connection = sqlite3.connect(str(self.db_path),
+                                         check_same_thread=False)
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._connections_lock:
+                self._connections.append(connection)
+        return connection
+    
+    def close(self) -> None:
+        """Close the database connections of all threads"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+    
+    def _begin_write(self) -> None:
+        """Take the write lock before reading rows that are about to be merged
+
+        sqlite3 only begins a transaction at the first write, so without
+        this two connections could both read the old row and one merge
+        would be lost.
+        """
+        self.connection.execute('BEGIN IMMEDIATE')
+    
+    @staticmethod
+    def _check_identifier(name: str) -> str:
+        """Reject names that cannot safely be used as SQL identifiers"""
+        if not _IDENTIFIER.match(name):
+            raise ValueError(f"Invalid entity or field name: {name}")
+        return name
+    
+    def _ensure_table(self, entity_type: str) -> tuple:
+        """Create the entity table and its indexes if needed"""
+        if entity_type in self._tables:
+            return self._tables[entity_type]
+        with self._schema_lock:
+            if entity_type in self._tables:
+                return self._tables[entity_type]
+            return self._create_table(entity_type)
+    
+    def _create_table(self, entity_type: str) -> tuple:
+        """Create or extend the entity table (schema lock held)"""
+        table = self._check_identifier(entity_type)
+        fields = tuple(self._check_identifier(field) for field in
+                       self.indexes.get(entity_type, ()) if field != 'id')
+        
+        with self.connection:
+            self.connection.execute(
+                f'CREATE TABLE IF NOT EXISTS "{table}" ('
+                'id TEXT PRIMARY KEY, data TEXT NOT NULL)')
+            existing = {row[1] for row in self.connection.execute(
+                f'PRAGMA table_info("{table}")')}
+            added = [field for field in fields if field not in existing]
+            for field in added:
+                self.connection.execute(
+                    f'ALTER TABLE "{table}" ADD COLUMN "{field}"')
+            for field in fields:
+                self.connection.execute(
+                    f'CREATE INDEX IF NOT EXISTS "idx_{table}_{field}" '
+                    f'ON "{table}" ("{field}")')
+            if added:
+                # Backfill columns declared after rows were written
+                rows = self.connection.execute(
+                    f'SELECT rowid, data FROM "{table}"').fetchall()
+                assignments = ", ".join(f'"{field}" = ?' for field in added)
+                self.connection.executemany(
+                    f'UPDATE "{table}" SET {assignments} WHERE rowid = ?',
+                    [self._column_values(json.loads(data), added) + [rowid]
+                     for rowid, data in rows])
+        
+        self._tables[entity_type] = fields
+        return fields
+    
+    @staticmethod
+    def _column_values(data: Dict[str, Any], fields) -> list:
+        """Values for indexed columns (non-scalars are not indexed)"""
+        values = []
+        for field in fields:
+            value = data.get(field)
+            if not isinstance(value, (str, int, float, type(None))):
+                value = None
+            values.append(value)
+        return values
+    
+    def _upsert(self, entity_type: str, data: Dict[str, Any]) -> None:
+        """Insert or replace one record, keeping its original position"""
+        fields = self._ensure_table(entity_type)
+        columns = ", ".join(['id', 'data'] + [f'"{f}"' for f in fields])
+        placeholders = ", ".join("?" * (len(fields) + 2))
+        assignments = ", ".join(['data = excluded.data'] +
+                                [f'"{f}" = excluded."{f}"' for f in fields])
+        self.connection.execute(
+            f'INSERT INTO "{entity_type}" ({columns}) '
+            f'VALUES ({placeholders}) '
+            f'ON CONFLICT(id) DO UPDATE SET {assignments}',
+            [data.get('id'), json.dumps(data, ensure_ascii=False)] +
+            self._column_values(data, fields))
+    
+    def _bump_generation(self, entity_type: str) -> None:
+        """Advance the write generation inside the current transaction"""
+        self.connection.execute(
+            'INSERT INTO _entity_meta (entity_type, generation) VALUES (?, 1) '
+            'ON CONFLICT(entity_type) DO UPDATE SET generation = generation + 1',
+            (entity_type,))
+        # The transaction holds the write lock, so nobody else's bump can
+        # come between ours and this read
+        if not hasattr(self._written, 'generations'):
+            self._written.generations = {}
+        self._written.generations[entity_type] = \
+            self._read_generation(entity_type)
+    
+    def _read_generation(self, entity_type: str) -> int:
+        """Current write generation of an entity type"""
+        row = self.connection.execute(
+            'SELECT generation FROM _entity_meta WHERE entity_type = ?',
+            (entity_type,)).fetchone()
+        return row[0] if row else 0
+    
+    def save(self, entity_type: str, data: Dict[str, Any]) -> bool:
+        """Save entity data to database"""
+        try:
+            with self.connection:
+                self._upsert(entity_type, data)
+                self._bump_generation(entity_type)
+            return True
+        except sqlite3.Error as e:
+            print(f"Error saving to SQLite: {e}")
+            return False
+    
+    def load_all(self, entity_type: str,
+                 fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Load all entities in insertion order (optionally only some fields)"""
+        return list(self.iter_all(entity_type, fields))
+    
+    def iter_all(self, entity_type: str,
+                 fields: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Stream entities from a cursor in insertion order"""
+        try:
+            self._ensure_table(entity_type)
+            rows = self.connection.execute(
+                f'SELECT data FROM "{entity_type}" ORDER BY rowid')
+            for (data,) in rows:
+                record = json.loads(data)
+                yield record if fields is None else project(record, fields)
+        except sqlite3.Error as e:
+            print(f"Error loading from SQLite: {e}")
+    
+    def load_by_id(self, entity_type: str, entity_id: str) -> Optional[Dict[str, Any]]:
+        """Load single entity by primary key"""
+        try:
+            self._ensure_table(entity_type)
+            row = self.connection.execute(
+                f'SELECT data FROM "{entity_type}" WHERE id = ?',
+                (entity_id,)).fetchone()
+            return json.loads(row[0]) if row else None
+        except sqlite3.Error as e:
+            print(f"Error loading from SQLite: {e}")
+            return None
+    
+    def load_by_filter(self, entity_type: str, filters: Dict[str, Any],
+                      fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Load entities matching filters (indexed columns filter in SQL)"""
+        try:
+            columns = self._ensure_table(entity_type)
+            clauses, params = [], []
+            for key, value in filters.items():
+                if (key in columns or key == 'id') and \
+                        isinstance(value, (str, int, float, type(None))):
+                    clauses.append(f'"{key}" IS ?')
+                    params.append(value)
+            
+            where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+            rows = self.connection.execute(
+                f'SELECT data FROM "{entity_type}"{where} ORDER BY rowid',
+                params)
+            # Re-check in Python for exact (type-sensitive) equality and
+            # for keys that have no column
+            return [record if fields is None else project(record, fields)
+                    for record in (json.loads(data) for (data,) in rows)
+                    if matches_filters(record, filters)]
+        except sqlite3.Error as e:
+            print(f"Error loading from SQLite: {e}")
+            return []
+    
+    def update(self, entity_type: str, entity_id: str, 
+              data: Dict[str, Any]) -> bool:
+        """Update entity by ID (merges fields like the JSON backend)"""
+        try:
+            self._ensure_table(entity_type)
+            with self.connection:
+                self._begin_write()
+                row = self.connection.execute(
+                    f'SELECT data FROM "{entity_type}" WHERE id = ?',
+                    (entity_id,)).fetchone()
+                if row is None:
+                    return False
+                record = json.loads(row[0])
+                record.update(data)
+                record['id'] = entity_id
+                self._upsert(entity_type, record)
+                self._bump_generation(entity_type)
+            return True
+        except sqlite3.Error as e:
+            print(f"Error updating SQLite: {e}")
+            return False
+    
+    def delete(self, entity_type: str, entity_id: str) -> bool:
+        """Delete entity by ID"""
+        try:
+            self._ensure_table(entity_type)
+            with self.connection:
+                cursor = self.connection.execute(
+                    f'DELETE FROM "{entity_type}" WHERE id = ?', (entity_id,))
+                if cursor.rowcount > 0:
+                    self._bump_generation(entity_type)
+            return cursor.rowcount > 0
+        except sqlite3.Error as e:
+            print(f"Error deleting from SQLite: {e}")
+            return False
+    
+    def exists(self, entity_type: str, entity_id: str) -> bool:
+        """Check if entity exists"""
+        try:
+            self._ensure_table(entity_type)
+            row = self.connection.execute(
+                f'SELECT 1 FROM "{entity_type}" WHERE id = ?',
+                (entity_id,)).fetchone()
+            return row is not None
+        except sqlite3.Error as e:
+            print(f"Error reading SQLite: {e}")
+            return False
+    
+    def save_many(self, entity_type: str,
+                  records: Iterable[Dict[str, Any]]) -> int:
+        """Save several entities in one transaction"""
+        try:
+            count = 0
+            with self.connection:
+                for data in records:
+                    self._upsert(entity_type, data)
+                    count += 1
+                if count:
+                    self._bump_generation(entity_type)
+            return count
+        except sqlite3.Error as e:
+            print(f"Error saving to SQLite: {e}")
+            return 0
+    
+    def update_many(self, entity_type: str,
+                    updates: Dict[str, Dict[str, Any]]) -> int:
+        """Update several entities by ID in one transaction"""
+        try:
+            count = 0
+            self._ensure_table(entity_type)
+            with self.connection:
+                self._begin_write()
+                for entity_id, data in updates.items():
+                    row = self.connection.execute(
+                        f'SELECT data FROM "{entity_type}" WHERE id = ?',
+                        (entity_id,)).fetchone()
+                    if row is None:
+                        continue
+                    record = json.loads(row[0])
+                    record.update(data)
+                    record['id'] = entity_id
+                    self._upsert(entity_type, record)
+                    count += 1
+                if count:
+                    self._bump_generation(entity_type)
+            return count
+        except sqlite3.Error as e:
+            print(f"Error updating SQLite: {e}")
+            return 0
+    
+    def delete_many(self, entity_type: str, entity_ids: Iterable[str]) -> int:
+        """Delete several entities by ID in one transaction"""
+        try:
+            self._ensure_table(entity_type)
+            with self.connection:
+                cursor = self.connection.executemany(
+                    f'DELETE FROM "{entity_type}" WHERE id = ?',
+                    [(entity_id,) for entity_id in set(entity_ids)])
+                if cursor.rowcount > 0:
+                    self._bump_generation(entity_type)
+            return max(cursor.rowcount, 0)
+        except sqlite3.Error as e:
+            print(f"Error deleting from SQLite: {e}")
+            return 0
+    
+    def clear_all(self, entity_type: str) -> bool:
+        """Clear all data for entity type (utility method)"""
+        try:
+            self._ensure_table(entity_type)
+            with self.connection:
+                self.connection.execute(f'DELETE FROM "{entity_type}"')
+                self._bump_generation(entity_type)
+            return True
+        except sqlite3.Error as e:
+            print(f"Error clearing SQLite: {e}")
+            return False
+    
+    def replace_all(self, entity_type: str,
+                    records: Iterable[Dict[str, Any]],
+                    chunk_size: int = 1000) -> int:
+        """Replace all rows in one transaction, inserting chunk by chunk"""
+        try:
+            fields = self._ensure_table(entity_type)
+            columns = ", ".join(['id', 'data'] + [f'"{f}"' for f in fields])
+            placeholders = ", ".join("?" * (len(fields) + 2))
+            assignments = ", ".join(['data = excluded.data'] +
+                                    [f'"{f}" = excluded."{f}"' for f in fields])
+            insert = (f'INSERT INTO "{entity_type}" ({columns}) '
+                      f'VALUES ({placeholders}) '
+                      f'ON CONFLICT(id) DO UPDATE SET {assignments}')
+            
+            count = 0
+            with self.connection:
+                self.connection.execute(f'DELETE FROM "{entity_type}"')
+                chunk = []
+                for data in records:
+                    chunk.append([data.get('id'),
+                                  json.dumps(data, ensure_ascii=False)] +
+                                 self._column_values(data, fields))
+                    if len(chunk) >= chunk_size:
+                        self.connection.executemany(insert, chunk)
+                        count += len(chunk)
+                        chunk = []
+                if chunk:
+                    self.connection.executemany(insert, chunk)
+                    count += len(chunk)
+                self._bump_generation(entity_type)
+            return count
+        except sqlite3.Error as e:
+            print(f"Error writing SQLite: {e}")
+            return 0
+    
+    def get_count(self, entity_type: str) -> int:
+        """Get count of entities (utility method)"""
+        try:
+            self._ensure_table(entity_type)
+            return self.connection.execute(
+                f'SELECT COUNT(*) FROM "{entity_type}"').fetchone()[0]
+        except sqlite3.Error as e:
+            print(f"Error reading SQLite: {e}")
+            return 0
+    
+    def is_empty(self, entity_type: str) -> bool:
+        """Check for any row without counting them all"""
+        try:
+            self._ensure_table(entity_type)
+            return self.connection.execute(
+                f'SELECT 1 FROM "{entity_type}" LIMIT 1').fetchone() is None
+        except sqlite3.Error as e:
+            print(f"Error reading SQLite: {e}")
+            return True
+    
+    def get_metadata(self, entity_type: str) -> Dict[str, int]:
+        """Get record count and write generation"""
+        return {'count': self.get_count(entity_type),
+                'generation': self._read_generation(entity_type)}
+    
+    def get_version(self, entity_type: str) -> Tuple[int, Any]:
+        """Write generation from its own row: no COUNT(*), no table scan"""
+        return (self._read_generation(entity_type), None)
+    
+    def get_write_version(self, entity_type: str) -> Optional[Tuple[int, Any]]:
+        """Version left by this thread's latest write of the entity type"""
+        generation = getattr(self._written, 'generations', {}).get(entity_type)
+        return None if generation is None else (generation, None)
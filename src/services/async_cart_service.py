@@ -0,0 +1,204 @@
+"""
+Async Cart Service - Shopping cart operations for asyncio applications
+"""
+import asyncio
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.models.cart import Cart
+from src.utils.id_allocator import IDAllocator, ULIDAllocator
+from src.utils.keyed_locks import AsyncKeyedLocks
+
+
+class AsyncCartService:
+    """Async counterpart of CartService on an AsyncProductService
+
+    Each user's cart is guarded by its own lock, so thousands of shopper
+    coroutines only wait for each other when they share a cart. Saving
+    carts.json happens in a background task: changes made while a save is
+    running are written together by one follow-up save.
+    """
+
+    def __init__(self, product_service, data_dir: str = "data",
+                 id_allocator: Optional[IDAllocator] = None):
+        """Initialize service with async product service and data directory"""
+        self.product_service = product_service
+        self.id_allocator = id_allocator or ULIDAllocator()
+        self.active_carts: Dict[str, Cart] = {}
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(exist_ok=True)
+        self.cart_file = self.data_dir / "carts.json"
+
+        self._cart_locks = AsyncKeyedLocks()
+        self._save_task: Optional[asyncio.Future] = None
+        self._dirty = False
+
+    def _snapshot(self) -> dict:
+        """Serializable copy of all active carts"""
+        return {
+            user_id: {
+                'user_id': cart.user_id,
+                'created_at': cart.created_at.isoformat(),
+                'items': [item.to_dict() for item in cart.items]
+            }
+            for user_id, cart in self.active_carts.items()
+        }
+
+    def _write_carts(self, cart_data: dict) -> None:
+        """Write carts to disk (runs in a worker thread)"""
+        try:
+            with open(self.cart_file, 'w', encoding='utf-8') as f:
+                json.dump(cart_data, f, indent=2)
+        except (IOError, OSError, ValueError) as e:
+            print(f"Warning: Failed to save carts: {e}")
+
+    async def _save_loop(self) -> None:
+        """Save until no change is left unsaved"""
+        while self._dirty:
+            self._dirty = False
+            # Snapshot on the loop thread, write off it
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._write_carts, self._snapshot())
+
+    def _schedule_save(self) -> None:
+        """Request a save without waiting for it"""
+        self._dirty = True
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.ensure_future(self._save_loop())
+
+    async def save_all_carts(self) -> None:
+        """Save all carts and wait until they are on disk"""
+        self._schedule_save()
+        await self._save_task
+
+    def get_cart(self, user_id: str) -> Cart:
+        """Get or create cart for user"""
+        if user_id not in self.active_carts:
+            self.active_carts[user_id] = Cart(user_id)
+        return self.active_carts[user_id]
+
+    async def add_to_cart(self, user_id: str, product_id: str,
+                          quantity: int = 1) -> bool:
+        """Add product to user's cart"""
+        async with self._cart_locks.hold(user_id):
+            product = await self.product_service.get_product_by_id(product_id)
+            if not product:
+                return False
+            if not product.is_available or product.stock < quantity:
+                return False
+
+            success = self.get_cart(user_id).add_item(
+                product_id=product.id,
+                product_name=product.name,
+                price=product.price,
+                quantity=quantity
+            )
+            if success:
+                self._schedule_save()
+            return success
+
+    async def remove_from_cart(self, user_id: str, product_id: str) -> bool:
+        """Remove product from user's cart"""
+        async with self._cart_locks.hold(user_id):
+            success = self.get_cart(user_id).remove_item(product_id)
+            if success:
+                self._schedule_save()
+            return success
+
+    async def update_cart_item_quantity(self, user_id: str, product_id: str,
+                                        new_quantity: int) -> bool:
+        """Update quantity of item in cart"""
+        if new_quantity < 0:
+            return False
+
+        async with self._cart_locks.hold(user_id):
+            product = await self.product_service.get_product_by_id(product_id)
+            if product and new_quantity > product.stock:
+                return False
+            return self.get_cart(user_id).update_item_quantity(product_id,
+                                                               new_quantity)
+
+    async def clear_cart(self, user_id: str) -> bool:
+        """Clear all items from user's cart"""
+        async with self._cart_locks.hold(user_id):
+            self.get_cart(user_id).clear()
+            self._schedule_save()
+            return True
+
+    def get_cart_summary(self, user_id: str) -> dict:
+        """Get cart summary with totals (no I/O needed)"""
+        cart = self.get_cart(user_id)
+        return {
+            'user_id': user_id,
+            'items': [item.to_dict() for item in cart.items],
+            'total_amount': cart.get_total(),
+            'item_count': cart.get_item_count(),
+            'is_empty': cart.is_empty()
+        }
+
+    async def _validate_cart_stock(self, cart: Cart) -> dict:
+        """Check every cart item against current stock"""
+        products = await asyncio.gather(*(
+            self.product_service.get_product_by_id(item.product_id)
+            for item in cart.items))
+        issues = []
+
+        for item, product in zip(cart.items, products):
+            if not product:
+                issues.append(f"Product {item.product_name} no longer exists")
+            elif not product.is_available:
+                issues.append(f"Product {item.product_name} is out of stock")
+            elif product.stock < item.quantity:
+                issues.append(
+                    f"Only {product.stock} of {item.product_name} available, "
+                    f"but {item.quantity} in cart"
+                )
+
+        return {
+            'valid': len(issues) == 0,
+            'issues': issues
+        }
+
+    async def validate_cart_stock(self, user_id: str) -> dict:
+        """Validate that all cart items are still available"""
+        async with self._cart_locks.hold(user_id):
+            return await self._validate_cart_stock(self.get_cart(user_id))
+
+    async def checkout(self, user_id: str) -> Optional[dict]:
+        """Process checkout for user's cart"""
+        async with self._cart_locks.hold(user_id):
+            cart = self.get_cart(user_id)
+            if cart.is_empty():
+                return None
+
+            validation = await self._validate_cart_stock(cart)
+            if not validation['valid']:
+                return {
+                    'success': False,
+                    'error': 'Stock validation failed',
+                    'issues': validation['issues']
+                }
+
+            order_summary = {
+                'order_id': self.id_allocator.allocate('ORD'),
+                'user_id': user_id,
+                'items': [item.to_dict() for item in cart.items],
+                'total_amount': cart.get_total(),
+                'item_count': cart.get_item_count(),
+                'status': 'completed',
+                'created_at': cart.created_at.isoformat()
+            }
+
+            # Each decrement reads and writes under the product's lock
+            for item in cart.items:
+                await self.product_service.adjust_stock(item.product_id,
+                                                        -item.quantity)
+
+            cart.clear()
+            self._schedule_save()
+
+            return {
+                'success': True,
+                'order': order_summary
+            }
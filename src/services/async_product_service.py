@@ -0,0 +1,108 @@
+"""
+Async Product Service - Product operations for asyncio applications
+"""
+from typing import List, Optional
+
+from src.models.product import Product
+from src.repositories.async_repository import AsyncRepositoryInterface
+from src.utils.id_allocator import IDAllocator, ULIDAllocator
+from src.utils.keyed_locks import AsyncKeyedLocks
+
+
+class AsyncProductService:
+    """Async counterpart of ProductService on an async repository"""
+
+    def __init__(self, repository: AsyncRepositoryInterface,
+                 id_allocator: Optional[IDAllocator] = None):
+        """Initialize service with async repository and ID allocator"""
+        self.repository = repository
+        self.id_allocator = id_allocator or ULIDAllocator()
+        # Read-modify-write on one product runs one coroutine at a time
+        self._product_locks = AsyncKeyedLocks()
+
+    async def create_product(self, name: str, price: float, category: str,
+                             stock: int = 0,
+                             description: str = "") -> Optional[Product]:
+        """Create a new product with validation"""
+        try:
+            product = Product(
+                id=self.id_allocator.allocate('PRD'),
+                name=name,
+                price=price,
+                category=category,
+                stock=stock,
+                description=description
+            )
+        except ValueError as e:
+            print(f"Error creating product: {e}")
+            return None
+
+        if await self.repository.save('products', product.to_dict()):
+            return product
+        return None
+
+    async def get_all_products(self) -> List[Product]:
+        """Get all products"""
+        data = await self.repository.load_all('products')
+        return [Product.from_dict(item) for item in data]
+
+    async def get_product_by_id(self, product_id: str) -> Optional[Product]:
+        """Get product by ID"""
+        data = await self.repository.load_by_id('products', product_id)
+        return Product.from_dict(data) if data else None
+
+    async def get_products_by_category(self, category: str) -> List[Product]:
+        """Get all products in a category"""
+        data = await self.repository.load_by_filter('products',
+                                                    {'category': category})
+        return [Product.from_dict(item) for item in data]
+
+    async def search_products(self, query: str) -> List[Product]:
+        """Search products by name or description"""
+        query_lower = query.lower()
+        return [product for product in await self.get_all_products()
+                if query_lower in product.name.lower() or
+                query_lower in product.description.lower()]
+
+    async def get_categories(self) -> List[str]:
+        """Get all unique categories"""
+        data = await self.repository.load_all('products', ['category'])
+        return sorted(set(item['category'] for item in data))
+
+    async def update_product(self, product_id: str, **kwargs) -> bool:
+        """Update product fields"""
+        async with self._product_locks.hold(product_id):
+            current_product = await self.get_product_by_id(product_id)
+            if not current_product:
+                return False
+
+            # Validate new data by creating temporary product
+            try:
+                test_data = current_product.to_dict()
+                test_data.update(kwargs)
+                Product.from_dict(test_data)
+            except ValueError:
+                return False
+
+            return await self.repository.update('products', product_id, kwargs)
+
+    async def update_stock(self, product_id: str, new_stock: int) -> bool:
+        """Update product stock level"""
+        if new_stock < 0:
+            return False
+        async with self._product_locks.hold(product_id):
+            return await self.repository.update('products', product_id,
+                                                {'stock': new_stock})
+
+    async def adjust_stock(self, product_id: str, delta: int) -> bool:
+        """Add ``delta`` (negative to take) to a product's current stock"""
+        async with self._product_locks.hold(product_id):
+            product = await self.get_product_by_id(product_id)
+            if not product or product.stock + delta < 0:
+                return False
+            return await self.repository.update(
+                'products', product_id, {'stock': product.stock + delta})
+
+    async def delete_product(self, product_id: str) -> bool:
+        """Delete a product"""
+        return await self.repository.delete('products', product_id)
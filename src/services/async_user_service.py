@@ -0,0 +1,85 @@
+"""
+Async User Service - User operations for asyncio applications
+"""
+from typing import List, Optional
+
+from src.models.user import User
+from src.repositories.async_repository import AsyncRepositoryInterface
+from src.utils.id_allocator import IDAllocator, ULIDAllocator
+from src.utils.keyed_locks import AsyncKeyedLocks
+
+
+class AsyncUserService:
+    """Async counterpart of UserService on an async repository"""
+
+    def __init__(self, repository: AsyncRepositoryInterface,
+                 id_allocator: Optional[IDAllocator] = None):
+        """Initialize service with async repository and ID allocator"""
+        self.repository = repository
+        self.id_allocator = id_allocator or ULIDAllocator()
+        # Registration checks and claims a username as one step
+        self._username_locks = AsyncKeyedLocks()
+
+    async def register_user(self, username: str, email: str,
+                            role: str = "customer") -> Optional[User]:
+        """Register a new user"""
+        async with self._username_locks.hold(username):
+            if await self.repository.load_by_filter('users',
+                                                    {'username': username}):
+                return None
+
+            try:
+                user = User(
+                    id=self.id_allocator.allocate('USR'),
+                    username=username,
+                    email=email,
+                    role=role
+                )
+            except ValueError as e:
+                print(f"Error creating user: {e}")
+                return None
+
+            if await self.repository.save('users', user.to_dict()):
+                return user
+            return None
+
+    async def authenticate_user(self, username: str) -> Optional[User]:
+        """Simple authentication by username"""
+        user = await self.get_user_by_username(username)
+        if user is None:
+            return None
+        updated_user = user.update_last_login()
+        await self.repository.update(
+            'users', user.id, {'last_login': updated_user.last_login.isoformat()})
+        return updated_user
+
+    async def get_user_by_id(self, user_id: str) -> Optional[User]:
+        """Get user by ID"""
+        data = await self.repository.load_by_id('users', user_id)
+        return User.from_dict(data) if data else None
+
+    async def get_user_by_username(self, username: str) -> Optional[User]:
+        """Get user by username"""
+        users = await self.repository.load_by_filter('users',
+                                                     {'username': username})
+        return User.from_dict(users[0]) if users else None
+
+    async def get_all_users(self) -> List[User]:
+        """Get all users (admin function)"""
+        data = await self.repository.load_all('users')
+        return [User.from_dict(item) for item in data]
+
+    async def get_users_by_role(self, role: str) -> List[User]:
+        """Get users by role"""
+        data = await self.repository.load_by_filter('users', {'role': role})
+        return [User.from_dict(item) for item in data]
+
+    async def update_user_role(self, user_id: str, new_role: str) -> bool:
+        """Update user role (admin function)"""
+        if new_role not in ['customer', 'admin', 'manager']:
+            return False
+        return await self.repository.update('users', user_id, {'role': new_role})
+
+    async def delete_user(self, user_id: str) -> bool:
+        """Delete a user (admin function)"""
+        return await self.repository.delete('users', user_id)
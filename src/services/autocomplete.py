@@ -0,0 +1,170 @@
+"""
+Autocomplete - Prefix completions for product names and categories
+"""
+import bisect
+import heapq
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.utils.lru_cache import LRUCache
+
+_CATEGORY = "category:"
+
+
+def normalize(text: str) -> str:
+    """Lowercase, strip accents and collapse whitespace for matching"""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    plain = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(plain.split())
+
+
+class AutocompleteIndex:
+    """Sorted array of normalized keys searched with bisect
+
+    A product is reachable from the start of every word of its name
+    ("mug" completes "Coffee Mug"); a category from the start of its name.
+    Completions are ranked by stock: products by their own, categories by
+    the total of their products. Results per prefix are cached until a
+    product under that prefix changes, so repeated keystrokes cost a dict
+    lookup.
+    """
+
+    def __init__(self, cache_size: int = 1024):
+        self.records: Dict[str, Dict[str, Any]] = {}
+        # (normalized key, entry id) in order; entry ids are product IDs
+        # or "category:<name>"
+        self._entries: List[Tuple[str, str]] = []
+        self._keys: Dict[str, List[str]] = {}
+        self._scores: Dict[str, int] = {}
+        # category -> [number of products, total stock]
+        self._categories: Dict[str, List[int]] = {}
+        self._cache = LRUCache(cache_size)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def build(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Index a whole catalog from scratch, sorting the keys once"""
+        self.__init__(self._cache.maxsize)
+        for record in records:
+            record = self._slim(record)
+            self.records[record['id']] = record
+        for record in self.records.values():
+            self._keys[record['id']] = self._name_keys(record['name'])
+            self._scores[record['id']] = record['stock']
+            if record['category']:
+                totals = self._categories.setdefault(record['category'], [0, 0])
+                totals[0] += 1
+                totals[1] += record['stock']
+        for category, (_, stock) in self._categories.items():
+            self._keys[_CATEGORY + category] = [normalize(category)]
+            self._scores[_CATEGORY + category] = stock
+        self._entries = sorted((key, entry_id)
+                               for entry_id, keys in self._keys.items()
+                               for key in keys)
+
+    @staticmethod
+    def _slim(record: Dict[str, Any]) -> Dict[str, Any]:
+        """The fields completions need"""
+        return {'id': record['id'], 'name': str(record.get('name') or ''),
+                'category': str(record.get('category') or ''),
+                'stock': int(record.get('stock') or 0)}
+
+    @staticmethod
+    def _name_keys(name: str) -> List[str]:
+        """Keys starting at every word of a name"""
+        words = normalize(name).split(" ")
+        return list(dict.fromkeys(" ".join(words[i:])
+                                  for i in range(len(words)) if words[i]))
+
+    def _insert(self, entry_id: str, keys: List[str], score: int) -> None:
+        """Add an entry under its keys"""
+        self._keys[entry_id] = keys
+        self._scores[entry_id] = score
+        for key in keys:
+            bisect.insort(self._entries, (key, entry_id))
+            self._invalidate(key)
+
+    def _delete(self, entry_id: str) -> None:
+        """Remove an entry from under its keys"""
+        for key in self._keys.pop(entry_id, ()):
+            pos = bisect.bisect_left(self._entries, (key, entry_id))
+            del self._entries[pos]
+            self._invalidate(key)
+        self._scores.pop(entry_id, None)
+
+    def _invalidate(self, key: str) -> None:
+        """Forget cached completions of every prefix of key"""
+        for end in range(1, len(key) + 1):
+            self._cache.pop(key[:end])
+
+    def _change_category(self, category: str, products: int,
+                         stock: int) -> None:
+        """Adjust a category's product count and stock total"""
+        totals = self._categories.setdefault(category, [0, 0])
+        totals[0] += products
+        totals[1] += stock
+        entry_id = _CATEGORY + category
+        self._delete(entry_id)
+        if totals[0] > 0:
+            self._insert(entry_id, [normalize(category)], totals[1])
+        else:
+            del self._categories[category]
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """Index a product, replacing an earlier version of it"""
+        self.remove(record['id'])
+        record = self._slim(record)
+        self.records[record['id']] = record
+        self._insert(record['id'], self._name_keys(record['name']),
+                     record['stock'])
+        if record['category']:
+            self._change_category(record['category'], 1, record['stock'])
+
+    def remove(self, product_id: str) -> None:
+        """Drop a product"""
+        record = self.records.pop(product_id, None)
+        if record is None:
+            return
+        self._delete(product_id)
+        if record['category']:
+            self._change_category(record['category'], -1, -record['stock'])
+
+    def complete(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Best completions of a prefix, highest stock first
+
+        Returns dicts with 'type' ('product' or 'category'), 'text' and,
+        for products, 'id' and 'stock'. They are copies, so callers may
+        modify them without touching the cache.
+        """
+        key = normalize(prefix)
+        if not key:
+            return []
+        cached: Optional[Tuple[int, List[Dict[str, Any]]]] = self._cache.get(key)
+        if cached is not None and cached[0] == limit:
+            return [dict(completion) for completion in cached[1]]
+
+        start = bisect.bisect_left(self._entries, (key,))
+        end = bisect.bisect_left(self._entries, (key + '\U0010ffff',), start)
+        entry_ids = dict.fromkeys(entry_id for _, entry_id
+                                  in self._entries[start:end])
+        best = heapq.nsmallest(limit, entry_ids, key=lambda entry_id: (
+            -self._scores[entry_id], self._display(entry_id)))
+
+        completions = []
+        for entry_id in best:
+            if entry_id.startswith(_CATEGORY):
+                completions.append({'type': 'category',
+                                    'text': entry_id[len(_CATEGORY):]})
+            else:
+                record = self.records[entry_id]
+                completions.append({'type': 'product', 'text': record['name'],
+                                    'id': entry_id, 'stock': record['stock']})
+        self._cache.put(key, (limit, completions))
+        return [dict(completion) for completion in completions]
+
+    def _display(self, entry_id: str) -> str:
+        """Text shown for an entry (tie-breaker when ranking)"""
+        if entry_id.startswith(_CATEGORY):
+            return entry_id[len(_CATEGORY):]
+        return self.records[entry_id]['name']
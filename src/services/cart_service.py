@@ -2,44 +2,73 @@
 Cart Service - Business logic for shopping cart operations
 """
 from typing import Optional, Dict
-import uuid
+import functools
 import json
+import threading
+from contextlib import nullcontext
 from pathlib import Path
 
 from src.models.cart import Cart
+from src.utils.id_allocator import IDAllocator, ULIDAllocator
+from src.utils.keyed_locks import KeyedLocks
+
+
+def _holding_cart(method):
+    """Run a cart operation under the lock of the user's cart"""
+    @functools.wraps(method)
+    def wrapper(self, user_id, *args, **kwargs):
+        with self._cart_locks.hold(user_id):
+            return method(self, user_id, *args, **kwargs)
+    return wrapper
 
 
 class CartService:
     """Service for cart-related business operations"""
 
-    def __init__(self, product_service, data_dir: str = "data"):
-        """Initialize service with product service and data directory"""
+    def __init__(self, product_service, data_dir: str = "data",
+                 id_allocator: Optional[IDAllocator] = None,
+                 thread_safe: bool = False):
+        """Initialize service with product service and data directory
+
+        With ``thread_safe`` each user's cart is guarded by its own lock, so
+        different shoppers are served in parallel while requests for the
+        same cart run one at a time.
+        """
         self.product_service = product_service
+        self.id_allocator = id_allocator or ULIDAllocator()
         self.active_carts: Dict[str, Cart] = {}
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(exist_ok=True)
         self.cart_file = self.data_dir / "carts.json"
         self._carts_loaded = False
 
+        self._cart_locks = KeyedLocks(thread_safe)
+        self._registry_lock = threading.Lock() if thread_safe else nullcontext()
+        self._save_lock = threading.Lock() if thread_safe else nullcontext()
+
     def save_all_carts(self):
         """Public method to save all carts"""
         self._save_carts()
 
     def _save_carts(self):
         """Save all active carts to disk"""
-        cart_data = {}
-        for user_id, cart in self.active_carts.items():
-            cart_data[user_id] = {
-                'user_id': cart.user_id,
-                'created_at': cart.created_at.isoformat(),
-                'items': [item.to_dict() for item in cart.items]
-            }
-        
-        try:
-            with open(self.cart_file, 'w', encoding='utf-8') as f:
-                json.dump(cart_data, f, indent=2)
-        except (IOError, OSError, ValueError) as e:
-            print(f"Warning: Failed to save carts: {e}")
+        with self._save_lock:
+            with self._registry_lock:
+                carts = list(self.active_carts.items())
+
+            cart_data = {}
+            for user_id, cart in carts:
+                cart_data[user_id] = {
+                    'user_id': cart.user_id,
+                    'created_at': cart.created_at.isoformat(),
+                    'items': [item.to_dict() for item in list(cart.items)]
+                }
+            
+            try:
+                with open(self.cart_file, 'w', encoding='utf-8') as f:
+                    json.dump(cart_data, f, indent=2)
+            except (IOError, OSError, ValueError) as e:
+                print(f"Warning: Failed to save carts: {e}")
 
     def _load_carts(self):
         """Load saved carts from disk"""
@@ -66,18 +95,20 @@ class CartService:
 
     def get_cart(self, user_id: str) -> Cart:
         """Get or create cart for user"""
-        if user_id not in self.active_carts:
-            # Try to load cart from disk first
-            if not hasattr(self, '_carts_loaded'):
-                self._load_carts()
-                self._carts_loaded = True
-            
-            # If still not found, create new cart
+        with self._registry_lock:
             if user_id not in self.active_carts:
-                self.active_carts[user_id] = Cart(user_id)
-        
-        return self.active_carts[user_id]
+                # Try to load cart from disk first
+                if not hasattr(self, '_carts_loaded'):
+                    self._load_carts()
+                    self._carts_loaded = True
+                
+                # If still not found, create new cart
+                if user_id not in self.active_carts:
+                    self.active_carts[user_id] = Cart(user_id)
+            
+            return self.active_carts[user_id]
 
+    @_holding_cart
     def add_to_cart(self, user_id: str, product_id: str,
                     quantity: int = 1) -> bool:
         """Add product to user's cart"""
@@ -107,6 +138,7 @@ class CartService:
         
         return success
 
+    @_holding_cart
     def remove_from_cart(self, user_id: str, product_id: str) -> bool:
         """Remove product from user's cart"""
         cart = self.get_cart(user_id)
@@ -118,6 +150,7 @@ class CartService:
         
         return success
 
+    @_holding_cart
     def update_cart_item_quantity(self, user_id: str, product_id: str,
                                   new_quantity: int) -> bool:
         """Update quantity of item in cart"""
@@ -132,6 +165,7 @@ class CartService:
         cart = self.get_cart(user_id)
         return cart.update_item_quantity(product_id, new_quantity)
 
+    @_holding_cart
     def clear_cart(self, user_id: str) -> bool:
         """Clear all items from user's cart"""
         cart = self.get_cart(user_id)
@@ -142,6 +176,7 @@ class CartService:
         
         return True
 
+    @_holding_cart
     def get_cart_summary(self, user_id: str) -> dict:
         """Get cart summary with totals"""
         cart = self.get_cart(user_id)
@@ -154,6 +189,7 @@ class CartService:
             'is_empty': cart.is_empty()
         }
 
+    @_holding_cart
     def validate_cart_stock(self, user_id: str) -> dict:
         """Validate that all cart items are still available"""
         cart = self.get_cart(user_id)
@@ -177,6 +213,7 @@ class CartService:
             'issues': issues
         }
 
+    @_holding_cart
     def checkout(self, user_id: str) -> Optional[dict]:
         """Process checkout for user's cart"""
         cart = self.get_cart(user_id)
@@ -205,12 +242,9 @@ class CartService:
             'created_at': cart.created_at.isoformat()
         }
 
-        # Update stock levels
+        # Update stock levels (read and write under the product's lock)
         for item in cart.items:
-            product = self.product_service.get_product_by_id(item.product_id)
-            if product:
-                new_stock = product.stock - item.quantity
-                self.product_service.update_stock(item.product_id, new_stock)
+            self.product_service.adjust_stock(item.product_id, -item.quantity)
 
         # Clear cart after successful checkout
         cart.clear()
@@ -224,5 +258,5 @@ class CartService:
         }
 
     def _generate_order_id(self) -> str:
-        """Generate unique order ID"""
-        return f"ORD-{str(uuid.uuid4())[:8].upper()}"
+        """Generate unique, time-ordered order ID"""
+        return self.id_allocator.allocate('ORD')
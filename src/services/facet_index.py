@@ -0,0 +1,191 @@
+"""
+Facet Index - Bitmap indexes for filtering the catalog by category, price
+band and availability
+"""
+import bisect
+from typing import Any, Dict, Iterable, List, Optional
+
+# Upper bounds of the price bands; the last band is open-ended
+PRICE_BUCKETS = (10, 25, 50, 100, 250, 500, 1000)
+
+FACETS = ('category', 'price', 'availability')
+
+
+def price_bucket(price: float) -> str:
+    """Label of the price band a price falls in, e.g. "25-50" or "1000+" """
+    position = bisect.bisect_right(PRICE_BUCKETS, price)
+    if position == len(PRICE_BUCKETS):
+        return f"{PRICE_BUCKETS[-1]}+"
+    low = PRICE_BUCKETS[position - 1] if position else 0
+    return f"{low}-{PRICE_BUCKETS[position]}"
+
+
+def _bitmap(ordinals: Iterable[int]) -> int:
+    """Bitmap with the given bits set, built in one go"""
+    bits = bytearray()
+    for ordinal in ordinals:
+        byte = ordinal >> 3
+        if byte >= len(bits):
+            bits.extend(bytes(byte + 1 - len(bits)))
+        bits[byte] |= 1 << (ordinal & 7)
+    return int.from_bytes(bits, 'little')
+
+
+def _ordinals(bitmap: int) -> List[int]:
+    """Positions of the set bits, lowest first"""
+    digits = bin(bitmap)[:1:-1]
+    positions = []
+    position = digits.find('1')
+    while position != -1:
+        positions.append(position)
+        position = digits.find('1', position + 1)
+    return positions
+
+
+class FacetIndex:
+    """Bitmap per facet value over product ordinal positions
+
+    Every product gets a small integer (its ordinal, reused after the
+    product is removed) and each facet value a Python int whose bit n is
+    set when product n has that value. A query ORs the bitmaps of the
+    values picked within a facet and ANDs the facets together, then counts
+    every facet value inside the result with one AND and popcount each
+    (bin().count('1'), which works on every supported Python version).
+    The index keeps the records it was given, so results can be shown
+    without going back to storage. add() and remove() keep it current as
+    products change.
+    """
+
+    def __init__(self):
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self._ordinal: Dict[str, int] = {}
+        # ordinal -> product ID (None for a free slot)
+        self._ids: List[Optional[str]] = []
+        self._free: List[int] = []
+        self._all = 0
+        # facet -> value -> bitmap
+        self._bitmaps: Dict[str, Dict[str, int]] = {
+            facet: {} for facet in FACETS}
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def build(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Index a whole catalog from scratch"""
+        self.__init__()
+        for record in records:
+            if record['id'] not in self._ordinal:
+                self._ordinal[record['id']] = len(self._ids)
+                self._ids.append(record['id'])
+            self.records[record['id']] = record
+
+        members: Dict[str, Dict[str, List[int]]] = {
+            facet: {} for facet in FACETS}
+        for product_id, record in self.records.items():
+            ordinal = self._ordinal[product_id]
+            for facet, value in self._values(record).items():
+                members[facet].setdefault(value, []).append(ordinal)
+        for facet, values in members.items():
+            self._bitmaps[facet] = {value: _bitmap(ordinals)
+                                    for value, ordinals in values.items()}
+        self._all = _bitmap(range(len(self._ids)))
+
+    @staticmethod
+    def _values(record: Dict[str, Any]) -> Dict[str, str]:
+        """Facet -> value of a product"""
+        return {'category': str(record.get('category') or ''),
+                'price': price_bucket(float(record.get('price') or 0.0)),
+                'availability': 'in_stock' if int(record.get('stock') or 0) > 0
+                                else 'out_of_stock'}
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """Index a product, replacing an earlier version of it"""
+        self.remove(record['id'])
+        if self._free:
+            ordinal = self._free.pop()
+            self._ids[ordinal] = record['id']
+        else:
+            ordinal = len(self._ids)
+            self._ids.append(record['id'])
+        self._ordinal[record['id']] = ordinal
+        self.records[record['id']] = record
+
+        bit = 1 << ordinal
+        self._all |= bit
+        for facet, value in self._values(record).items():
+            bitmaps = self._bitmaps[facet]
+            bitmaps[value] = bitmaps.get(value, 0) | bit
+
+    def remove(self, product_id: str) -> None:
+        """Drop a product, freeing its ordinal"""
+        record = self.records.pop(product_id, None)
+        if record is None:
+            return
+        ordinal = self._ordinal.pop(product_id)
+        self._ids[ordinal] = None
+        self._free.append(ordinal)
+
+        bit = 1 << ordinal
+        self._all &= ~bit
+        for facet, value in self._values(record).items():
+            bitmaps = self._bitmaps[facet]
+            bitmaps[value] &= ~bit
+            if not bitmaps[value]:
+                del bitmaps[value]
+
+    def bitmap_of(self, product_ids: Iterable[str]) -> int:
+        """Bitmap of the given (indexed) products"""
+        return _bitmap(self._ordinal[product_id] for product_id in product_ids
+                       if product_id in self._ordinal)
+
+    def query(self, filters: Optional[Dict[str, Iterable[str]]] = None,
+              within: Optional[int] = None) -> int:
+        """Bitmap of the products passing every filter
+
+        ``filters`` maps a facet to the values accepted for it (a list, or
+        a single value): a product passes a facet when it has any of them,
+        and the result when it passes every facet. ``within`` narrows the
+        result further (e.g. to the bitmap of text search hits).
+
+        Raises:
+            ValueError: For a facet that is not indexed
+        """
+        result = self._all if within is None else self._all & within
+        for facet, values in (filters or {}).items():
+            if facet not in self._bitmaps:
+                raise ValueError(f"Unknown filter: {facet}")
+            if isinstance(values, str):
+                values = [values]
+            bitmaps = self._bitmaps[facet]
+            accepted = 0
+            for value in values:
+                accepted |= bitmaps.get(value, 0)
+            result &= accepted
+        return result
+
+    def counts(self, result: int) -> Dict[str, Dict[str, int]]:
+        """Facet -> value -> number of products in ``result`` having it
+
+        Values no product in the result has are left out; categories are
+        listed alphabetically, price bands from cheap to expensive.
+        """
+        counts = {}
+        for facet, bitmaps in self._bitmaps.items():
+            values = (sorted(bitmaps) if facet != 'price' else
+                      sorted(bitmaps, key=self._price_order))
+            facet_counts = {}
+            for value in values:
+                count = bin(bitmaps[value] & result).count('1')
+                if count:
+                    facet_counts[value] = count
+            counts[facet] = facet_counts
+        return counts
+
+    @staticmethod
+    def _price_order(label: str) -> float:
+        """Sort key of a price band label (its lower bound)"""
+        return float(label.split('-')[0].rstrip('+'))
+
+    def product_ids(self, result: int) -> List[str]:
+        """IDs of the products in a result bitmap, in ordinal order"""
+        return [self._ids[ordinal] for ordinal in _ordinals(result)]
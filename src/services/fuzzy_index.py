@@ -0,0 +1,128 @@
+"""
+Fuzzy Index - Character-trigram index for typo-tolerant word lookups
+"""
+import heapq
+from typing import Dict, List, Optional, Set, Tuple
+
+
+def trigrams(word: str) -> Set[str]:
+    """Character trigrams of a word, padded so short words have some too"""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_edit_distance(a: str, b: str, max_distance: int) -> Optional[int]:
+    """Edit distance between a and b, or None if it exceeds max_distance
+
+    Counts insertions, deletions, substitutions and swaps of neighbouring
+    characters. Only a band of 2 * max_distance + 1 cells per row is
+    filled, and work stops as soon as a whole row is over the bound.
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return None
+    over = max_distance + 1
+    previous2: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [over] * (len(b) + 1)
+        current[0] = i
+        low = max(1, i - max_distance)
+        high = min(len(b), i + max_distance)
+        for j in range(low, high + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1,
+                        previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] \
+                    and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+        if min(current[max(0, low - 1):high + 1]) > max_distance:
+            return None
+        previous2, previous = previous, current
+    distance = previous[len(b)]
+    return distance if distance <= max_distance else None
+
+
+class TrigramIndex:
+    """Words by trigram, for finding indexed words close to a misspelling
+
+    Candidates are the words sharing the most trigrams with the query
+    word; only those are checked with the (bounded) edit distance, so a
+    lookup never visits the whole vocabulary. Words are reference counted:
+    add() and remove() are called once per product using the word.
+    """
+
+    def __init__(self, min_similarity: float = 0.3, max_candidates: int = 50):
+        """Initialize an empty index
+
+        Args:
+            min_similarity: Least trigram (Dice) similarity a candidate
+                needs before its edit distance is computed
+            max_candidates: Most candidates checked per lookup
+        """
+        self.min_similarity = min_similarity
+        self.max_candidates = max_candidates
+        # word -> number of products using it
+        self.words: Dict[str, int] = {}
+        self._grams: Dict[str, Set[str]] = {}
+
+    def add(self, word: str) -> None:
+        """Count one more use of a word"""
+        if word in self.words:
+            self.words[word] += 1
+            return
+        self.words[word] = 1
+        for gram in trigrams(word):
+            self._grams.setdefault(gram, set()).add(word)
+
+    def remove(self, word: str) -> None:
+        """Count one use less, forgetting the word after its last use"""
+        uses = self.words.get(word)
+        if uses is None:
+            return
+        if uses > 1:
+            self.words[word] = uses - 1
+            return
+        del self.words[word]
+        for gram in trigrams(word):
+            words = self._grams[gram]
+            words.discard(word)
+            if not words:
+                del self._grams[gram]
+
+    @staticmethod
+    def max_distance(word: str) -> int:
+        """Typos tolerated in a word of this length"""
+        return 1 if len(word) <= 4 else 2
+
+    def similar(self, word: str,
+                limit: int = 3) -> List[Tuple[str, int, float]]:
+        """Indexed words close to ``word``, best first
+
+        Returns (word, edit distance, trigram similarity) tuples ordered
+        by distance, then similarity, then how many products use the word.
+        """
+        grams = trigrams(word)
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self._grams.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+
+        scored = []
+        for candidate, count in shared.items():
+            similarity = 2 * count / (len(grams) + len(candidate) + 1)
+            if similarity >= self.min_similarity:
+                scored.append((similarity, candidate))
+        candidates = heapq.nlargest(self.max_candidates, scored)
+
+        bound = self.max_distance(word)
+        matches = []
+        for similarity, candidate in candidates:
+            if candidate == word:
+                continue
+            distance = bounded_edit_distance(word, candidate, bound)
+            if distance is not None:
+                matches.append((candidate, distance, similarity))
+        matches.sort(key=lambda match: (match[1], -match[2],
+                                        -self.words[match[0]], match[0]))
+        return matches[:limit]
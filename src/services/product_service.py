@@ -1,18 +1,58 @@
 """
 Product Service - Business logic for product operations
 """
-from typing import List, Optional
-import uuid
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, List, Optional, Tuple
 
 from src.models.product import Product
+from src.services.autocomplete import AutocompleteIndex
+from src.services.facet_index import FacetIndex
+from src.services.search_index import ProductSearchIndex
+from src.utils.id_allocator import IDAllocator, ULIDAllocator
+from src.utils.keyed_locks import KeyedLocks
+from src.utils.lru_cache import LRUCache
 
 
 class ProductService:
     """Service for product-related business operations"""
 
-    def __init__(self, repository):
-        """Initialize service with repository"""
+    def __init__(self, repository, id_allocator: Optional[IDAllocator] = None,
+                 thread_safe: bool = False, cache_size: int = 1024,
+                 cache_check_interval: float = 0.0):
+        """Initialize service with repository and ID allocator
+
+        With ``thread_safe`` read-modify-write operations on a product hold
+        a per-product lock; pair it with a thread-safe repository.
+
+        get_product_by_id keeps up to ``cache_size`` Product objects (0
+        turns this off) and hands out the same object until the product
+        changes, so treat returned products as read-only. Writes made
+        through this service evict what they touch. Writes by anyone else
+        are noticed through the repository's write version (generation and
+        file signature; a stat or one indexed row to check), looked at at
+        most every ``cache_check_interval`` seconds (0: on every lookup);
+        a changed version empties the cache.
+
+        search_products, autocomplete and filter_products answer from in-memory indexes,
+        each built on first use and then kept current by this service's
+        writes; a changed version makes the next use rebuild them.
+        """
         self.repository = repository
+        self.id_allocator = id_allocator or ULIDAllocator()
+        self._product_locks = KeyedLocks(thread_safe)
+
+        # Product cache and catalog indexes (name -> index), guarded by
+        # one lock
+        self._products = LRUCache(cache_size)
+        self._indexes: Dict[str, Any] = {}
+        self._catalog_lock = threading.Lock() if thread_safe else nullcontext()
+        self.cache_check_interval = cache_check_interval
+        self._version: Optional[Tuple[int, Any]] = None
+        self._checked_at = 0.0
+        # Bumped by every own write; lookups that raced one are not cached
+        self._write_seq = 0
 
     def create_product(self, name: str, price: float, category: str,
                       stock: int = 0, description: str = "") -> Optional[Product]:
@@ -33,6 +73,7 @@ class ProductService:
 
             # Save to repository
             if self.repository.save('products', product.to_dict()):
+                self._after_write({product_id: product.to_dict()})
                 return product
             return None
 
@@ -45,91 +86,336 @@ class ProductService:
         data = self.repository.load_all('products')
         return [Product.from_dict(item) for item in data]
 
+    def get_product_count(self) -> int:
+        """Get number of products without loading the catalog"""
+        return self.repository.get_count('products')
+
+    def is_catalog_empty(self) -> bool:
+        """Check whether there are no products yet"""
+        return self.repository.is_empty('products')
+
     def get_product_by_id(self, product_id: str) -> Optional[Product]:
-        """Get product by ID"""
+        """Get product by ID (served from the product cache when current)"""
+        if not self._products.enabled:
+            data = self.repository.load_by_id('products', product_id)
+            return Product.from_dict(data) if data else None
+
+        with self._catalog_lock:
+            self._check_version()
+            product = self._products.get(product_id)
+            write_seq = self._write_seq
+        if product is not None:
+            return product
+
         data = self.repository.load_by_id('products', product_id)
-        return Product.from_dict(data) if data else None
+        if not data:
+            return None
+        product = Product.from_dict(data)
+        with self._catalog_lock:
+            if write_seq == self._write_seq:
+                self._products.put(product_id, product)
+        return product
+
+    def _check_version(self) -> None:
+        """Drop cache and indexes if someone else wrote products (lock held)"""
+        now = time.monotonic()
+        if self._version is not None and \
+                now - self._checked_at < self.cache_check_interval:
+            return
+        version = self.repository.get_version('products')
+        if version != self._version:
+            self._products.clear()
+            self._indexes.clear()
+            self._version = version
+        self._checked_at = now
+
+    def _after_write(self, changes: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """Bring cache and index up to date after a successful write
+
+        ``changes`` maps each written product ID to the fields it changed
+        (a full record for new products) or None for a deleted product.
+        """
+        if not self._products.enabled and not self._indexes:
+            return
+        with self._catalog_lock:
+            self._write_seq += 1
+            for product_id in changes:
+                self._products.pop(product_id)
+            written = self.repository.get_write_version('products')
+            # Our write advanced the version we know by exactly one only if
+            # nobody else wrote in between
+            if written is None or self._version is None or \
+                    written[0] != self._version[0] + 1:
+                self._products.clear()
+                self._indexes.clear()
+            else:
+                for index in self._indexes.values():
+                    self._update_index(index, changes)
+            self._version = written
+            self._checked_at = time.monotonic()
+
+    def _update_index(self, index,
+                      changes: Dict[str, Optional[Dict[str, Any]]]) -> None:
+        """Apply written changes to a catalog index (lock held)
+
+        Indexes keep the records they were given in ``records`` and offer
+        add(record) and remove(product_id).
+        """
+        for product_id, fields in changes.items():
+            if fields is None:
+                index.remove(product_id)
+                continue
+            current = index.records.get(product_id)
+            if current is None and 'name' not in fields:
+                current = self.repository.load_by_id('products', product_id)
+                if current is None:
+                    continue
+            record = dict(current or {})
+            record.update(fields)
+            record['id'] = product_id
+            index.add(record)
+
+    def _get_index(self, index_class):
+        """Catalog index of the given class, built on first use (lock held)"""
+        name = index_class.__name__
+        if name not in self._indexes:
+            index = index_class()
+            index.build(self.repository.iter_all('products'))
+            self._indexes[name] = index
+        return self._indexes[name]
+
+    def get_cache_stats(self) -> Dict:
+        """Get product cache hit/miss counters"""
+        return {
+            'enabled': self._products.enabled,
+            'size': len(self._products),
+            'max_size': self._products.maxsize,
+            'hits': self._products.hits,
+            'misses': self._products.misses
+        }
 
     def get_products_by_category(self, category: str) -> List[Product]:
         """Get all products in a category"""
         data = self.repository.load_by_filter('products', {'category': category})
         return [Product.from_dict(item) for item in data]
 
-    def search_products(self, query: str) -> List[Product]:
-        """Search products by name or description"""
-        all_products = self.get_all_products()
-        query_lower = query.lower()
+    def search_products(self, query: str, limit: Optional[int] = None,
+                        fuzzy: bool = False) -> List[Product]:
+        """Search products by name, category or description, best first
+
+        Every word of the query has to match a word of the product or the
+        start of one. With ``fuzzy``, a query that finds nothing is retried
+        with its best spelling correction (see suggest_queries).
+        """
+        with self._catalog_lock:
+            self._check_version()
+            index = self._get_index(ProductSearchIndex)
+            hits = index.search(query, limit)
+            if not hits and fuzzy:
+                suggestions = index.suggest(query, limit=1)
+                if suggestions:
+                    hits = index.search(suggestions[0], limit)
+            records = [index.records[product_id] for product_id, _ in hits]
+        return [self._products.get(record['id']) or Product.from_dict(record)
+                for record in records]
 
-        matching_products = []
-        for product in all_products:
-            if (query_lower in product.name.lower() or
-                query_lower in product.description.lower()):
-                matching_products.append(product)
+    def suggest_queries(self, query: str, limit: int = 3) -> List[str]:
+        """Spelling corrections of a query that do find products"""
+        with self._catalog_lock:
+            self._check_version()
+            return self._get_index(ProductSearchIndex).suggest(query, limit)
 
-        return matching_products
+    def autocomplete(self, prefix: str, limit: int = 10) -> List[Dict]:
+        """Product names and categories starting with ``prefix``
+
+        Any word of a product name can be completed. Best stocked first;
+        see AutocompleteIndex.complete for the result layout.
+        """
+        with self._catalog_lock:
+            self._check_version()
+            return self._get_index(AutocompleteIndex).complete(prefix, limit)
+
+    def filter_products(self, filters: Optional[Dict[str, List[str]]] = None,
+                        query: str = "", limit: Optional[int] = None) -> Dict:
+        """Products matching facet filters (and a search query), with counts
+
+        ``filters`` maps 'category', 'price' (bands such as "25-50" or
+        "1000+", see price_bucket) and 'availability' ('in_stock' or
+        'out_of_stock') to the values accepted; several values of one
+        facet are alternatives, different facets must all match. With a
+        ``query`` only its search hits are kept, best first.
+
+        Returns 'products' (at most ``limit``), 'count' (all matches) and
+        'facets': facet -> value -> number of matching products with it.
+
+        Raises:
+            ValueError: For a facet that is not indexed
+        """
+        with self._catalog_lock:
+            self._check_version()
+            facets = self._get_index(FacetIndex)
+            ranked = None
+            if query.strip():
+                hits = self._get_index(ProductSearchIndex).search(query)
+                ranked = [product_id for product_id, _ in hits]
+                result = facets.query(filters, facets.bitmap_of(ranked))
+            else:
+                result = facets.query(filters)
+
+            product_ids = facets.product_ids(result)
+            if ranked is not None:
+                matched = set(product_ids)
+                product_ids = [product_id for product_id in ranked
+                               if product_id in matched]
+            records = [facets.records[product_id]
+                       for product_id in product_ids[:limit]]
+            counts = facets.counts(result)
+        return {
+            'products': [self._products.get(record['id']) or
+                         Product.from_dict(record) for record in records],
+            'count': len(product_ids),
+            'facets': counts
+        }
 
     def update_product(self, product_id: str, **kwargs) -> bool:
         """Update product fields"""
-        # Get current product to validate
-        current_product = self.get_product_by_id(product_id)
-        if not current_product:
-            return False
+        with self._product_locks.hold(product_id):
+            # Get current product to validate
+            current_product = self.get_product_by_id(product_id)
+            if not current_product:
+                return False
 
-        # Validate new data by creating temporary product
-        try:
-            test_data = current_product.to_dict()
-            test_data.update(kwargs)
-            Product.from_dict(test_data)  # This will validate
-        except ValueError:
-            return False
+            # Validate new data by creating temporary product
+            try:
+                test_data = current_product.to_dict()
+                test_data.update(kwargs)
+                Product.from_dict(test_data)  # This will validate
+            except ValueError:
+                return False
 
-        # Update in repository
-        return self.repository.update('products', product_id, kwargs)
+            # Update in repository
+            if not self.repository.update('products', product_id, kwargs):
+                return False
+            self._after_write({product_id: dict(kwargs)})
+            return True
 
     def update_stock(self, product_id: str, new_stock: int) -> bool:
         """Update product stock level"""
         if new_stock < 0:
             return False
-        return self.repository.update('products', product_id, {'stock': new_stock})
+        with self._product_locks.hold(product_id):
+            if not self.repository.update('products', product_id,
+                                          {'stock': new_stock}):
+                return False
+            self._after_write({product_id: {'stock': new_stock}})
+            return True
+
+    def adjust_stock(self, product_id: str, delta: int) -> bool:
+        """Add ``delta`` (negative to take) to a product's current stock"""
+        with self._product_locks.hold(product_id):
+            product = self.get_product_by_id(product_id)
+            if not product:
+                return False
+            return self.update_stock(product_id, product.stock + delta)
 
     def delete_product(self, product_id: str) -> bool:
         """Delete a product"""
-        return self.repository.delete('products', product_id)
+        with self._product_locks.hold(product_id):
+            if not self.repository.delete('products', product_id):
+                return False
+            self._after_write({product_id: None})
+            return True
 
     def get_categories(self) -> List[str]:
         """Get all unique categories"""
-        products = self.get_all_products()
-        categories = set(product.category for product in products)
+        # Stream only the category column: no models, no date parsing
+        categories = set(item['category'] for item in
+                         self.repository.iter_all('products', ['category']))
         return sorted(list(categories))
 
     def get_low_stock_products(self, threshold: int = 5) -> List[Product]:
         """Get products with low stock"""
-        all_products = self.get_all_products()
-        return [p for p in all_products if p.stock <= threshold]
+        # Only matching records are turned into Product objects
+        return [Product.from_dict(item)
+                for item in self.repository.iter_all('products')
+                if item.get('stock', 0) <= threshold]
+
+    def get_product_fields(self, fields: List[str]) -> List[Dict]:
+        """Get selected fields of all products as plain dicts
+        
+        Lightweight alternative to get_all_products for read-only views
+        that need a few columns: no Product objects are built.
+        """
+        return self.repository.load_all('products', fields)
+
+    def get_low_stock_summary(self, threshold: int = 5) -> List[Dict]:
+        """Get id/name/category/stock of products with low stock"""
+        fields = ['id', 'name', 'category', 'stock']
+        return [item for item in self.repository.iter_all('products', fields)
+                if item.get('stock', 0) <= threshold]
+
+    def get_inventory_stats(self, low_stock_threshold: int = 5) -> Dict:
+        """Aggregate catalog figures from the price and stock columns"""
+        count = total_stock = 0
+        total_price = total_value = 0.0
+        low_stock = out_of_stock = 0
+
+        for item in self.repository.iter_all('products', ['price', 'stock']):
+            price = item['price']
+            stock = item.get('stock', 0)
+            count += 1
+            total_stock += stock
+            total_price += price
+            total_value += price * stock
+            if stock <= low_stock_threshold:
+                low_stock += 1
+            if stock == 0:
+                out_of_stock += 1
+
+        return {
+            'total_products': count,
+            'total_stock': total_stock,
+            'average_price': total_price / count if count else 0.0,
+            'total_value': total_value,
+            'low_stock_count': low_stock,
+            'out_of_stock_count': out_of_stock
+        }
 
     def apply_discount_to_category(self, category: str,
                                  discount_percent: float) -> int:
         """Apply discount to all products in category"""
         products = self.get_products_by_category(category)
-        updated_count = 0
+        updates = {}
 
         for product in products:
             try:
                 discounted = product.apply_discount(discount_percent)
-                if self.repository.update('products', product.id,
-                                        {'price': discounted.price}):
-                    updated_count += 1
+                updates[product.id] = {'price': discounted.price}
             except ValueError:
                 continue
 
-        return updated_count
+        if not updates:
+            return 0
+        # One load and one write for the whole category
+        count = self.repository.update_many('products', updates)
+        if count:
+            self._after_write(updates)
+        return count
+
+    def bulk_update_stock(self, updates: Dict[str, int]) -> int:
+        """Update stock for several products with a single write"""
+        valid_updates = {
+            product_id: {'stock': new_stock}
+            for product_id, new_stock in updates.items()
+            if isinstance(new_stock, int) and new_stock >= 0
+        }
+        if not valid_updates:
+            return 0
+        count = self.repository.update_many('products', valid_updates)
+        if count:
+            self._after_write(valid_updates)
+        return count
 
     def _generate_product_id(self) -> str:
-        """Generate unique product ID"""
-        while True:
-            # Use UUID for uniqueness
-            product_id = f"PRD-{str(uuid.uuid4())[:8].upper()}"
-
-            # Check if ID already exists
-            if not self.repository.exists('products', product_id):
-                return product_id
+        """Generate unique product ID (no storage lookup needed)"""
+        return self.id_allocator.allocate('PRD')
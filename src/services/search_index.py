@@ -0,0 +1,226 @@
+"""
+Search Index - In-memory inverted index with BM25 ranking for products
+"""
+import bisect
+import heapq
+import math
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from src.services.fuzzy_index import TrigramIndex
+
+_TOKEN = re.compile(r"\w+")
+
+# Term frequency weight of each indexed field: a hit in the name counts
+# twice as much as one in the description
+FIELD_WEIGHTS = {'name': 2.0, 'category': 1.5, 'description': 1.0}
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens"""
+    return _TOKEN.findall(text.casefold())
+
+
+class ProductSearchIndex:
+    """Inverted index over product name, category and description
+
+    Every query token must match, either as a whole word or as the start
+    of one ("lapt" finds "laptop"); results are ordered by BM25 relevance.
+    The index keeps the records it was given, so results can be shown
+    without going back to storage. add() and remove() keep it current as
+    products change.
+
+    Words of product names are also kept in a trigram index, from which
+    suggest() proposes corrected queries for misspelled ones.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75,
+                 prefix_weight: float = 0.5, max_expansions: int = 50):
+        """Initialize an empty index
+
+        Args:
+            k1: BM25 term frequency saturation
+            b: BM25 document length normalization
+            prefix_weight: Score factor for words matched only by prefix
+            max_expansions: Most words a query prefix is expanded to,
+                taken in alphabetical order
+        """
+        self.k1 = k1
+        self.b = b
+        self.prefix_weight = prefix_weight
+        self.max_expansions = max_expansions
+
+        self.records: Dict[str, Dict[str, Any]] = {}
+        # term -> {product id: weighted term frequency}
+        self._postings: Dict[str, Dict[str, float]] = {}
+        # product id -> {term: frequency}
+        self._documents: Dict[str, Dict[str, float]] = {}
+        # product id -> document length (sum of weighted frequencies)
+        self._lengths: Dict[str, float] = {}
+        self._total_length = 0.0
+        # All indexed terms in order, for prefix lookups
+        self._terms: List[str] = []
+        self.name_words = TrigramIndex()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def build(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Index a whole catalog from scratch"""
+        self.__init__(self.k1, self.b, self.prefix_weight, self.max_expansions)
+        for record in records:
+            self._add(record)
+        self._terms = sorted(self._postings)
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """Index a product, replacing an earlier version of it"""
+        self.remove(record['id'])
+        for term in self._add(record):
+            bisect.insort(self._terms, term)
+
+    def _add(self, record: Dict[str, Any]) -> List[str]:
+        """Index a product, returning the terms seen for the first time"""
+        frequencies: Dict[str, float] = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(str(record.get(field) or '')):
+                frequencies[token] = frequencies.get(token, 0.0) + weight
+        length = sum(frequencies.values())
+
+        product_id = record['id']
+        new_terms = []
+        for term, frequency in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = self._postings[term] = {}
+                new_terms.append(term)
+            postings[product_id] = frequency
+        for word in set(tokenize(str(record.get('name') or ''))):
+            self.name_words.add(word)
+        self._documents[product_id] = frequencies
+        self._lengths[product_id] = length
+        self._total_length += length
+        self.records[product_id] = record
+        return new_terms
+
+    def remove(self, product_id: str) -> None:
+        """Drop a product from the index"""
+        frequencies = self._documents.pop(product_id, None)
+        if frequencies is None:
+            return
+        self._total_length -= self._lengths.pop(product_id)
+        record = self.records.pop(product_id)
+        for word in set(tokenize(str(record.get('name') or ''))):
+            self.name_words.remove(word)
+        for term in frequencies:
+            postings = self._postings[term]
+            del postings[product_id]
+            if not postings:
+                del self._postings[term]
+                del self._terms[bisect.bisect_left(self._terms, term)]
+
+    def _expand(self, token: str) -> List[Tuple[str, float]]:
+        """Words a query token matches, with their score factor"""
+        matches = [(token, 1.0)] if token in self._postings else []
+        start = bisect.bisect_right(self._terms, token)
+        for term in self._terms[start:start + self.max_expansions]:
+            if not term.startswith(token):
+                break
+            matches.append((term, self.prefix_weight))
+        return matches
+
+    def search(self, query: str,
+               limit: Optional[int] = None) -> List[Tuple[str, float]]:
+        """Ranked (product id, score) pairs matching every query token"""
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens or not self._documents:
+            return []
+
+        count = len(self._documents)
+        lengths = self._lengths
+        # BM25: idf * f * (k1 + 1) / (f + k1 * (1 - b + b * length / avg))
+        base = self.k1 * (1 - self.b)
+        slope = self.k1 * self.b * count / self._total_length \
+            if self._total_length else 0.0
+        # Per token: [(postings, weight)] of the words it matches, where
+        # weight folds the prefix factor, idf and (k1 + 1) together
+        expanded = []
+        for token in tokens:
+            words = []
+            for term, factor in self._expand(token):
+                postings = self._postings[term]
+                idf = math.log(1 + (count - len(postings) + 0.5) /
+                               (len(postings) + 0.5))
+                words.append((postings, factor * idf * (self.k1 + 1)))
+            if not words:
+                return []
+            expanded.append(words)
+        # Rarest token first, so later tokens only check its matches
+        expanded.sort(key=lambda words: sum(len(p) for p, _ in words))
+
+        totals: Optional[Dict[str, float]] = None
+        for words in expanded:
+            scores: Dict[str, float] = {}
+            if totals is None:
+                for postings, weight in words:
+                    for product_id, frequency in postings.items():
+                        score = weight * frequency / (
+                            frequency + base + slope * lengths[product_id])
+                        if score > scores.get(product_id, 0.0):
+                            scores[product_id] = score
+            else:
+                for product_id, total in totals.items():
+                    best = 0.0
+                    for postings, weight in words:
+                        frequency = postings.get(product_id)
+                        if frequency is not None:
+                            score = weight * frequency / (
+                                frequency + base + slope * lengths[product_id])
+                            if score > best:
+                                best = score
+                    if best:
+                        scores[product_id] = total + best
+            totals = scores
+            if not totals:
+                return []
+
+        if limit is not None:
+            return heapq.nlargest(limit, totals.items(),
+                                  key=lambda item: item[1])
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+    def suggest(self, query: str, limit: int = 3) -> List[str]:
+        """Corrected versions of a query that find products ("did you mean")
+
+        Words that match nothing are replaced by the closest words from
+        product names; the best correction comes first, followed by
+        variants using the runner-up for one word.
+        """
+        tokens = tokenize(query)
+        options = []
+        for token in tokens:
+            if self._expand(token):
+                options.append([token])
+                continue
+            similar = [word for word, _, _ in
+                       self.name_words.similar(token, limit)]
+            if not similar:
+                return []
+            options.append(similar)
+        if all(words == [token] for words, token in zip(options, tokens)):
+            return []
+
+        variants = [[words[0] for words in options]]
+        for position, words in enumerate(options):
+            for word in words[1:]:
+                variant = list(variants[0])
+                variant[position] = word
+                variants.append(variant)
+
+        suggestions: List[str] = []
+        for variant in variants:
+            text = " ".join(variant)
+            if text not in suggestions and self.search(text, limit=1):
+                suggestions.append(text)
+                if len(suggestions) == limit:
+                    break
+        return suggestions
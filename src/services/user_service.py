@@ -1,18 +1,19 @@
 """
 User Service - Business logic for user operations
 """
-from typing import Optional
-import uuid
+from typing import Dict, List, Optional
 
 from src.models.user import User
+from src.utils.id_allocator import IDAllocator, ULIDAllocator
 
 
 class UserService:
     """Service for user-related business operations"""
 
-    def __init__(self, repository):
-        """Initialize service with repository"""
+    def __init__(self, repository, id_allocator: Optional[IDAllocator] = None):
+        """Initialize service with repository and ID allocator"""
         self.repository = repository
+        self.id_allocator = id_allocator or ULIDAllocator()
 
     def register_user(self, username: str, email: str,
                       role: str = "customer") -> Optional[User]:
@@ -66,7 +67,7 @@ class UserService:
         users = self.repository.load_by_filter('users', {'username': username})
         return User.from_dict(users[0]) if users else None
 
-    def get_all_users(self) -> list[User]:
+    def get_all_users(self) -> List[User]:
         """Get all users (admin function)"""
         data = self.repository.load_all('users')
         return [User.from_dict(item) for item in data]
@@ -82,17 +83,19 @@ class UserService:
         """Delete a user (admin function)"""
         return self.repository.delete('users', user_id)
 
-    def get_users_by_role(self, role: str) -> list[User]:
+    def get_users_by_role(self, role: str) -> List[User]:
         """Get users by role"""
         data = self.repository.load_by_filter('users', {'role': role})
         return [User.from_dict(item) for item in data]
 
+    def get_role_counts(self) -> Dict[str, int]:
+        """Count users per role from the role column only"""
+        counts: Dict[str, int] = {}
+        for item in self.repository.iter_all('users', ['role']):
+            role = item.get('role', 'customer')
+            counts[role] = counts.get(role, 0) + 1
+        return counts
+
     def _generate_user_id(self) -> str:
-        """Generate unique user ID"""
-        while True:
-            # Use UUID for uniqueness
-            user_id = f"USR-{str(uuid.uuid4())[:8].upper()}"
-
-            # Check if ID already exists
-            if not self.repository.exists('users', user_id):
-                return user_id
+        """Generate unique user ID (no storage lookup needed)"""
+        return self.id_allocator.allocate('USR')
@@ -0,0 +1,125 @@
+"""
+ID Allocators - Generate entity IDs without reading storage
+"""
+import json
+import os
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Tuple
+
+# Crockford base32: no I, L, O, U so IDs are unambiguous when read aloud
+_CROCKFORD = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+_RANDOM_BITS = 80
+
+
+def _encode_base32(value: int, length: int) -> str:
+    """Encode an integer as fixed-width Crockford base32"""
+    chars = []
+    for _ in range(length):
+        chars.append(_CROCKFORD[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+class IDAllocator(ABC):
+    """Base class for ID allocators: prefix -> unique ID string"""
+
+    @abstractmethod
+    def allocate(self, prefix: str) -> str:
+        """Return a new unique ID such as 'PRD-...'"""
+        pass
+
+
+class ULIDAllocator(IDAllocator):
+    """Time-ordered 128-bit IDs (ULID layout)
+    
+    48 bits of millisecond timestamp followed by 80 random bits, encoded
+    as 26 Crockford base32 characters. IDs created in the same millisecond
+    increment the random part, so IDs from one allocator sort in creation
+    order. Collisions need two processes drawing the same 80 random bits
+    in the same millisecond.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._last_random = 0
+
+    def _next(self) -> Tuple[int, int]:
+        """Get the next (timestamp, random) pair, monotonic per allocator"""
+        now_ms = time.time_ns() // 1_000_000
+        with self._lock:
+            if now_ms <= self._last_ms:
+                now_ms = self._last_ms
+                random_part = self._last_random + 1
+                if random_part >> _RANDOM_BITS:
+                    # Random space of this millisecond exhausted: move on
+                    now_ms += 1
+                    random_part = secrets.randbits(_RANDOM_BITS)
+            else:
+                random_part = secrets.randbits(_RANDOM_BITS)
+            self._last_ms = now_ms
+            self._last_random = random_part
+        return now_ms, random_part
+
+    def allocate(self, prefix: str) -> str:
+        """Return a new time-ordered ID"""
+        now_ms, random_part = self._next()
+        value = (now_ms << _RANDOM_BITS) | random_part
+        return f"{prefix}-{_encode_base32(value, 26)}"
+
+
+class SequenceAllocator(IDAllocator):
+    """Sequential IDs handed out from blocks reserved in a state file
+    
+    Reserving a block writes the state file once; the IDs of the block are
+    then handed out from memory. Numbers left in a block when the process
+    exits are skipped, never reused. Only one process should allocate
+    from the same state file.
+    """
+
+    def __init__(self, data_dir: str = "data",
+                 state_name: str = "id_sequences.json",
+                 block_size: int = 1000, width: int = 8):
+        """Initialize allocator
+
+        Args:
+            data_dir: Data directory of the repository the IDs are for
+            state_name: State file name inside data_dir
+            block_size: Number of IDs reserved per state file write
+            width: Zero-padded width of the number
+        """
+        self.state_file = Path(data_dir) / state_name
+        self.block_size = block_size
+        self.width = width
+        self._lock = threading.Lock()
+        self._blocks: Dict[str, Tuple[int, int]] = {}  # prefix -> (next, end)
+
+    def _reserve_block(self, prefix: str) -> Tuple[int, int]:
+        """Persist a new block reservation and return its range"""
+        state: Dict[str, int] = {}
+        if self.state_file.exists():
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+
+        start = state.get(prefix, 1)
+        state[prefix] = start + self.block_size
+
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.state_file.with_name(self.state_file.name + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.state_file)
+        return start, start + self.block_size
+
+    def allocate(self, prefix: str) -> str:
+        """Return the next sequential ID for a prefix"""
+        with self._lock:
+            next_value, end = self._blocks.get(prefix, (0, 0))
+            if next_value >= end:
+                next_value, end = self._reserve_block(prefix)
+            self._blocks[prefix] = (next_value + 1, end)
+        return f"{prefix}-{next_value:0{self.width}d}"
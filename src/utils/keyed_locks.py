@@ -0,0 +1,74 @@
+"""
+Keyed Locks - One reentrant lock per key (user, product, ...)
+"""
+import asyncio
+import threading
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from typing import Dict, Hashable, List
+
+
+class KeyedLocks:
+    """Hands out a threading.RLock per key, or no-op locks when disabled
+
+    Lets a service serialize work on one user's cart or one product's stock
+    while work on other keys proceeds in parallel. A key's lock exists only
+    while some thread holds or waits for it, so the table does not grow
+    with every key ever used.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._guard = threading.Lock()
+        # key -> [lock, number of threads holding or waiting for it]
+        self._locks: Dict[Hashable, List] = {}
+
+    def hold(self, key: Hashable):
+        """Context manager holding the lock for ``key``"""
+        if not self.enabled:
+            return nullcontext()
+        return self._held(key)
+
+    @contextmanager
+    def _held(self, key: Hashable):
+        """Take the key's lock, dropping it after its last user is done"""
+        with self._guard:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = self._locks[key] = [threading.RLock(), 0]
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._guard:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self._locks[key]
+
+
+class AsyncKeyedLocks:
+    """Hands out an asyncio.Lock per key for coroutines on one event loop
+
+    Unlike KeyedLocks the locks are not reentrant: a coroutine holding a
+    key's lock must not try to take it again. As with KeyedLocks, a key's
+    lock is dropped once no coroutine holds or waits for it.
+    """
+
+    def __init__(self):
+        # key -> [lock, number of coroutines holding or waiting for it]
+        self._locks: Dict[Hashable, List] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable):
+        """Async context manager holding the lock for ``key``"""
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
@@ -182,11 +182,11 @@ def _admin_low_stock_report(self):
 
         if products:
             print(f"\n⚠️  Found {result['count']} product(s) with stock <= {threshold}")
-            print(f"{'ID':<12} {'Name':<25} {'Stock':<8} {'Category':<15}")
-            print("-" * 70)
+            print(f"{'ID':<30} {'Name':<25} {'Stock':<8} {'Category':<15}")
+            print("-" * 88)
 
             for product in products:
-                print(f"{product['id']:<12} {product['name']:<25} "
+                print(f"{product['id']:<30} {product['name']:<25} "
                       f"{product['stock']:<8} {product['category']:<15}")
         else:
             self.menu.print_success(f"All products have stock > {threshold}")
@@ -273,11 +273,11 @@ def _admin_list_users(self):
 
         if users:
             print(f"📊 Found {result['count']} user(s)\n")
-            print(f"{'ID':<12} {'Username':<20} {'Email':<25} {'Role':<10}")
-            print("-" * 75)
+            print(f"{'ID':<30} {'Username':<20} {'Email':<25} {'Role':<10}")
+            print("-" * 93)
 
             for user in users:
-                print(f"{user['id']:<12} {user['username']:<20} "
+                print(f"{user['id']:<30} {user['username']:<20} "
                       f"{user['email']:<25} {user['role']:<10}")
         else:
             self.menu.print_info("No users found")
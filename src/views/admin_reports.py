@@ -7,29 +7,23 @@ def admin_analytics(interface):
     print("📊 ANALYTICS DASHBOARD")
     print("=" * 50)
     
-    # Product statistics
-    product_result = interface.product_controller.list_products()
-    if product_result['success']:
-        products = product_result['products']
-        total_products = len(products)
-        total_stock = sum(p['stock'] for p in products)
-        avg_price = sum(p['price'] for p in products) / total_products if products else 0
+    # Product statistics (price/stock columns only)
+    stats_result = interface.product_controller.get_product_stats()
+    if stats_result['success']:
+        stats = stats_result['stats']
         
-        print(f"📦 Products: {total_products}")
-        print(f"📋 Total Stock: {total_stock}")
-        print(f"💰 Average Price: €{avg_price:.2f}")
+        print(f"📦 Products: {stats['total_products']}")
+        print(f"📋 Total Stock: {stats['total_stock']}")
+        print(f"💰 Average Price: €{stats['average_price']:.2f}")
     
-    # User statistics
-    user_result = interface.user_controller.list_users()
+    # User statistics (role column only)
+    user_result = interface.user_controller.get_user_stats()
     if user_result['success']:
-        users = user_result['users']
-        total_users = len(users)
-        admin_count = sum(1 for u in users if u['role'] == 'admin')
-        customer_count = sum(1 for u in users if u['role'] == 'customer')
+        role_counts = user_result['role_counts']
         
-        print(f"👥 Total Users: {total_users}")
-        print(f"🔑 Admins: {admin_count}")
-        print(f"🛒 Customers: {customer_count}")
+        print(f"👥 Total Users: {user_result['total_users']}")
+        print(f"🔑 Admins: {role_counts.get('admin', 0)}")
+        print(f"🛒 Customers: {role_counts.get('customer', 0)}")
     
     print("=" * 50)
     input("Press Enter to continue...")
@@ -42,11 +36,10 @@ def admin_low_stock_report(interface):
     
     threshold = 5  # Low stock threshold
     
-    result = interface.product_controller.list_products()
+    result = interface.product_controller.get_low_stock_report(threshold)
     
     if result['success']:
-        products = result['products']
-        low_stock = [p for p in products if p['stock'] <= threshold]
+        low_stock = result['products']
         
         if low_stock:
             print(f"⚠️ Found {len(low_stock)} products with low stock:")
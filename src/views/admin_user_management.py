@@ -33,11 +33,11 @@ def admin_list_users(interface):
         
         if users:
             print(f"📊 Found {result['count']} user(s)\n")
-            print(f"{'ID':<12} {'Username':<20} {'Email':<25} {'Role':<10}")
-            print("-" * 75)
+            print(f"{'ID':<30} {'Username':<20} {'Email':<25} {'Role':<10}")
+            print("-" * 93)
             
             for user in users:
-                print(f"{user['id']:<12} {user['username']:<20} "
+                print(f"{user['id']:<30} {user['username']:<20} "
                       f"{user['email']:<25} {user['role']:<10}")
         else:
             print("No users found")
@@ -4,11 +4,13 @@ from .customer_interface import CustomerInterface
 
 
 class WebStoreInterface:
-    def __init__(self, product_controller, user_controller, cart_controller):
+    def __init__(self, product_controller, user_controller, cart_controller,
+                 instrumentation=None):
         self.user_controller = user_controller
         self.guest_ui = GuestInterface(product_controller, user_controller)
         self.customer_ui = CustomerInterface(
-            product_controller, user_controller, cart_controller
+            product_controller, user_controller, cart_controller,
+            instrumentation
         )
     
     def run(self):
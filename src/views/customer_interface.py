@@ -7,10 +7,13 @@ from src.views.menu import SimpleMenu
 class CustomerInterface:
     """Interface for logged-in customers"""
     
-    def __init__(self, product_controller, user_controller, cart_controller):
+    def __init__(self, product_controller, user_controller, cart_controller,
+                 instrumentation=None):
         self.product_controller = product_controller
         self.user_controller = user_controller
         self.cart_controller = cart_controller
+        # InstrumentedRepository when storage instrumentation is on
+        self.instrumentation = instrumentation
     
     def show_customer_menu(self):
         """Menu for logged-in customers"""
@@ -28,6 +31,7 @@ class CustomerInterface:
                 "👤 My Profile",
                 "👑 Admin: Manage Products",
                 "👑 Admin: Manage Users",
+                "📈 Admin: Storage Stats",
                 "🔓 Logout"
             ]
         else:
@@ -67,7 +71,12 @@ class CustomerInterface:
                 self._admin_manage_users()
             else:
                 return False
-        elif choice == 8:  # Logout (Admin only - extra option)
+        elif choice == 8:  # Admin: Storage Stats (Admin only)
+            if self.user_controller.is_admin():
+                self._admin_storage_stats()
+            else:
+                return False
+        elif choice == 9:  # Logout (Admin only - extra option)
             if self.user_controller.is_admin():
                 return self._logout()
             else:
@@ -389,3 +398,37 @@ class CustomerInterface:
         # This would need to be implemented in the user controller
         print("Admin users list feature needs backend implementation")
         input("Press Enter to continue...")
+    
+    def _admin_storage_stats(self):
+        """Admin: Dump repository call, latency and file I/O counters"""
+        print("\n📈 STORAGE STATS")
+        print("-" * 60)
+        
+        if self.instrumentation is None:
+            print("Instrumentation is off "
+                  "(set INSTRUMENT_STORAGE = True in webstore.py)")
+            input("Press Enter to continue...")
+            return
+        
+        stats = self.instrumentation.get_stats()
+        print(f"{'method':<16}{'calls':>7}{'avg ms':>9}{'max ms':>9}  latency")
+        for method, calls in stats['methods'].items():
+            buckets = " ".join(
+                f"{'≤' + format(bound, 'g') if bound else '>1000'}:{count}"
+                for bound, count in calls['histogram'] if count)
+            print(f"{method:<16}{calls['calls']:>7}{calls['avg_ms']:>9.2f}"
+                  f"{calls['max_ms']:>9.2f}  {buckets}")
+        
+        print(f"\n{'entity':<16}{'opens':>7}{'read KB':>10}{'written KB':>12}")
+        for entity_type, io_stats in stats['entities'].items():
+            print(f"{entity_type:<16}{io_stats['file_opens']:>7}"
+                  f"{io_stats['bytes_read'] / 1024:>10.1f}"
+                  f"{io_stats['bytes_written'] / 1024:>12.1f}")
+            for name, opens in sorted(io_stats['files'].items()):
+                print(f"  {name:<28}{opens:>5} opens")
+        
+        if not stats['methods']:
+            print("No repository calls recorded yet")
+        if input("\nReset counters? (y/n): ").lower() == 'y':
+            self.instrumentation.reset()
+            print("✅ Counters reset")
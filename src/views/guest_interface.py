@@ -3,6 +3,9 @@ Guest Interface - Handles non-logged-in user interactions
 """
 from src.views.menu import SimpleMenu
 
+# Search results listed at most, best matches first
+SEARCH_RESULTS_SHOWN = 20
+
 
 class GuestInterface:
     """Interface for guest (non-logged-in) users"""
@@ -148,10 +151,25 @@ class GuestInterface:
         query = input("Search term: ").strip()
 
         if query:
-            result = self.product_controller.search_products(query)
+            result = self.product_controller.search_products(
+                query, limit=SEARCH_RESULTS_SHOWN)
+
+            suggestions = result.get('suggestions') if result['success'] else None
+            if suggestions:
+                print(f"\nNo products found. Did you mean: "
+                      f"{', '.join(repr(s) for s in suggestions)}?")
+                if input(f"Search for '{suggestions[0]}' instead? (y/n): "
+                         ).lower() == 'y':
+                    result = self.product_controller.search_products(
+                        suggestions[0], limit=SEARCH_RESULTS_SHOWN)
+                else:
+                    return
 
             if result['success'] and result['products']:
-                print(f"\n Found {len(result['products'])} products:")
+                if result['count'] == SEARCH_RESULTS_SHOWN:
+                    print(f"\n Best {result['count']} matches:")
+                else:
+                    print(f"\n Found {result['count']} products:")
                 for product in result['products']:
                     print(f"📦 {product['name']} - €{product['price']:.2f}")
             else:
@@ -57,8 +57,8 @@ class SimpleMenu:
                 print("\n👋 Goodbye!")
                 sys.exit(0)
     
-    def get_number_input(self, prompt: str, min_val: float | None = None,
-                         max_val: float | None = None) -> float:
+    def get_number_input(self, prompt: str, min_val: Optional[float] = None,
+                         max_val: Optional[float] = None) -> float:
         """Get numeric input with validation"""
         while True:
             try:
@@ -80,8 +80,8 @@ class SimpleMenu:
                 print("\n👋 Goodbye!")
                 sys.exit(0)
     
-    def get_integer_input(self, prompt: str, min_val: int | None = None,
-                          max_val: int | None = None) -> int:
+    def get_integer_input(self, prompt: str, min_val: Optional[int] = None,
+                          max_val: Optional[int] = None) -> int:
         """Get integer input with validation"""
         return int(self.get_number_input(prompt, min_val, max_val))
     
@@ -0,0 +1,822 @@
+"""Test repository backends"""
+import json
+import os
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent / "src"))
+
+import pytest
+
+from src.repositories.json_repository import JSONRepository
+from src.repositories.csv_repository import CSVRepository
+from src.repositories.entity_table import EntityTable
+from src.repositories.repository_factory import RepositoryFactory
+
+
+def _product(product_id, name="Test Product", category="Test", stock=5):
+    return {
+        'id': product_id,
+        'name': name,
+        'price': 19.99,
+        'category': category,
+        'stock': stock,
+        'description': 'Test item'
+    }
+
+
+@pytest.fixture(params=RepositoryFactory.get_available_types())
+def repo(request, tmp_path):
+    return RepositoryFactory.create_repository(request.param, str(tmp_path))
+
+
+def test_backend_save_and_lookup(repo):
+    repo.save('products', _product('p1', category='Home'))
+    repo.save('products', _product('p2', category='Office'))
+
+    assert [p['id'] for p in repo.load_all('products')] == ['p1', 'p2']
+    assert repo.load_by_id('products', 'p2')['category'] == 'Office'
+    assert repo.load_by_id('products', 'missing') is None
+    assert repo.exists('products', 'p1')
+    assert not repo.exists('products', 'missing')
+
+
+def test_backend_filter(repo):
+    repo.save('products', _product('p1', category='Home', stock=0))
+    repo.save('products', _product('p2', category='Office'))
+    repo.save('products', _product('p3', category='Home'))
+
+    home = repo.load_by_filter('products', {'category': 'Home'})
+    assert [p['id'] for p in home] == ['p1', 'p3']
+    in_stock = repo.load_by_filter('products', {'category': 'Home', 'stock': 5})
+    assert [p['id'] for p in in_stock] == ['p3']
+    assert repo.load_by_filter('products', {'category': 'Garden'}) == []
+
+
+def test_backend_update_and_delete(repo):
+    repo.save('products', _product('p1'))
+    repo.save('products', _product('p2'))
+
+    assert repo.update('products', 'p1', _product('p1', stock=0))
+    assert repo.load_by_id('products', 'p1')['stock'] == 0
+    assert [p['id'] for p in repo.load_all('products')] == ['p1', 'p2']
+
+    assert repo.delete('products', 'p1')
+    assert not repo.exists('products', 'p1')
+    assert [p['id'] for p in repo.load_all('products')] == ['p2']
+
+
+def test_json_cache_hits_and_write_through(tmp_path):
+    repo = JSONRepository(str(tmp_path), cache=True)
+    repo.save('products', _product('p1'))
+    repo.save('products', _product('p2'))
+
+    hits = repo.cache_hits
+    assert repo.load_by_id('products', 'p2')['id'] == 'p2'
+    assert repo.exists('products', 'p1')
+    assert repo.cache_hits == hits + 2
+
+    repo.update('products', 'p1', {'stock': 1})
+    assert repo.load_by_id('products', 'p1')['stock'] == 1
+    assert repo.get_cache_stats()['misses'] == 1
+
+
+def test_json_cache_hands_out_copies(tmp_path):
+    repo = JSONRepository(str(tmp_path), cache=True)
+    repo.save('products', _product('p1'))
+    repo.save('products', _product('p2'))
+
+    repo.load_by_id('products', 'p1')['stock'] = -1
+    repo.load_by_filter('products', {'id': 'p2'})[0]['stock'] = -1
+    repo.load_all('products')[0]['name'] = "changed"
+    next(repo.iter_all('products'))['price'] = 0
+
+    assert repo.load_by_id('products', 'p1') == _product('p1')
+    assert repo.load_by_id('products', 'p2') == _product('p2')
+    assert repo.cache_hits >= 5
+
+
+def test_csv_cache_hands_out_copies(tmp_path):
+    repo = CSVRepository(str(tmp_path), cache=True)
+    repo.save('products', _product('p1'))
+    repo.save('products', _product('p2'))
+    stored = [dict(record) for record in repo.load_all('products')]
+
+    repo.load_by_id('products', 'p1')['stock'] = -1
+    repo.load_by_filter('products', {'id': 'p2'})[0]['stock'] = -1
+    repo.load_all('products')[0]['name'] = "changed"
+    next(repo.iter_all('products'))['price'] = 0
+
+    assert repo.load_all('products') == stored
+    assert list(repo.iter_all('products')) == stored
+
+
+def test_json_cache_sees_external_writes(tmp_path):
+    repo = JSONRepository(str(tmp_path), cache=True)
+    other = JSONRepository(str(tmp_path))
+    repo.save('products', _product('p1'))
+    assert repo.get_count('products') == 1
+
+    other.save('products', _product('p2'))
+    # Make sure the signature differs even on coarse mtime filesystems
+    file_path = tmp_path / 'products.json'
+    stat = file_path.stat()
+    os.utime(file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    misses = repo.cache_misses
+    assert repo.load_by_id('products', 'p2') is not None
+    assert repo.cache_misses == misses + 1
+
+
+def test_entity_table_index_tracks_mutations():
+    table = EntityTable([_product('p1'), _product('p2'), _product('p3')])
+    assert table.position_of('p3') == 2
+
+    table.remove('p2')
+    assert table.position_of('p3') == 1
+    assert table.get('p2') is None
+
+    table.append(_product('p4'))
+    assert table.get('p4')['id'] == 'p4'
+    assert len(table) == 3
+
+
+def test_entity_table_builds_secondary_indexes_on_first_find():
+    table = EntityTable([_product('p1', category='Home'),
+                         _product('p2', category='Office')],
+                        indexed_fields=('category',))
+    table.append(_product('p3', category='Home'))
+    table.update_record(1, {'stock': 0})
+    assert table._field_indexes is None
+
+    assert [p['id'] for p in table.find({'stock': 0})] == ['p2']
+    assert table._field_indexes is None
+    assert [p['id'] for p in table.find({'category': 'Home'})] == ['p1', 'p3']
+
+    # Built indexes are kept current by later mutations
+    table.update_record(1, {'category': 'Home'})
+    table.append(_product('p4', category='Home'))
+    assert [p['id'] for p in table.find({'category': 'Home'})] == \
+        ['p1', 'p2', 'p3', 'p4']
+
+
+def test_csv_indexed_lookups(tmp_path):
+    repo = CSVRepository(str(tmp_path), cache=True)
+    for product_id in ('p1', 'p2', 'p3'):
+        repo.save('products', _product(product_id))
+
+    assert repo.load_by_id('products', 'p2')['price'] == 19.99
+    repo.update('products', 'p2', _product('p2', stock=0))
+    repo.delete('products', 'p1')
+    assert not repo.exists('products', 'p1')
+    assert repo.load_by_id('products', 'p3') is not None
+
+    fresh = CSVRepository(str(tmp_path))
+    assert [p['id'] for p in fresh.load_all('products')] == ['p2', 'p3']
+    assert fresh.load_by_id('products', 'p2')['stock'] == 0
+
+
+def test_secondary_index_follows_mutations(tmp_path):
+    repo = JSONRepository(str(tmp_path), cache=True)
+    repo.save('products', _product('p1', category='Home'))
+    repo.save('products', _product('p2', category='Office'))
+    repo.save('products', _product('p3', category='Home'))
+
+    home = repo.load_by_filter('products', {'category': 'Home'})
+    assert [p['id'] for p in home] == ['p1', 'p3']
+
+    repo.update('products', 'p1', {'category': 'Office'})
+    repo.delete('products', 'p2')
+    office = repo.load_by_filter('products', {'category': 'Office'})
+    assert [p['id'] for p in office] == ['p1']
+    # Mixed indexed / non-indexed filter keys
+    assert repo.load_by_filter('products',
+                               {'category': 'Home', 'stock': 5})[0]['id'] == 'p3'
+    assert repo.load_by_filter('products', {'name': 'Nope'}) == []
+
+
+def test_csv_filter_by_indexed_field(tmp_path):
+    repo = CSVRepository(str(tmp_path), cache=True)
+    repo.save('users', {'id': 'u1', 'username': 'ann', 'email': 'a@x.com',
+                        'role': 'admin', 'created_at': '2025-01-01'})
+    repo.save('users', {'id': 'u2', 'username': 'bob', 'email': 'b@x.com',
+                        'role': 'customer', 'created_at': '2025-01-01'})
+
+    assert repo.load_by_filter('users', {'username': 'bob'})[0]['id'] == 'u2'
+    assert repo.load_by_filter('users', {'role': 'manager'}) == []
+
+
+def test_json_journal_replay_and_compaction(tmp_path):
+    repo = JSONRepository(str(tmp_path), journal=True, compact_threshold=4)
+    repo.save('products', _product('p1'))
+    repo.save('products', _product('p2'))
+    repo.update('products', 'p1', {'stock': 0})
+    assert (tmp_path / 'products.journal').exists()
+    assert not (tmp_path / 'products.json').exists()
+
+    # A fresh instance loads the snapshot and replays the log tail
+    fresh = JSONRepository(str(tmp_path), journal=True)
+    assert fresh.load_by_id('products', 'p1')['stock'] == 0
+    assert fresh.get_count('products') == 2
+
+    repo.delete('products', 'p2')  # 4th record triggers compaction
+    assert not (tmp_path / 'products.journal').exists()
+    plain = JSONRepository(str(tmp_path))
+    assert [p['id'] for p in plain.load_all('products')] == ['p1']
+
+
+def test_json_journal_ignores_log_of_older_snapshot(tmp_path):
+    repo = JSONRepository(str(tmp_path), journal=True, cache=True)
+    repo.save('products', _product('p1'))
+    stale_log = (tmp_path / 'products.journal').read_bytes()
+    repo.compact('products')
+
+    # Simulate a crash after the snapshot was replaced but before the
+    # log was removed: the old log must not be replayed again
+    (tmp_path / 'products.journal').write_bytes(stale_log)
+    fresh = JSONRepository(str(tmp_path), journal=True)
+    assert fresh.get_count('products') == 1
+
+
+def test_backend_batch_operations(repo):
+    assert repo.save_many('products', [_product(f"p{i}") for i in range(5)]) == 5
+
+    updates = {'p1': _product('p1', stock=0), 'p3': _product('p3', stock=0),
+               'missing': _product('missing')}
+    assert repo.update_many('products', updates) == 2
+    assert repo.load_by_id('products', 'p3')['stock'] == 0
+    assert not repo.exists('products', 'missing')
+
+    assert repo.delete_many('products', ['p0', 'p4', 'missing']) == 2
+    assert [p['id'] for p in repo.load_all('products')] == ['p1', 'p2', 'p3']
+
+
+def test_backend_partial_updates_keep_other_fields(repo):
+    repo.save_many('products', [_product('p1', name="Mug", category="Home"),
+                                _product('p2', name="Pen", category="Office")])
+    changes = {'stock': 0}
+    assert repo.update('products', 'p1', changes)
+    assert changes == {'stock': 0}
+    assert repo.update_many('products', {'p1': {'price': 5.0},
+                                         'p2': {'stock': 9},
+                                         'p9': {'stock': 1}}) == 2
+    assert not repo.update('products', 'p9', {'stock': 1})
+
+    assert repo.load_by_id('products', 'p1') == dict(
+        _product('p1', name="Mug", category="Home", stock=0), price=5.0)
+    assert repo.load_by_id('products', 'p2') == \
+        _product('p2', name="Pen", category="Office", stock=9)
+    assert len(repo.load_all('products')) == 2
+
+
+def test_json_batch_is_one_write(tmp_path):
+    repo = JSONRepository(str(tmp_path), journal=True)
+    repo.save_many('products', [_product(f"p{i}") for i in range(3)])
+    repo.update_many('products', {'p0': {'stock': 1}, 'p2': {'stock': 2}})
+
+    fresh = JSONRepository(str(tmp_path), journal=True)
+    assert fresh.load_by_id('products', 'p2')['stock'] == 2
+    assert fresh._get_journal('products').length == 5
+
+
+@pytest.mark.parametrize('batch', [False, True])
+def test_sqlite_concurrent_merges_keep_every_field(tmp_path, batch):
+    import threading
+    from src.repositories.sqlite_repository import SQLiteRepository
+
+    SQLiteRepository(str(tmp_path)).save('products', _product('p1'))
+    fields = [f"f{n}" for n in range(4)]
+
+    def worker(field):
+        # One connection per writer, like separate processes
+        repo = SQLiteRepository(str(tmp_path))
+        for value in range(1, 26):
+            if batch:
+                repo.update_many('products', {'p1': {field: value}})
+            else:
+                repo.update('products', 'p1', {field: value})
+        repo.close()
+
+    threads = [threading.Thread(target=worker, args=(field,))
+               for field in fields]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    record = SQLiteRepository(str(tmp_path)).load_by_id('products', 'p1')
+    assert [record.get(field) for field in fields] == [25] * 4
+
+
+def test_backend_iter_all_streams_in_order(repo):
+    repo.save_many('products', [_product(f"p{i}") for i in range(3)])
+    assert [p['id'] for p in repo.iter_all('products')] == ['p0', 'p1', 'p2']
+    assert list(repo.iter_all('users')) == []
+
+
+def test_json_iter_all_across_chunk_boundaries(tmp_path):
+    import io
+    from src.repositories.json_repository import _iter_json_array
+
+    repo = JSONRepository(str(tmp_path))
+    products = [_product(f"p{i}", name="x" * (i * 7)) for i in range(50)]
+    repo.save_many('products', products)
+    with open(tmp_path / 'products.json', encoding='utf-8') as f:
+        assert list(_iter_json_array(f, chunk_size=16)) == products
+    assert list(_iter_json_array(io.StringIO(' [ ] '))) == []
+
+
+def test_jsonl_appends_and_compacts(tmp_path):
+    from src.repositories.jsonl_repository import JSONLRepository
+
+    repo = JSONLRepository(str(tmp_path), compact_threshold=3)
+    repo.save_many('products', [_product(f"p{i}") for i in range(3)])
+    repo.update('products', 'p0', {'stock': 0})
+    repo.delete('products', 'p1')
+    file_path = tmp_path / 'products.jsonl'
+    assert len(file_path.read_bytes().splitlines()) == 5
+
+    # Simulate a torn append, then keep writing
+    with open(file_path, 'ab') as f:
+        f.write(b'{"id": "p9", "na')
+    repo.save('products', _product('p3'))
+    assert [p['id'] for p in repo.load_all('products')] == ['p0', 'p2', 'p3']
+    assert repo.load_by_id('products', 'p0')['stock'] == 0
+
+    generation = repo.get_version('products')[0]
+    repo.update('products', 'p2', {'stock': 1})  # 3rd dead line compacts
+    assert len(file_path.read_bytes().splitlines()) == 3
+    assert repo.load_by_id('products', 'p2')['stock'] == 1
+    # Compaction follows the write without counting as another one
+    assert repo.get_write_version('products') == \
+        repo.get_version('products') == \
+        (generation + 1, repo.get_version('products')[1])
+    assert repo.get_count('products') == 3
+
+
+@pytest.mark.parametrize('repo_type', ['json', 'csv'])
+@pytest.mark.parametrize('compression', [None, 'gzip', 'zlib'])
+def test_file_encodings_round_trip(tmp_path, repo_type, compression):
+    options = {'compression': compression}
+    if repo_type == 'json':
+        options['indent'] = None
+    repo = RepositoryFactory.create_repository(repo_type, str(tmp_path),
+                                               **options)
+    repo.save_many('products', [_product(f"p{i}") for i in range(20)])
+
+    # A default-configured instance sniffs the encoding when reading
+    reader = RepositoryFactory.create_repository(repo_type, str(tmp_path))
+    assert [p['id'] for p in reader.iter_all('products')][-1] == 'p19'
+    assert reader.load_by_id('products', 'p7')['price'] == 19.99
+    assert reader.update('products', 'p7', _product('p7', stock=0))
+    assert repo.load_by_id('products', 'p7')['stock'] == 0
+
+
+def test_json_journal_with_compressed_snapshot(tmp_path):
+    repo = JSONRepository(str(tmp_path), journal=True, compression='gzip')
+    repo.save_many('products', [_product('p1'), _product('p2')])
+    repo.compact('products')
+    repo.delete('products', 'p1')
+
+    fresh = JSONRepository(str(tmp_path), journal=True)
+    assert [p['id'] for p in fresh.load_all('products')] == ['p2']
+
+
+def test_csv_schema_follows_file_header(tmp_path):
+    (tmp_path / 'products.csv').write_text(
+        'stock,id,price,name,extra\n3,p1,2.5,Pen,x\n', encoding='utf-8')
+    repo = CSVRepository(str(tmp_path))
+
+    assert repo.load_by_id('products', 'p1') == {
+        'stock': 3, 'id': 'p1', 'price': 2.5, 'name': 'Pen', 'extra': 'x'}
+    assert not repo.save('products', {'id': 'p2', 'bogus': 1})
+
+
+def test_backend_projection(repo):
+    repo.save('products', _product('p1', category='Home', stock=0))
+    repo.save('products', _product('p2', category='Office'))
+
+    assert repo.load_all('products', fields=['id', 'stock']) == [
+        {'id': 'p1', 'stock': 0}, {'id': 'p2', 'stock': 5}]
+    assert repo.load_by_filter('products', {'category': 'Office'},
+                               fields=['price']) == [{'price': 19.99}]
+    assert list(repo.iter_all('products', fields=['category'])) == [
+        {'category': 'Home'}, {'category': 'Office'}]
+
+
+def test_backend_metadata_tracks_writes(repo):
+    assert repo.is_empty('products')
+    repo.save_many('products', [_product('p1'), _product('p2')])
+    first = repo.get_metadata('products')
+    repo.delete('products', 'p1')
+    second = repo.get_metadata('products')
+
+    assert first['count'] == 2
+    assert second['count'] == repo.get_count('products') == 1
+    assert second['generation'] > first['generation']
+    assert not repo.is_empty('products')
+
+
+@pytest.mark.parametrize('repo_type', ['json', 'csv'])
+def test_count_served_from_sidecar(tmp_path, repo_type, monkeypatch):
+    repo = RepositoryFactory.create_repository(repo_type, str(tmp_path))
+    repo.save_many('products', [_product(f"p{i}") for i in range(3)])
+
+    reader = RepositoryFactory.create_repository(repo_type, str(tmp_path))
+    monkeypatch.setattr(reader, '_load_table', None)
+    assert reader.get_count('products') == 3
+
+
+def test_sidecar_ignored_after_external_edit(tmp_path):
+    repo = JSONRepository(str(tmp_path))
+    repo.save_many('products', [_product('p1'), _product('p2')])
+    generation = repo.get_metadata('products')['generation']
+
+    (tmp_path / 'products.json').write_text(
+        json.dumps([_product('p9')]), encoding='utf-8')
+    meta = JSONRepository(str(tmp_path)).get_metadata('products')
+    assert meta == {'count': 1, 'generation': generation + 1}
+
+
+@pytest.mark.parametrize('repo_type', ['json', 'csv', 'jsonl'])
+def test_generation_advances_across_instances(tmp_path, repo_type):
+    first = RepositoryFactory.create_repository(repo_type, str(tmp_path))
+    second = RepositoryFactory.create_repository(repo_type, str(tmp_path))
+    first.save_many('products', [_product('p1'), _product('p2')])
+    assert second.get_metadata('products') == first.get_metadata('products')
+
+    # Each instance continues from the other's writes, not its own view
+    second.delete('products', 'p2')
+    seen_by_second = second.get_metadata('products')['generation']
+    first.save_many('products', [_product('p3')])
+    after_first = first.get_metadata('products')['generation']
+    assert after_first > seen_by_second
+    assert second.get_metadata('products') == \
+        {'count': 2, 'generation': after_first}
+
+
+def _hammer_updates(repo_type, data_dir, options, worker, iterations):
+    """Worker process: repeatedly update its own product and read all"""
+    repo = RepositoryFactory.create_repository(repo_type, data_dir,
+                                               locking=True, **options)
+    for stock in range(1, iterations + 1):
+        if not repo.update('products', f"p{worker}",
+                           _product(f"p{worker}", stock=stock)):
+            os._exit(1)
+        # Atomic replacement means readers never see a partial file
+        if len(repo.load_all('products')) != 4:
+            os._exit(2)
+    os._exit(0)
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork'), reason="needs fork")
+@pytest.mark.parametrize('repo_type,options', [
+    ('json', {}),
+    ('json', {'journal': True, 'compact_threshold': 7}),
+    ('json', {'cache': True}),
+    ('csv', {}),
+])
+def test_locking_prevents_lost_updates(tmp_path, repo_type, options):
+    import multiprocessing
+
+    workers, iterations = 4, 30
+    repo = RepositoryFactory.create_repository(repo_type, str(tmp_path),
+                                               locking=True, **options)
+    repo.save_many('products', [_product(f"p{i}", stock=0)
+                                for i in range(workers)])
+
+    context = multiprocessing.get_context('fork')
+    processes = [context.Process(target=_hammer_updates,
+                                 args=(repo_type, str(tmp_path), options,
+                                       worker, iterations))
+                 for worker in range(workers)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(60)
+
+    assert [process.exitcode for process in processes] == [0] * workers
+    assert [p['stock'] for p in repo.load_all('products')] == \
+        [iterations] * workers
+
+
+@pytest.mark.parametrize('repo_type', ['json', 'csv'])
+def test_thread_safe_mode_keeps_concurrent_updates(tmp_path, repo_type):
+    import threading
+
+    repo = RepositoryFactory.create_repository(
+        repo_type, str(tmp_path), cache=True, thread_safe=True)
+    repo.save_many('products', [_product(f"p{i}", stock=0) for i in range(8)])
+
+    seen = []
+
+    def worker(n):
+        for stock in range(1, 26):
+            repo.update('products', f"p{n}", _product(f"p{n}", stock=stock))
+            seen.append(len(repo.load_by_filter('products',
+                                                {'category': 'Test'})))
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert seen == [8] * 200
+    assert [p['stock'] for p in repo.load_all('products')] == [25] * 8
+
+
+def test_async_repository_coalesces_reads(tmp_path):
+    import asyncio
+    from src.repositories.async_repository import ExecutorRepository
+
+    repo = ExecutorRepository(JSONRepository(str(tmp_path), thread_safe=True))
+
+    async def scenario():
+        await repo.save_many('products', [_product('p1'), _product('p2')])
+        results = await asyncio.gather(
+            *(repo.load_all('products') for _ in range(50)))
+        assert all(len(result) == 2 for result in results)
+        assert repo.coalesced_reads > 0
+
+        # Reads after a write never reuse a result from before it
+        await repo.delete('products', 'p1')
+        assert [p['id'] for p in await repo.load_all('products')] == ['p2']
+        assert await repo.get_count('products') == 1
+
+    asyncio.run(scenario())
+    repo.close()
+
+
+@pytest.mark.parametrize('max_workers', [1, 4])
+def test_async_repository_over_sqlite(tmp_path, max_workers):
+    import asyncio
+    from src.repositories.async_repository import ExecutorRepository
+
+    backend = RepositoryFactory.create_repository('sqlite', str(tmp_path))
+    repo = ExecutorRepository(backend, max_workers=max_workers)
+
+    async def scenario():
+        # Each executor thread gets its own connection
+        assert await repo.save_many('products', [_product(f"p{i}")
+                                                 for i in range(20)]) == 20
+        found = await asyncio.gather(
+            *(repo.load_by_id('products', f"p{i}") for i in range(20)))
+        assert [p['id'] for p in found] == [f"p{i}" for i in range(20)]
+        updated = await asyncio.gather(
+            *(repo.update('products', f"p{i}", {'stock': i}) for i in range(20)))
+        assert all(updated)
+        assert sum(p['stock'] for p in await repo.load_all('products')) == 190
+
+    asyncio.run(scenario())
+    repo.close()
+    backend.close()
+
+
+def test_mirrored_repository_replicates_in_batches(tmp_path):
+    from src.repositories.mirrored_repository import MirroredRepository
+
+    primary = JSONRepository(str(tmp_path / 'json'))
+    replica = CSVRepository(str(tmp_path / 'csv'))
+    mirror = MirroredRepository(primary, replica, flush_interval=0.05)
+
+    product = dict(_product('p1'), created_at='2025-01-01T00:00:00')
+    assert mirror.save('products', product)
+    mirror.save_many('products', [_product('p2'), _product('p3')])
+    assert mirror.update('products', 'p1', {'stock': 0})
+    assert mirror.delete('products', 'p2')
+    assert mirror.load_by_id('products', 'p1')['created_at'] == \
+        '2025-01-01T00:00:00'
+
+    mirror.flush()
+    stats = mirror.get_replication_stats()
+    assert stats['pending'] == 0 and stats['errors'] == 0
+    assert stats['applied'] == 5 and stats['batches'] <= 5
+    assert [p['id'] for p in replica.load_all('products')] == ['p1', 'p3']
+    assert replica.load_by_id('products', 'p1')['stock'] == 0
+
+    # Changes still queued at shutdown are written by close()
+    mirror.delete('products', 'p3')
+    mirror.close()
+    assert [p['id'] for p in replica.load_all('products')] == ['p1']
+
+
+def test_mirrored_repository_batches_read_back_and_skips_carts(tmp_path):
+    mirror = RepositoryFactory.create_mirrored_repository(
+        'json', str(tmp_path / 'json'), str(tmp_path / 'csv'))
+    mirror.flush_interval = 0.05
+    mirror.save_many('products', [_product(f"p{i}") for i in range(5)])
+
+    lookups = []
+    primary_load = mirror.primary.load_by_id
+    mirror.primary.load_by_id = lambda *args: lookups.append(args) or \
+        primary_load(*args)
+    assert mirror.update_many('products', {f"p{i}": {'stock': 0}
+                                           for i in range(5)}) == 5
+    assert lookups == []
+
+    # Only IDs the primary deleted are deleted from the replica
+    mirror.flush()
+    mirror.replica.save('products', _product('replica-only'))
+    assert mirror.delete_many('products', ['p4', 'replica-only']) == 1
+
+    cart = {'id': 'c1', 'user_id': 'u1', 'items': [{'product_id': 'p1'}]}
+    assert mirror.save('carts', cart)
+    mirror.flush()
+    assert mirror.load_by_id('carts', 'c1') == cart
+    assert not (tmp_path / 'csv' / 'carts.csv').exists()
+    assert [p['id'] for p in mirror.replica.load_all('products')] == \
+        ['p0', 'p1', 'p2', 'p3', 'replica-only']
+    assert [p['stock'] for p in mirror.replica.load_all('products')][:4] == \
+        [0] * 4
+    assert mirror.get_replication_stats()['errors'] == 0
+    mirror.close()
+
+
+def test_mirrored_repository_closes_with_a_full_queue(tmp_path):
+    import threading
+    from src.repositories.mirrored_repository import MirroredRepository
+
+    replica = CSVRepository(str(tmp_path / 'csv'))
+    mirror = MirroredRepository(JSONRepository(str(tmp_path / 'json')),
+                                replica, batch_size=1, max_pending=2,
+                                flush_interval=0.01)
+    for i in range(6):
+        mirror.save('products', _product(f"p{i}"))
+
+    closing = threading.Thread(target=mirror.close)
+    closing.start()
+    closing.join(timeout=10)
+    assert not closing.is_alive()
+    assert len(replica.load_all('products')) == 6
+
+
+def test_change_feed_events_and_durable_log(tmp_path):
+    from src.repositories.change_feed import ChangeFeedRepository
+
+    feed = ChangeFeedRepository(JSONRepository(str(tmp_path)), str(tmp_path))
+    seen = []
+    unsubscribe = feed.subscribe(seen.append)
+
+    feed.save_many('products', [_product('p1'), _product('p2')])
+    feed.update('products', 'p1', {'stock': 0})
+    feed.delete_many('products', ['p2', 'missing'])
+    unsubscribe()
+    feed.save('users', {'id': 'u1', 'username': 'ann'})
+
+    assert [(e['seq'], e['op'], e['id']) for e in seen] == [
+        (1, 'save', 'p1'), (2, 'save', 'p2'), (3, 'update', 'p1'),
+        (4, 'delete', 'p2')]
+    assert seen[2]['data']['stock'] == 0 and seen[2]['data']['name']
+
+    # Sequence numbers and history survive a restart; a torn tail is dropped
+    with open(tmp_path / 'changes.log', 'ab') as f:
+        f.write(b'{"seq": 6, "entity')
+    reopened = ChangeFeedRepository(JSONRepository(str(tmp_path)),
+                                    str(tmp_path))
+    assert reopened.last_seq == 5
+    assert [e['seq'] for e in reopened.changes_since(2)] == [3, 4, 5]
+    assert [e['id'] for e in reopened.changes_since(0, 'users')] == ['u1']
+    reopened.delete('users', 'u1')
+    assert reopened.changes_since(5)[0]['seq'] == 6
+
+    # A line that parses but is not an event is treated as a corrupt tail
+    for junk in (b'{"entity_type": "users"}\n', b'[6]\n'):
+        with open(tmp_path / 'changes.log', 'ab') as f:
+            f.write(junk)
+        assert ChangeFeedRepository(JSONRepository(str(tmp_path)),
+                                    str(tmp_path)).last_seq == 6
+
+
+def test_change_feed_reads_batches_once_and_truncates(tmp_path, monkeypatch):
+    from src.repositories.change_feed import ChangeFeedRepository
+
+    repo = JSONRepository(str(tmp_path))
+    feed = ChangeFeedRepository(repo, str(tmp_path))
+    feed.save_many('products', [_product(f"p{i}") for i in range(6)])
+
+    calls = []
+    for name in ('load_by_id', 'exists'):
+        original = getattr(repo, name)
+        monkeypatch.setattr(repo, name, lambda *args, _name=name,
+                            _original=original: calls.append(_name) or
+                            _original(*args))
+    feed.update_many('products', {f"p{i}": {'stock': i} for i in range(4)})
+    feed.delete_many('products', ['p4', 'p5', 'missing'])
+    assert calls == []
+    assert feed.last_seq == 12
+
+    # A partly failed batch only reports the records that were stored
+    save = repo.save
+    monkeypatch.setattr(repo, 'save_many', lambda entity_type, records: sum(
+        save(entity_type, record) for record in records
+        if record['id'] != 'bad'))
+    seen = []
+    feed.subscribe(seen.append)
+    assert feed.save_many('products', [_product('p6'), _product('bad'),
+                                       _product('p7')]) == 2
+    assert [e['id'] for e in seen] == ['p6', 'p7']
+    feed.delete_many('products', ['p6', 'p7'])
+    assert feed.last_seq == 16
+
+    # Events every consumer has seen can be dropped; numbering carries on
+    assert feed.truncate_changes(12) == 12
+    assert [e['seq'] for e in feed.changes_since(0)] == [13, 14, 15, 16]
+    assert feed.truncate_changes(100) == 3
+    reopened = ChangeFeedRepository(JSONRepository(str(tmp_path)),
+                                    str(tmp_path))
+    assert reopened.last_seq == 16
+    reopened.delete('products', 'p0')
+    assert [e['seq'] for e in reopened.changes_since(0)] == [16, 17]
+
+
+def test_change_log_seeks_from_checkpoints(tmp_path):
+    from src.repositories.change_feed import ChangeLog
+
+    log = ChangeLog(tmp_path / 'changes.log', index_every=10)
+    for i in range(5):
+        log.append([{'entity_type': 'products', 'id': f"p{n}", 'op': 'save',
+                     'data': None} for n in range(i * 7, i * 7 + 7)])
+    assert [seq for seq, _ in log._checkpoints] == [1, 11, 21, 31]
+    assert [e['seq'] for e in log.since(29)] == [30, 31, 32, 33, 34, 35]
+    assert [e['id'] for e in ChangeLog(tmp_path / 'changes.log').since(33)] == \
+        ['p33', 'p34']
+
+
+def test_backend_replace_all_streams_records(repo):
+    repo.save_many('products', [_product('old1'), _product('old2')])
+    written = repo.replace_all('products',
+                               (_product(f"p{i}") for i in range(25)),
+                               chunk_size=10)
+    assert written == 25
+    assert [p['id'] for p in repo.iter_all('products')] == \
+        [f"p{i}" for i in range(25)]
+    assert repo.load_by_id('products', 'old1') is None
+    assert repo.get_count('products') == 25
+
+
+@pytest.mark.parametrize('options', [{}, {'indent': None},
+                                     {'journal': True, 'compression': 'zlib'}])
+def test_json_replace_all_matches_regular_write(tmp_path, options):
+    records = [_product(f"p{i}", name="Café") for i in range(5)]
+    regular = JSONRepository(str(tmp_path / 'a'), **options)
+    regular.save_many('products', records)
+    regular.compact('products')
+    streamed = JSONRepository(str(tmp_path / 'b'), **options)
+    streamed.replace_all('products', iter(records))
+
+    assert JSONRepository(str(tmp_path / 'b')).load_all('products') == records
+    if not options.get('compression'):
+        assert (tmp_path / 'a' / 'products.json').read_bytes() == \
+            (tmp_path / 'b' / 'products.json').read_bytes()
+    # The journal written after a streamed snapshot still replays
+    streamed.delete('products', 'p0')
+    assert JSONRepository(str(tmp_path / 'b'), journal=True).get_count(
+        'products') == 4
+
+
+@pytest.mark.parametrize('target_type', ['csv', 'sqlite', 'jsonl', 'json'])
+def test_migration_copies_and_verifies(tmp_path, target_type):
+    from src.repositories.migration import migrate
+
+    source = JSONRepository(str(tmp_path / 'source'))
+    source.save_many('products', [_product(f"p{i}") for i in range(12)])
+    target = RepositoryFactory.create_repository(target_type,
+                                                 str(tmp_path / 'target'))
+    target.save('products', _product('stale'))
+
+    seen = []
+    reports = migrate(source, target, ['products'], chunk_size=5,
+                      progress=lambda entity, count, secs: seen.append(count))
+    assert reports[0]['verified'] and reports[0]['count'] == 12
+    assert seen == [5, 10, 12]
+    assert [p['id'] for p in target.iter_all('products')] == \
+        [f"p{i}" for i in range(12)]
+    assert target.load_by_id('products', 'p3')['price'] == 19.99
+
+
+def test_instrumented_repository_counts_calls_and_file_io(tmp_path):
+    from src.repositories.instrumented_repository import InstrumentedRepository
+
+    repo = InstrumentedRepository(JSONRepository(str(tmp_path)))
+    repo.save_many('products', [_product('p1'), _product('p2')])
+    assert repo.load_by_id('products', 'p2')['id'] == 'p2'
+    repo.load_by_id('products', 'p1')
+    assert len(list(repo.iter_all('products'))) == 2
+
+    stats = repo.get_stats()
+    size = (tmp_path / 'products.json').stat().st_size
+    assert stats['methods']['load_by_id']['calls'] == 2
+    assert sum(count for _, count in
+               stats['methods']['load_by_id']['histogram']) == 2
+    assert stats['methods']['iter_all']['calls'] == 1
+    products = stats['entities']['products']
+    # One read per load_by_id plus the streamed read of iter_all
+    assert products['files']['products.json'] == 4
+    assert products['bytes_read'] >= 3 * size
+    assert products['bytes_written'] >= size
+
+    repo.enabled = False
+    repo.load_all('products')
+    assert repo.get_stats()['methods'].keys() == stats['methods'].keys()
+    repo.reset()
+    assert repo.get_stats() == {'methods': {}, 'entities': {}}
@@ -0,0 +1,408 @@
+"""Test service layer on top of the repositories"""
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent / "src"))
+
+import pytest
+
+from src.repositories.json_repository import JSONRepository
+from src.services.product_service import ProductService
+
+
+def _service(tmp_path, **options):
+    return ProductService(JSONRepository(str(tmp_path), **options))
+
+
+def test_bulk_discount_and_stock(tmp_path):
+    service = _service(tmp_path)
+    mug = service.create_product("Coffee Mug", 10.0, "Home", stock=5)
+    lamp = service.create_product("Desk Lamp", 20.0, "Home", stock=5)
+    pen = service.create_product("Pen", 2.0, "Office", stock=5)
+
+    assert service.apply_discount_to_category("Home", 50) == 2
+    assert service.get_product_by_id(mug.id).price == 5.0
+    assert service.get_product_by_id(pen.id).price == 2.0
+
+    assert service.bulk_update_stock({mug.id: 0, lamp.id: -1, "nope": 3}) == 1
+    assert service.get_product_by_id(mug.id).stock == 0
+    assert service.get_product_by_id(lamp.id).stock == 5
+
+
+def test_aggregates_stream_from_repository(tmp_path):
+    service = _service(tmp_path)
+    service.create_product("Coffee Mug", 10.0, "Home", stock=2)
+    service.create_product("Pen", 2.0, "Office", stock=50)
+
+    assert service.get_categories() == ["Home", "Office"]
+    assert [p.name for p in service.get_low_stock_products()] == ["Coffee Mug"]
+
+
+def test_projected_reports(tmp_path):
+    service = _service(tmp_path)
+    service.create_product("Coffee Mug", 10.0, "Home", stock=2)
+    service.create_product("Pen", 2.0, "Office", stock=0)
+
+    stats = service.get_inventory_stats()
+    assert stats['total_products'] == 2
+    assert stats['total_stock'] == 2
+    assert stats['average_price'] == 6.0
+    assert stats['out_of_stock_count'] == 1
+    assert [p['name'] for p in service.get_low_stock_summary(1)] == ["Pen"]
+    assert service.get_product_fields(['name']) == [
+        {'name': "Coffee Mug"}, {'name': "Pen"}]
+
+
+def test_id_allocators_need_no_storage(tmp_path):
+    from src.utils.id_allocator import (IDAllocator, SequenceAllocator,
+                                        ULIDAllocator)
+
+    ulids = ULIDAllocator()
+    ids = [ulids.allocate('PRD') for _ in range(2000)]
+    assert len(set(ids)) == 2000
+    assert ids == sorted(ids)
+    assert len(ids[0]) == len('PRD-') + 26
+
+    repository = JSONRepository(str(tmp_path))
+    sequence = SequenceAllocator(str(repository.data_dir), block_size=10)
+    assert [sequence.allocate('ORD') for _ in range(11)][-1] == 'ORD-00000011'
+    assert (tmp_path / 'id_sequences.json').exists()
+    # A new process continues after the reserved block
+    assert SequenceAllocator(str(tmp_path)).allocate('ORD') == 'ORD-00000021'
+    with pytest.raises(TypeError):
+        IDAllocator()
+
+
+def test_create_product_does_not_probe_repository(tmp_path):
+    repository = JSONRepository(str(tmp_path), cache=True)
+    service = ProductService(repository)
+    service.create_product("Pen", 2.0, "Office")
+    misses = repository.cache_misses
+    hits = repository.cache_hits
+
+    service.create_product("Mug", 5.0, "Home")
+    # Exactly one table load for the save itself
+    assert repository.cache_hits + repository.cache_misses == hits + misses + 1
+
+
+def test_thread_safe_checkouts_do_not_lose_stock(tmp_path):
+    import threading
+    from src.services.cart_service import CartService
+
+    products = ProductService(JSONRepository(str(tmp_path), cache=True,
+                                             thread_safe=True),
+                              thread_safe=True)
+    carts = CartService(products, str(tmp_path), thread_safe=True)
+    mug = products.create_product("Coffee Mug", 10.0, "Home", stock=100)
+
+    def shopper(user_id):
+        for _ in range(5):
+            carts.add_to_cart(user_id, mug.id, 2)
+            assert carts.checkout(user_id)['success']
+
+    threads = [threading.Thread(target=shopper, args=(f"USR-{n}",))
+               for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert products.get_product_by_id(mug.id).stock == 100 - 8 * 5 * 2
+
+
+def test_keyed_locks_are_dropped_after_use():
+    import asyncio
+    import threading
+    from src.utils.keyed_locks import AsyncKeyedLocks, KeyedLocks
+
+    locks = KeyedLocks(enabled=True)
+    totals = {}
+
+    def worker(n):
+        for i in range(200):
+            key = f"USR-{i % 10}"
+            with locks.hold(key):
+                with locks.hold(key):  # reentrant
+                    totals[key] = totals.get(key, 0) + 1
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sum(totals.values()) == 800 and locks._locks == {}
+
+    async_locks = AsyncKeyedLocks()
+
+    async def scenario():
+        async def bump(key):
+            async with async_locks.hold(key):
+                value = totals[key]
+                await asyncio.sleep(0)
+                totals[key] = value + 1
+
+        await asyncio.gather(*(bump(f"USR-{i % 3}") for i in range(30)))
+
+    asyncio.run(scenario())
+    assert sum(totals.values()) == 830 and async_locks._locks == {}
+
+
+def test_delete_waits_for_writers_of_the_same_product(tmp_path):
+    import threading
+
+    products = ProductService(JSONRepository(str(tmp_path), cache=True,
+                                             thread_safe=True),
+                              thread_safe=True)
+    mug = products.create_product("Coffee Mug", 10.0, "Home", stock=5)
+
+    deleter = threading.Thread(target=products.delete_product, args=(mug.id,))
+    with products._product_locks.hold(mug.id):
+        deleter.start()
+        deleter.join(0.2)
+        # An adjust_stock holding the lock still sees its product
+        assert deleter.is_alive()
+        assert products.adjust_stock(mug.id, -1)
+    deleter.join()
+    assert products.get_product_by_id(mug.id) is None
+    assert products.search_products("mug") == []
+
+
+def test_async_shoppers_share_one_process(tmp_path):
+    import asyncio
+    from src.repositories.async_repository import ExecutorRepository
+    from src.services.async_product_service import AsyncProductService
+    from src.services.async_user_service import AsyncUserService
+    from src.services.async_cart_service import AsyncCartService
+
+    repository = ExecutorRepository(
+        JSONRepository(str(tmp_path), cache=True, thread_safe=True))
+    products = AsyncProductService(repository)
+    users = AsyncUserService(repository)
+    carts = AsyncCartService(products, str(tmp_path))
+
+    async def scenario():
+        mug = await products.create_product("Coffee Mug", 10.0, "Home",
+                                            stock=1000)
+        registered = await asyncio.gather(
+            *(users.register_user("ann", "ann@x.com") for _ in range(5)))
+        assert sum(user is not None for user in registered) == 1
+
+        async def shopper(n):
+            assert await carts.add_to_cart(f"USR-{n}", mug.id, 2)
+            return await carts.checkout(f"USR-{n}")
+
+        orders = await asyncio.gather(*(shopper(n) for n in range(200)))
+        assert all(order['success'] for order in orders)
+        assert (await products.get_product_by_id(mug.id)).stock == 600
+        await carts.save_all_carts()
+
+    asyncio.run(scenario())
+    repository.close()
+
+
+def test_product_cache_reuses_objects_until_they_change(tmp_path):
+    service = ProductService(JSONRepository(str(tmp_path)), cache_size=2)
+    mug = service.create_product("Coffee Mug", 10.0, "Home", stock=5)
+    pen = service.create_product("Pen", 2.0, "Office", stock=5)
+    lamp = service.create_product("Desk Lamp", 20.0, "Home", stock=5)
+
+    first = service.get_product_by_id(mug.id)
+    assert service.get_product_by_id(mug.id) is first
+    assert service.adjust_stock(mug.id, -2)
+    assert service.get_product_by_id(mug.id).stock == 3
+
+    # Bounded: the least recently used product drops out
+    service.get_product_by_id(pen.id)
+    service.get_product_by_id(lamp.id)
+    assert service.get_cache_stats()['size'] == 2
+    assert service.get_product_by_id(pen.id) is service.get_product_by_id(pen.id)
+
+    # Another writer on the same files bumps the generation
+    other = _service(tmp_path)
+    other.update_stock(pen.id, 0)
+    assert service.get_product_by_id(pen.id).stock == 0
+    assert service.get_product_by_id("PRD-missing") is None
+
+
+def test_product_cache_follows_interleaved_writers(tmp_path):
+    first, second = _service(tmp_path), _service(tmp_path)
+    mug = first.create_product("Coffee Mug", 10.0, "Home", stock=10)
+    pen = first.create_product("Pen", 2.0, "Office", stock=10)
+    assert second.get_product_by_id(mug.id).stock == 10
+
+    # Neither service may mistake the other's write for its own
+    second.update_stock(pen.id, 3)
+    first.update_stock(mug.id, 0)
+    assert second.get_product_by_id(mug.id).stock == 0
+    first.update_stock(mug.id, 4)
+    second.update_stock(pen.id, 2)
+    assert second.get_product_by_id(mug.id).stock == 4
+    assert first.get_product_by_id(pen.id).stock == 2
+
+
+def test_product_cache_checks_sqlite_without_counting(tmp_path, monkeypatch):
+    from src.repositories.sqlite_repository import SQLiteRepository
+
+    repository = SQLiteRepository(str(tmp_path))
+    service = ProductService(repository)
+    mug = service.create_product("Coffee Mug", 10.0, "Home", stock=5)
+    monkeypatch.setattr(repository, 'get_count', None)
+    assert service.get_product_by_id(mug.id) is service.get_product_by_id(mug.id)
+
+    other = SQLiteRepository(str(tmp_path))
+    other.update('products', mug.id, {'stock': 1})
+    assert service.get_product_by_id(mug.id).stock == 1
+    other.close()
+    repository.close()
+
+
+def test_search_ranks_and_follows_writes(tmp_path):
+    service = _service(tmp_path)
+    lamp = service.create_product("Desk Lamp", 20.0, "Home",
+                                  description="Warm light for a desk")
+    desk = service.create_product("Standing Desk", 300.0, "Office",
+                                  description="Adjustable desk, desk frame")
+    service.create_product("Pen", 2.0, "Office", description="Blue ink")
+
+    # Name hits outrank description hits; words also match by prefix
+    assert [p.id for p in service.search_products("desk")] == [desk.id, lamp.id]
+    assert [p.id for p in service.search_products("lam")] == [lamp.id]
+    assert [p.id for p in service.search_products("desk warm")] == [lamp.id]
+    assert service.search_products("office pen")[0].name == "Pen"
+
+    # The built index is updated by the service's own writes...
+    service.update_product(lamp.id, name="Floor Light")
+    service.delete_product(desk.id)
+    mug = service.create_product("Desk Mug", 5.0, "Home")
+    assert [p.id for p in service.search_products("desk")] == [mug.id, lamp.id]
+    service.update_stock(mug.id, 0)
+    assert service.search_products("mug")[0].stock == 0
+
+    # ...and rebuilt after a write from elsewhere
+    _service(tmp_path).create_product("Desk Chair", 80.0, "Office")
+    assert len(service.search_products("desk", limit=2)) == 2
+    assert len(service.search_products("desk")) == 3
+
+
+def test_misspelled_search_suggests_corrections(tmp_path):
+    from src.controllers.product_search import ProductSearch
+    from src.services.fuzzy_index import bounded_edit_distance
+
+    assert bounded_edit_distance("keybaord", "keyboard", 2) == 1
+    assert bounded_edit_distance("laptop", "lamp", 1) is None
+
+    service = _service(tmp_path)
+    laptop = service.create_product("Gaming Laptop", 999.0, "Electronics")
+    service.create_product("Wireless Keyboard", 49.0, "Electronics")
+    service.create_product("Coffee Mug", 9.0, "Home")
+
+    assert service.search_products("gamng labtop") == []
+    assert service.suggest_queries("gamng labtop") == ["gaming laptop"]
+    assert [p.id for p in service.search_products("labtop", fuzzy=True)] == \
+        [laptop.id]
+    assert service.suggest_queries("laptop") == []
+    assert service.suggest_queries("zzzzzz") == []
+
+    result = ProductSearch(service).search_products("cofee")
+    assert result['count'] == 0 and result['suggestions'] == ["coffee"]
+
+    # Names leave the trigram index with their last product
+    service.update_product(laptop.id, name="Gaming Console")
+    assert service.suggest_queries("labtop") == []
+    assert service.suggest_queries("consle") == ["console"]
+
+
+def test_autocomplete_ranks_by_stock_and_follows_writes(tmp_path):
+    from src.controllers.product_search import ProductSearch
+
+    service = _service(tmp_path)
+    mug = service.create_product("Coffee Mug", 9.0, "Home", stock=3)
+    maker = service.create_product("Coffee Maker", 59.0, "Kitchen", stock=10)
+    service.create_product("Café Table", 120.0, "Home", stock=1)
+
+    def texts(prefix, limit=10):
+        return [c['text'] for c in service.autocomplete(prefix, limit)]
+
+    # Best stocked first; accents and case don't matter
+    assert texts("co") == ["Coffee Maker", "Coffee Mug"]
+    assert texts("CAF") == ["Café Table"]
+    # Any word of a name completes, categories too
+    assert texts("mu") == ["Coffee Mug"]
+    assert texts("h") == ["Home"]
+    assert texts("k", limit=1) == ["Kitchen"]
+    assert service.autocomplete("") == []
+    # Results are copies of what the cache holds
+    service.autocomplete("co").pop()
+    service.autocomplete("co")[0]['text'] = "changed"
+    assert texts("co") == ["Coffee Maker", "Coffee Mug"]
+
+    # Own writes keep the index current...
+    service.update_stock(mug.id, 20)
+    assert texts("co") == ["Coffee Mug", "Coffee Maker"]
+    service.delete_product(maker.id)
+    assert texts("k") == []
+    service.update_product(mug.id, name="Tea Mug")
+    assert texts("co") == [] and texts("te") == ["Tea Mug"]
+
+    # ...and a write from elsewhere rebuilds it
+    _service(tmp_path).create_product("Teapot", 25.0, "Kitchen", stock=50)
+    assert texts("te") == ["Teapot", "Tea Mug"]
+
+    search = ProductSearch(service)
+    result = search.autocomplete("tea", limit=1)
+    assert result['success'] and result['count'] == 1
+    assert result['completions'][0]['id'] != mug.id
+    assert search.autocomplete("  ")['completions'] == []
+
+
+def test_facet_filters_combine_and_count(tmp_path):
+    from src.controllers.product_search import ProductSearch
+    from src.services.facet_index import price_bucket
+
+    assert [price_bucket(p) for p in (0, 9.99, 10, 1000, 5000)] == \
+        ["0-10", "0-10", "10-25", "1000+", "1000+"]
+
+    service = _service(tmp_path)
+    mug = service.create_product("Coffee Mug", 9.0, "Home", stock=3)
+    lamp = service.create_product("Desk Lamp", 30.0, "Home", stock=0)
+    desk = service.create_product("Standing Desk", 300.0, "Office", stock=2)
+    pen = service.create_product("Pen", 2.0, "Office", stock=9)
+
+    def ids(result):
+        return [p.id for p in result['products']]
+
+    everything = service.filter_products()
+    assert everything['count'] == 4
+    assert everything['facets'] == {
+        'category': {'Home': 2, 'Office': 2},
+        'price': {'0-10': 2, '25-50': 1, '250-500': 1},
+        'availability': {'in_stock': 3, 'out_of_stock': 1}}
+
+    # OR within a facet, AND across facets; counts cover what is left
+    result = service.filter_products({'category': ['Home', 'Office'],
+                                      'price': ['0-10', '25-50'],
+                                      'availability': ['in_stock']})
+    assert sorted(ids(result)) == sorted([mug.id, pen.id])
+    assert result['facets']['category'] == {'Home': 1, 'Office': 1}
+    assert service.filter_products({'category': 'Garden'})['count'] == 0
+
+    # Text filters narrow further and keep search ranking
+    result = service.filter_products({'category': ['Home', 'Office']}, "desk")
+    assert ids(result) == [p.id for p in service.search_products("desk")]
+    assert ids(service.filter_products({'availability': ['in_stock']},
+                                       "desk")) == [desk.id]
+    assert service.filter_products(query="desk", limit=1)['count'] == 2
+
+    # Writes through the service and from elsewhere are followed
+    service.update_stock(lamp.id, 4)
+    service.delete_product(pen.id)
+    _service(tmp_path).create_product("Rug", 80.0, "Home", stock=1)
+    result = service.filter_products({'category': ['Home'],
+                                      'availability': ['in_stock']})
+    assert result['count'] == 3
+    assert result['facets']['price'] == {'0-10': 1, '25-50': 1, '50-100': 1}
+
+    search = ProductSearch(service)
+    assert search.filter_products({'colour': ['red']}) == \
+        {'success': False, 'error': 'Unknown filter: colour'}
+    assert search.filter_products({'price': ['250-500']})['products'][0]['id'] \
+        == desk.id
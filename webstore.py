@@ -13,6 +13,7 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 # Import required components
 try:
     from repositories.json_repository import JSONRepository
+    from repositories.instrumented_repository import InstrumentedRepository
     from services.product_service import ProductService
     from services.user_service import UserService
     from services.cart_service import CartService
@@ -24,6 +25,10 @@ except ImportError as e:
     print(f"❌ Import error: {e}")
     sys.exit(1)
 
+# Count repository calls, latencies and file I/O; dump them from the admin
+# menu ("Storage Stats"). Off by default: the repository is then not wrapped.
+INSTRUMENT_STORAGE = False
+
 
 def setup_directories():
     """Create necessary directories"""
@@ -76,6 +81,9 @@ def main():
     
     # Initialize components
     repository = JSONRepository("data")
+    instrumentation = None
+    if INSTRUMENT_STORAGE:
+        repository = instrumentation = InstrumentedRepository(repository)
     product_service = ProductService(repository)
     user_service = UserService(repository)
     cart_service = CartService(product_service, "data")
@@ -85,12 +93,12 @@ def main():
     cart_controller = CartController(cart_service, user_controller)
     
     # Create sample data if needed
-    if len(product_service.get_all_products()) == 0:
+    if product_service.is_catalog_empty():
         create_sample_data(product_service, user_service)
     
     # Run the application
     app = WebStoreInterface(
-        product_controller, user_controller, cart_controller
+        product_controller, user_controller, cart_controller, instrumentation
     )
     app.run()
 
@@ -90,8 +90,8 @@ def main():
                 print("✅ Using CSV storage")
                 break
             elif choice == '3':
-                print("✅ Using both formats (JSON as primary)")
-                repo_type = "json"
+                print("✅ Using both formats (JSON primary, CSV mirror)")
+                repo_type = "mirror"
                 data_dir = "data"
                 break
             else:
@@ -106,7 +106,12 @@ def main():
     setup_directories()
     
     # Initialize components
-    repository = RepositoryFactory.create_repository(repo_type, data_dir)
+    if repo_type == "mirror":
+        # Writes go to JSON first; data_csv/ follows in the background
+        repository = RepositoryFactory.create_mirrored_repository(
+            "json", data_dir, "data_csv")
+    else:
+        repository = RepositoryFactory.create_repository(repo_type, data_dir)
     
     product_service = ProductService(repository)
     user_service = UserService(repository)
@@ -117,14 +122,18 @@ def main():
     cart_controller = CartController(cart_service, user_controller)
     
     # Create sample data if needed
-    if len(product_service.get_all_products()) == 0:
+    if product_service.is_catalog_empty():
         create_sample_data(product_service, user_service)
     
     # Run the application
     app = WebStoreInterface(
         product_controller, user_controller, cart_controller
     )
-    app.run()
+    try:
+        app.run()
+    finally:
+        if repo_type == "mirror":
+            repository.close()
 
 
 if __name__ == "__main__":